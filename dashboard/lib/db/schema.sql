@@ -20,16 +20,237 @@ CREATE TABLE IF NOT EXISTS ircc_state (
   scraped_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Append-only: one row per change of an IRCC config, written with the
+-- ircc_state upsert. The parsed columns are NULL when the text has no number
+-- or date (e.g. "We need more time to process your application").
+CREATE TABLE IF NOT EXISTS ircc_history (
+  id BIGSERIAL PRIMARY KEY,
+  config TEXT NOT NULL,
+  estimated_time TEXT,
+  estimated_days INTEGER,
+  last_updated TEXT,
+  last_updated_date DATE,
+  people_ahead TEXT,
+  people_ahead_count INTEGER,
+  total_waiting TEXT,
+  total_waiting_count INTEGER,
+  scraped_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ircc_history_scraped_at ON ircc_history (scraped_at);
+-- one config's series (ircc_history_series) without scanning the other
+-- configs; DESC also serves "latest rows of a config" without a sort
+CREATE INDEX IF NOT EXISTS ircc_history_config_scraped_at
+  ON ircc_history (config, scraped_at DESC);
+
+-- per-stage timings in ms, written by service/telemetry.py
+ALTER TABLE IF EXISTS scraper_runs ADD COLUMN IF NOT EXISTS stages JSONB;
+
+-- scraper_runs used to be a single table; set it aside so it can be copied
+-- into the partitioned one below
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'scraper_runs' AND relkind = 'r') THEN
+    ALTER TABLE scraper_runs RENAME TO scraper_runs_unpartitioned;
+    ALTER INDEX IF EXISTS scraper_runs_pkey RENAME TO scraper_runs_unpartitioned_pkey;
+    ALTER SEQUENCE IF EXISTS scraper_runs_id_seq RENAME TO scraper_runs_unpartitioned_id_seq;
+  END IF;
+END $$;
+
+-- Run log, one partition per month (UTC) of started_at. Old months are
+-- dropped whole by drop_scraper_runs_partitions() instead of deleted row by
+-- row; rows outside every month partition land in scraper_runs_default.
 CREATE TABLE IF NOT EXISTS scraper_runs (
-  id SERIAL PRIMARY KEY,
+  id BIGSERIAL,
   scraper_id TEXT REFERENCES scrapers(id),
   started_at TIMESTAMPTZ NOT NULL,
   duration_ms INTEGER,
   status TEXT NOT NULL,
   message TEXT,
-  created_at TIMESTAMPTZ DEFAULT NOW()
+  stages JSONB,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (id, started_at)
+) PARTITION BY RANGE (started_at);
+
+CREATE TABLE IF NOT EXISTS scraper_runs_default PARTITION OF scraper_runs DEFAULT;
+
+CREATE INDEX IF NOT EXISTS scraper_runs_scraper_started ON scraper_runs (scraper_id, started_at);
+
+-- Per scraper and day (UTC): run count, failure rate and duration
+-- percentiles. Skipped runs are counted but left out of the rate and the
+-- durations. Kept after the raw runs are dropped.
+CREATE TABLE IF NOT EXISTS scraper_runs_daily (
+  scraper_id TEXT NOT NULL REFERENCES scrapers(id),
+  day DATE NOT NULL,
+  runs INTEGER NOT NULL,
+  failures INTEGER NOT NULL,
+  skipped INTEGER NOT NULL,
+  failure_rate REAL,
+  p50_duration_ms INTEGER,
+  p95_duration_ms INTEGER,
+  max_duration_ms INTEGER,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (scraper_id, day)
 );
 
+-- Recompute the rollup of one scraper for the days first_day..last_day from
+-- the raw runs (one index range scan per call)
+CREATE OR REPLACE FUNCTION refresh_scraper_runs_daily(
+  p_scraper_id TEXT,
+  first_day DATE,
+  last_day DATE
+) RETURNS VOID LANGUAGE sql AS $$
+  INSERT INTO scraper_runs_daily (
+    scraper_id, day, runs, failures, skipped, failure_rate,
+    p50_duration_ms, p95_duration_ms, max_duration_ms, updated_at
+  )
+  SELECT
+    scraper_id,
+    (started_at AT TIME ZONE 'UTC')::date,
+    count(*),
+    count(*) FILTER (WHERE status = 'fail'),
+    count(*) FILTER (WHERE status = 'skipped'),
+    count(*) FILTER (WHERE status = 'fail')::real
+      / NULLIF(count(*) FILTER (WHERE status <> 'skipped'), 0),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE status <> 'skipped'),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE status <> 'skipped'),
+    max(duration_ms) FILTER (WHERE status <> 'skipped'),
+    NOW()
+  FROM scraper_runs
+  WHERE scraper_id = p_scraper_id
+    AND started_at >= first_day::timestamp AT TIME ZONE 'UTC'
+    AND started_at < (last_day + 1)::timestamp AT TIME ZONE 'UTC'
+  GROUP BY 1, 2
+  ON CONFLICT (scraper_id, day) DO UPDATE SET
+    runs            = EXCLUDED.runs,
+    failures        = EXCLUDED.failures,
+    skipped         = EXCLUDED.skipped,
+    failure_rate    = EXCLUDED.failure_rate,
+    p50_duration_ms = EXCLUDED.p50_duration_ms,
+    p95_duration_ms = EXCLUDED.p95_duration_ms,
+    max_duration_ms = EXCLUDED.max_duration_ms,
+    updated_at      = EXCLUDED.updated_at;
+$$;
+
+-- Keeps scraper_runs_daily current: once per INSERT statement, only the days
+-- and scrapers it touched are recomputed
+CREATE OR REPLACE FUNCTION scraper_runs_rollup() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+  touched RECORD;
+BEGIN
+  FOR touched IN
+    SELECT
+      scraper_id,
+      min((started_at AT TIME ZONE 'UTC')::date) AS first_day,
+      max((started_at AT TIME ZONE 'UTC')::date) AS last_day
+    FROM new_runs
+    WHERE scraper_id IS NOT NULL
+    GROUP BY scraper_id
+  LOOP
+    PERFORM refresh_scraper_runs_daily(touched.scraper_id, touched.first_day, touched.last_day);
+  END LOOP;
+  RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS scraper_runs_rollup ON scraper_runs;
+CREATE TRIGGER scraper_runs_rollup
+  AFTER INSERT ON scraper_runs
+  REFERENCING NEW TABLE AS new_runs
+  FOR EACH STATEMENT EXECUTE FUNCTION scraper_runs_rollup();
+
+-- Month partitions scraper_runs_YYYY_MM from the month of from_ts through
+-- months_ahead months from now, a year by default so a missed cleanup job
+-- never sends new runs to the default partition. Rows of such a month that
+-- went to the default partition are moved into the new partition before it
+-- is attached.
+CREATE OR REPLACE FUNCTION create_scraper_runs_partitions(
+  from_ts TIMESTAMPTZ DEFAULT NOW(),
+  months_ahead INTEGER DEFAULT 12
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+  month_start TIMESTAMP := date_trunc('month', from_ts AT TIME ZONE 'UTC');
+  last_month TIMESTAMP := date_trunc('month', NOW() AT TIME ZONE 'UTC')
+    + make_interval(months => months_ahead);
+  lower_bound TIMESTAMPTZ;
+  upper_bound TIMESTAMPTZ;
+  partition_name TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE month_start <= last_month LOOP
+    partition_name := 'scraper_runs_' || to_char(month_start, 'YYYY_MM');
+    lower_bound := month_start AT TIME ZONE 'UTC';
+    upper_bound := (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    IF to_regclass(partition_name) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I (LIKE scraper_runs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+      );
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM scraper_runs_default '
+        'WHERE started_at >= %L AND started_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name
+      );
+      EXECUTE format(
+        'ALTER TABLE scraper_runs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound
+      );
+      created := created + 1;
+    END IF;
+    month_start := month_start + INTERVAL '1 month';
+  END LOOP;
+  RETURN created;
+END $$;
+
+-- Retention: drop the month partitions that ended more than `keep` ago and
+-- the same rows of the default partition. Months go whole, so a run is kept
+-- from `keep` up to `keep` plus one month (about 60 days with the default).
+-- scraper_runs_daily is left alone.
+CREATE OR REPLACE FUNCTION drop_scraper_runs_partitions(
+  keep INTERVAL DEFAULT INTERVAL '30 days'
+) RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+  partition_name TEXT;
+  dropped INTEGER := 0;
+BEGIN
+  FOR partition_name IN
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'scraper_runs'::regclass
+      AND c.relname ~ '^scraper_runs_[0-9]{4}_[0-9]{2}$'
+  LOOP
+    IF (to_date(right(partition_name, 7), 'YYYY_MM') + INTERVAL '1 month') AT TIME ZONE 'UTC'
+        <= NOW() - keep THEN
+      EXECUTE format('DROP TABLE %I', partition_name);
+      dropped := dropped + 1;
+    END IF;
+  END LOOP;
+  DELETE FROM scraper_runs_default WHERE started_at < NOW() - keep;
+  RETURN dropped;
+END $$;
+
+-- copy the runs of a single-table scraper_runs (the trigger fills the rollup)
+DO $$
+DECLARE
+  first_run TIMESTAMPTZ;
+BEGIN
+  IF to_regclass('scraper_runs_unpartitioned') IS NOT NULL THEN
+    SELECT min(started_at) INTO first_run FROM scraper_runs_unpartitioned;
+    PERFORM create_scraper_runs_partitions(COALESCE(first_run, NOW()));
+    INSERT INTO scraper_runs (id, scraper_id, started_at, duration_ms, status, message, stages, created_at)
+    SELECT id, scraper_id, started_at, duration_ms, status, message, stages, created_at
+    FROM scraper_runs_unpartitioned;
+    PERFORM setval(
+      pg_get_serial_sequence('scraper_runs', 'id'),
+      GREATEST((SELECT max(id) FROM scraper_runs), 1)
+    );
+    DROP TABLE scraper_runs_unpartitioned;
+  END IF;
+END $$;
+
+SELECT create_scraper_runs_partitions();
+
 INSERT INTO scrapers (id, name, description, cron_schedule)
 VALUES (
   'canada_ircc',
@@ -6,11 +6,18 @@ Nominees → Yes via Express Entry → Yes → 2023 April) on the canada.ca page
 and posts a Slack status card *only when the result changes*.
 
 Run via cron (daily is plenty — IRCC updates monthly).
+
+The browser is only needed to get past the CDN: its cookies and headers are
+cached in IRCC_SESSION_FILE and later runs fetch the two JSON feeds directly
+with curl-cffi until the session expires or is rejected (IRCC_REPLAY=0 always
+uses the browser).
 """
 
 import asyncio
+import datetime
 import os
 import platform
+import re
 import sys
 import time
 
@@ -32,6 +39,14 @@ if platform.system() != "Darwin":
         sys.path.append("/home/pi/Projects/pyppeteer-scraper")
 
 from service.alert import send_api_error_alert, send_ircc_status_card
+from service.alert_queue import dispatch
+from service import db
+from service.browser_pool import PlaywrightPool, warm_endpoint
+from service.interception import RequestBlocker
+from service.http_cache import ConditionalCache
+from service.replay_session import HarvestedSession
+from service.notifiers import configure_notifier
+from service.telemetry import RunRecord, get_telemetry, stage
 
 log = my_logger.CustomLogger("canada_ircc", verbose=True, log_dir="logs")
 
@@ -51,23 +66,74 @@ CONFIG = {
 }
 CONFIG_LABEL = "Provincial Nominees · Online via Express Entry"
 
+# replay the JSON feeds with the cookies/headers of the last browser run
+IRCC_REPLAY = os.environ.get("IRCC_REPLAY", "1") != "0"
+SESSION_FILE = os.environ.get("IRCC_SESSION_FILE", "storage/ircc_session.json")
+LAUNCH_KWARGS = {
+    "headless": True,
+    "args": ["--no-sandbox", "--disable-dev-shm-usage",
+             "--disable-blink-features=AutomationControlled"],
+}
+
 
-def _get_db_conn():
-    import psycopg2
-    url = os.environ.get("POSTGRES_URL", "")
-    if "sslmode" not in url:
-        url += "?sslmode=require"
-    return psycopg2.connect(url)
+db.register_statement(
+    "ircc_load_state",
+    "SELECT estimated_time, last_updated, people_ahead, total_waiting "
+    "FROM ircc_state WHERE id = 1",
+)
+db.register_statement(
+    "ircc_save_state",
+    """
+    INSERT INTO ircc_state (id, estimated_time, last_updated, people_ahead, total_waiting, scraped_at)
+    VALUES (1, %s, %s, %s, %s, NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        estimated_time = EXCLUDED.estimated_time,
+        last_updated   = EXCLUDED.last_updated,
+        people_ahead   = EXCLUDED.people_ahead,
+        total_waiting  = EXCLUDED.total_waiting,
+        scraped_at     = EXCLUDED.scraped_at
+    """,
+)
+db.register_statement(
+    "ircc_append_history",
+    """
+    INSERT INTO ircc_history (
+        config, estimated_time, estimated_days, last_updated, last_updated_date,
+        people_ahead, people_ahead_count, total_waiting, total_waiting_count
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """,
+)
+db.register_statement(
+    "ircc_history_series",
+    """
+    SELECT scraped_at, estimated_time, estimated_days, last_updated, last_updated_date,
+           people_ahead, people_ahead_count, total_waiting, total_waiting_count
+    FROM ircc_history
+    WHERE config = %s AND scraped_at >= COALESCE(%s::timestamptz, '-infinity')
+    ORDER BY scraped_at
+    """,
+)
+
+HISTORY_COLUMNS = (
+    "scraped_at",
+    "estimated_time",
+    "estimated_days",
+    "last_updated",
+    "last_updated_date",
+    "people_ahead",
+    "people_ahead_count",
+    "total_waiting",
+    "total_waiting_count",
+)
+# days per unit of an estimated processing time, months and years averaged
+DURATION_DAYS = {"day": 1, "week": 7, "month": 365 / 12, "year": 365}
 
 
 def is_active() -> bool:
     """Return False if the scraper has been deactivated in the dashboard."""
     try:
-        conn = _get_db_conn()
-        cur = conn.cursor()
-        cur.execute("SELECT is_active FROM scrapers WHERE id = %s", (SCRAPER_NAME,))
-        row = cur.fetchone()
-        conn.close()
+        row = db.execute("scraper_is_active", (SCRAPER_NAME,), fetch="one")
         return bool(row[0]) if row else True
     except Exception as e:
         log.warning(f"Could not check is_active flag: {e} — defaulting to active")
@@ -77,14 +143,7 @@ def is_active() -> bool:
 def load_state() -> dict | None:
     """Return the last cached result from Neon, or None if no state yet."""
     try:
-        conn = _get_db_conn()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT estimated_time, last_updated, people_ahead, total_waiting "
-            "FROM ircc_state WHERE id = 1"
-        )
-        row = cur.fetchone()
-        conn.close()
+        row = db.execute("ircc_load_state", fetch="one")
         if not row:
             return None
         return {
@@ -98,56 +157,80 @@ def load_state() -> dict | None:
         return None
 
 
-def save_state(state: dict) -> None:
-    """Upsert the current result into ircc_state."""
-    conn = _get_db_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO ircc_state (id, estimated_time, last_updated, people_ahead, total_waiting, scraped_at)
-        VALUES (1, %s, %s, %s, %s, NOW())
-        ON CONFLICT (id) DO UPDATE SET
-            estimated_time = EXCLUDED.estimated_time,
-            last_updated   = EXCLUDED.last_updated,
-            people_ahead   = EXCLUDED.people_ahead,
-            total_waiting  = EXCLUDED.total_waiting,
-            scraped_at     = EXCLUDED.scraped_at
-        """,
-        (state["estimated_time"], state["last_updated"],
-         state["people_ahead"], state["total_waiting"]),
-    )
-    conn.commit()
-    conn.close()
+def parse_count(text: str):
+    """12345 for "About 12,345 people waiting", None when there is no number."""
+    match = re.search(r"\d[\d,]*", text or "")
+    return int(match.group().replace(",", "")) if match else None
 
 
-def write_run_log(started_at: float, status: str, message: str) -> None:
-    """Write a run entry to scraper_runs and update scrapers.last_run_*."""
-    duration_ms = int((time.time() - started_at) * 1000)
-    try:
-        conn = _get_db_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO scraper_runs (scraper_id, started_at, duration_ms, status, message)
-            VALUES (%s, to_timestamp(%s), %s, %s, %s)
-            """,
-            (SCRAPER_NAME, started_at, duration_ms, status, message[:500]),
+def parse_duration_days(text: str):
+    """Days of an estimate like "6 months" or "203 days", None otherwise."""
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(day|week|month|year)s?\b", (text or "").lower())
+    if not match:
+        return None
+    return round(float(match.group(1)) * DURATION_DAYS[match.group(2)])
+
+
+def parse_date(text: str):
+    """The date of "May 12, 2026" or "2026-05-12", None otherwise."""
+    for fmt in ("%B %d, %Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime((text or "").strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def config_key(config: dict = CONFIG) -> str:
+    """Identifier of an application config in ircc_history, e.g. "pnp-ee-2023/04"."""
+    month_num = datetime.datetime.strptime(config["month"], "%B").month
+    return f"pnp-ee-{config['year']}/{month_num:02d}"
+
+
+def save_state(state: dict) -> None:
+    """
+    Upsert the current result into ircc_state and append it to ircc_history,
+    in one transaction. Only called when the result changed.
+    """
+    with db.transaction() as tx:
+        tx.execute(
+            "ircc_save_state",
+            (state["estimated_time"], state["last_updated"],
+             state["people_ahead"], state["total_waiting"]),
         )
-        cur.execute(
-            """
-            UPDATE scrapers SET
-                last_run_at = to_timestamp(%s),
-                last_run_duration_ms = %s,
-                last_run_status = %s,
-                last_run_message = %s
-            WHERE id = %s
-            """,
-            (started_at, duration_ms, status, message[:500], SCRAPER_NAME),
+        tx.execute(
+            "ircc_append_history",
+            (
+                config_key(),
+                state["estimated_time"],
+                parse_duration_days(state["estimated_time"]),
+                state["last_updated"],
+                parse_date(state["last_updated"]),
+                state["people_ahead"],
+                parse_count(state["people_ahead"]),
+                state["total_waiting"],
+                parse_count(state["total_waiting"]),
+            ),
         )
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        log.warning(f"Could not write run log: {e}")
+
+
+def load_history(config: str = None, since: datetime.datetime = None) -> list:
+    """
+    Every recorded change of a config, oldest first
+    :param config: config_key() of the config, CONFIG by default
+    :param since: only changes scraped at or after this time
+    :return: one dict per change, keyed by HISTORY_COLUMNS
+    """
+    rows = db.execute(
+        "ircc_history_series", (config or config_key(), since), fetch="all"
+    )
+    return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+
+def write_run_log(run_log: RunRecord, status: str, message: str) -> None:
+    """Hand the run to the telemetry writer, which writes it when the process exits."""
+    run_log.finish(status, message)
+    log.info(f"DB latency: {db.query_stats()}")
 
 
 def has_changed(current: dict, cached: dict | None) -> bool:
@@ -159,72 +242,90 @@ PTIME_SUFFIX = "data-ptime-non-country-en.json"
 FLPT_SUFFIX  = "flpt-en.json"
 
 
-async def fetch_ircc_data() -> dict:
+async def capture_with_browser() -> tuple[dict, HarvestedSession]:
     """
-    Use a real browser session to trigger the IRCC page's network requests,
-    then parse the intercepted JSON directly — no DOM scraping needed.
-    The CDN blocks cold urllib/requests calls but allows browser sessions.
+    Use a real browser session to trigger the IRCC page's network requests and
+    intercept the JSON. The CDN blocks cold urllib/requests calls but allows
+    browser sessions, so the feed URLs, headers and cookies are handed back too
+    for later runs to replay.
     """
     from playwright.async_api import async_playwright
 
     captured: dict[str, dict] = {}
+    feed_urls: dict[str, str] = {}
+    feed_headers: dict[str, str] = {}
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=["--no-sandbox", "--disable-dev-shm-usage",
-                  "--disable-blink-features=AutomationControlled"],
-        )
-        page = await browser.new_page(viewport={"width": 1920, "height": 1080})
-
-        async def on_response(response):
-            url = response.url
-            if PTIME_SUFFIX in url or FLPT_SUFFIX in url:
-                try:
-                    data = await response.json()
-                    key = "ptime" if PTIME_SUFFIX in url else "flpt"
-                    captured[key] = data
-                    log.info(f"Captured {key} from {url}")
-                except Exception:
-                    pass
-
-        page.on("response", on_response)
-
-        log.info(f"Navigating to {TARGET_URL}")
-        await page.goto(TARGET_URL, wait_until="domcontentloaded", timeout=60000)
-
-        # Fill form and click — this triggers the JSON fetches
-        log.info(f"Filling form with config: {CONFIG}")
-        await page.get_by_label("Select an application type.").select_option(
-            label=CONFIG["application_type"]
+        # attach to a warm Chromium launched with these same options when
+        # there is one on this runner, otherwise launch our own
+        pool = PlaywrightPool(
+            p,
+            launch_kwargs=LAUNCH_KWARGS,
+            context_kwargs={"viewport": {"width": 1920, "height": 1080}},
+            cdp_endpoint=os.environ.get("BROWSER_CDP_ENDPOINT") or warm_endpoint(LAUNCH_KWARGS),
         )
-        log.info(f"  application_type = {CONFIG['application_type']!r}")
-        await page.get_by_label("Which economic class application?").select_option(
-            label=CONFIG["economic_class"]
-        )
-        log.info(f"  economic_class = {CONFIG['economic_class']!r}")
-        await page.get_by_label("Online via Express Entry?").select_option(
-            label=CONFIG["online_express_entry"]
-        )
-        log.info(f"  online_express_entry = {CONFIG['online_express_entry']!r}")
-        await page.get_by_label("Have you already applied?").select_option(
-            label=CONFIG["have_applied"]
-        )
-        log.info(f"  have_applied = {CONFIG['have_applied']!r}")
-        await page.get_by_label("Year (YYYY)").fill(CONFIG["year"])
-        log.info(f"  year = {CONFIG['year']!r}")
-        await page.get_by_label("Month").select_option(label=CONFIG["month"])
-        log.info(f"  month = {CONFIG['month']!r}")
-        log.info("  Clicking 'Get processing time'")
-        await page.get_by_role("button", name="Get processing time").click()
-
-        # Wait up to 30s for both JSON files to be intercepted
-        for _ in range(60):
-            if "ptime" in captured and "flpt" in captured:
-                break
-            await asyncio.sleep(0.5)
-
-        await browser.close()
+        lease = await pool.acquire()
+        try:
+            page = lease.page
+
+            # only the form scripts and the two JSON files matter
+            blocker = RequestBlocker("canada_ircc")
+            await blocker.attach(page)
+
+            async def on_response(response):
+                url = response.url
+                if PTIME_SUFFIX in url or FLPT_SUFFIX in url:
+                    try:
+                        data = await response.json()
+                        key = "ptime" if PTIME_SUFFIX in url else "flpt"
+                        captured[key] = data
+                        feed_urls[key] = url
+                        feed_headers.update(await response.request.all_headers())
+                        log.info(f"Captured {key} from {url}")
+                    except Exception:
+                        pass
+
+            page.on("response", on_response)
+
+            log.info(f"Navigating to {TARGET_URL}")
+            await page.goto(TARGET_URL, wait_until="domcontentloaded", timeout=60000)
+
+            # Fill form and click — this triggers the JSON fetches
+            log.info(f"Filling form with config: {CONFIG}")
+            await page.get_by_label("Select an application type.").select_option(
+                label=CONFIG["application_type"]
+            )
+            log.info(f"  application_type = {CONFIG['application_type']!r}")
+            await page.get_by_label("Which economic class application?").select_option(
+                label=CONFIG["economic_class"]
+            )
+            log.info(f"  economic_class = {CONFIG['economic_class']!r}")
+            await page.get_by_label("Online via Express Entry?").select_option(
+                label=CONFIG["online_express_entry"]
+            )
+            log.info(f"  online_express_entry = {CONFIG['online_express_entry']!r}")
+            await page.get_by_label("Have you already applied?").select_option(
+                label=CONFIG["have_applied"]
+            )
+            log.info(f"  have_applied = {CONFIG['have_applied']!r}")
+            await page.get_by_label("Year (YYYY)").fill(CONFIG["year"])
+            log.info(f"  year = {CONFIG['year']!r}")
+            await page.get_by_label("Month").select_option(label=CONFIG["month"])
+            log.info(f"  month = {CONFIG['month']!r}")
+            log.info("  Clicking 'Get processing time'")
+            await page.get_by_role("button", name="Get processing time").click()
+
+            # Wait up to 30s for both JSON files to be intercepted
+            for _ in range(60):
+                if "ptime" in captured and "flpt" in captured:
+                    break
+                await asyncio.sleep(0.5)
+
+            log.info(f"Request blocking: {blocker.stats()}")
+            cookies = await lease.context.cookies()
+        finally:
+            await pool.release(lease)
+            await pool.shutdown()
 
     if "ptime" not in captured or "flpt" not in captured:
         raise RuntimeError(
@@ -232,16 +333,41 @@ async def fetch_ircc_data() -> dict:
             "canada.ca may have blocked the request."
         )
 
+    return captured, HarvestedSession.from_browser(feed_urls, feed_headers, cookies)
+
+
+async def fetch_ircc_feeds() -> dict:
+    """
+    Replay the cached browser session over plain HTTP when there is one, and
+    only drive the browser when replay is disabled, expired or rejected.
+    """
+    if IRCC_REPLAY:
+        session = HarvestedSession.load(SESSION_FILE)
+        if session:
+            started = time.time()
+            captured = await session.replay(cache=ConditionalCache())
+            if captured and "ptime" in captured and "flpt" in captured:
+                log.info(f"Replayed IRCC feeds in {int((time.time() - started) * 1000)}ms")
+                return captured
+            log.info("Session replay rejected — falling back to the browser")
+            HarvestedSession.invalidate(SESSION_FILE)
+
+    captured, session = await capture_with_browser()
+    if IRCC_REPLAY:
+        try:
+            session.save(SESSION_FILE)
+        except OSError as e:
+            log.warning(f"Could not cache browser session: {e}")
+    return captured
+
+
+def parse_ircc_feeds(captured: dict) -> dict:
+    """Pick the four tracked fields for CONFIG out of the two JSON feeds."""
     ptime = captured["ptime"]
     flpt  = captured["flpt"]
 
     # people-ahead is keyed by "{category}-{YYYY}/{MM:02d}"
-    month_num = {
-        "January": 1, "February": 2, "March": 3, "April": 4,
-        "May": 5, "June": 6, "July": 7, "August": 8,
-        "September": 9, "October": 10, "November": 11, "December": 12,
-    }[CONFIG["month"]]
-    people_ahead_key = f"pnp-ee-{CONFIG['year']}/{month_num:02d}"
+    people_ahead_key = config_key()
 
     estimated_time = ptime.get("pnp_ee_flpt", {}).get("pnp_ee_flpt", "—")
     last_updated   = flpt.get("default-update", {}).get("flpt_lastupdated", "—")
@@ -260,45 +386,56 @@ async def fetch_ircc_data() -> dict:
     }
 
 
+async def fetch_ircc_data() -> dict:
+    return parse_ircc_feeds(await fetch_ircc_feeds())
+
+
 def run() -> None:
-    started_at = time.time()
+    configure_notifier(SCRAPER_NAME)
+    run_log = get_telemetry().start_run(SCRAPER_NAME)
 
     if not is_active():
         log.info("Scraper is deactivated — skipping run")
-        write_run_log(started_at, "skipped", "deactivated")
+        write_run_log(run_log, "skipped", "deactivated")
         return
 
     try:
-        result = asyncio.run(fetch_ircc_data())
+        with stage("fetch"):
+            result = asyncio.run(fetch_ircc_data())
     except Exception as e:
         log.error(f"Scraper failed: {e}", exc_info=True)
-        send_api_error_alert(
+        dispatch(
+            send_api_error_alert,
             "Canada IRCC",
             "Scraper failed before producing a result",
             f"Error: {str(e)}\nURL: {TARGET_URL}",
         )
-        write_run_log(started_at, "fail", str(e))
+        write_run_log(run_log, "fail", str(e))
         sys.exit(1)
 
     log.info(f"Parsed result: {result}")
 
-    cached = load_state()
+    with stage("load_state"):
+        cached = load_state()
     if not has_changed(result, cached):
         log.info("No change since last run — skipping Slack notification")
-        write_run_log(started_at, "success", "no change")
+        write_run_log(run_log, "success", "no change")
         return
 
     log.info(f"Change detected (cached={cached}) — posting status card")
-    send_ircc_status_card(
-        config_label=CONFIG_LABEL,
-        estimated_time=result["estimated_time"],
-        people_ahead=result["people_ahead"],
-        total_waiting=result["total_waiting"],
-        last_updated=result["last_updated"],
-        source_url=TARGET_URL,
-    )
-    save_state(result)
-    write_run_log(started_at, "success", "state changed")
+    with stage("alert"):
+        dispatch(
+            send_ircc_status_card,
+            config_label=CONFIG_LABEL,
+            estimated_time=result["estimated_time"],
+            people_ahead=result["people_ahead"],
+            total_waiting=result["total_waiting"],
+            last_updated=result["last_updated"],
+            source_url=TARGET_URL,
+        )
+    with stage("save_state"):
+        save_state(result)
+    write_run_log(run_log, "success", "state changed")
 
 
 if __name__ == "__main__":
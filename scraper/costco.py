@@ -20,10 +20,12 @@ import my_logger
 load_dotenv()
 
 from service.alert import (
-    send_email_with_attachment, send_slack_message,
+    send_email_with_attachment,
     get_last_alert_date,
     update_last_alert_date,
 )
+from service.screenshot import EXTENSIONS, ScreenshotPipeline
+from service.notifiers import configure_notifier
 
 # Set up the email parameters
 sender_email = os.environ.get("EMAIL_USER", "")
@@ -46,6 +48,8 @@ options.add_argument(
 options.add_argument("--disable-gpu")  # Disable GPU acceleration
 options.binary_location = "/usr/bin/chromium-browser"
 
+# region kept in the alert screenshot, the viewport is used when it is missing
+SCREENSHOT_SELECTOR = "#product-page"
 link = "https://www.costco.ca/aiden-%2526-ivy-6-piece-fabric-sectional%2c-grey.product.4000207338.html?langId=-24&province=SK&sh=true&nf=true"
 # Set the path to the installed Chromium driver
 DRIVER_PATH = '/usr/bin/chromedriver'
@@ -62,6 +66,7 @@ driver = webdriver.Chrome(service=service, options=options)
 
 SCRAPER_NAME = "costco"
 log = my_logger.CustomLogger(SCRAPER_NAME, verbose=True, log_dir="logs")
+configure_notifier(SCRAPER_NAME)
 
 # Navigate to the Nintendo website
 try:
@@ -121,10 +126,13 @@ try:
         current_date = datetime.now().date()
         if not alert_date or alert_date < current_date:
             today = datetime.now().strftime("%Y-%m-%d")
-            screenshot_name = f"storage/screenshot_{today}.png"
+            pipeline = ScreenshotPipeline()
+            screenshot_name = f"storage/screenshot_{today}{EXTENSIONS[pipeline.format]}"
             if not os.path.isfile(screenshot_name):
                 log.info("Taking a screenshot ...")
-                driver.save_screenshot(screenshot_name)
+                screenshot_name = pipeline.capture_selenium(
+                    driver, SCREENSHOT_SELECTOR, screenshot_name
+                )
                 log.info(f"Screenshot saved as {screenshot_name}")
 
             log.info("Sending new alert...")
@@ -132,9 +140,10 @@ try:
                 f"*<{link}|Aiden & Ivy 6-piece Fabric Sectional, Grey>* "
                 f"is available: {link}"
             )
-            send_slack_message(msg)
+            # the upload runs while the email goes out
+            upload = pipeline.upload_in_background(msg, screenshot_name)
             update_last_alert_date("costco", current_date)
-            send_email_with_attachment(
+            result = send_email_with_attachment(
                 sender_email,
                 "Costco Scraper",
                 sender_password,
@@ -143,6 +152,9 @@ try:
                 "testing",
                 screenshot_name,
             )
+            log.info(f"Email sent to {result['sent']}, refused: {result['refused']}")
+            upload.join(timeout=60)
+            log.info(f"Screenshot pipeline: {pipeline.timings}")
 
 finally:
     # Output the page source to the console
@@ -5,7 +5,6 @@ import platform
 import sys
 import time
 
-import requests
 from dotenv import load_dotenv
 
 current = os.path.dirname(os.path.realpath(__file__))
@@ -23,19 +22,46 @@ if platform.system() != "Darwin":
     ):
         sys.path.append("/home/pi/Projects/pyppeteer-scraper")
 
-from datetime import datetime
+from datetime import datetime, timezone
 
 import nest_asyncio
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
 
 from service.alert import (
     send_slack_message,
     get_last_alert_date,
     update_last_alert_date,
+    get_user_cache_stats,
+    get_slack_stats,
 )
+from service import db
+from service.browser_pool import get_pool, shutdown_pools
+from service.extract import extract_records, extract_value, extract_values
+from service.readiness import PageReadiness
+from service.interception import RequestBlocker
+from service.http_cache import ConditionalCache
+from service.http_client import HttpClientError, get_http_client
+from service.daemon import PollingDaemon
+from service.alert_queue import AlertDispatcher, dispatch
+from service.alert_digest import AlertDigest
+from service.outbox import get_outbox
+from service.storage import RegistrationSnapshot, get_store, registration_info
+from service.notifiers import configure_notifier
+from service.telemetry import get_telemetry, stage
 
-log = my_logger.CustomLogger("home_depo", verbose=True, log_dir="logs")
+SCRAPER_NAME = "home_depo"
+LISTING_URL = (
+    "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId={store_id}&lang=en"
+)
+# comma separated store ids watched by run2
+HOME_DEPOT_STORES = [
+    store.strip()
+    for store in os.environ.get("HOME_DEPOT_STORES", "7265").split(",")
+    if store.strip()
+]
+FETCH_CONCURRENCY = int(os.environ.get("HOME_DEPOT_CONCURRENCY", 8))
+STORE_FETCH_TIMEOUT = float(os.environ.get("HOME_DEPOT_STORE_TIMEOUT", 20))
+
+log = my_logger.CustomLogger(SCRAPER_NAME, verbose=True, log_dir="logs")
 
 
 nest_asyncio.apply()
@@ -45,63 +71,103 @@ class Scraper:
     def __init__(self, launch_options: dict) -> None:
         self.page = None
         self.browser = None
+        self.lease = None
+        self.readiness = None
+        self.blocker = None
         self.options = launch_options.get("options")
         self.viewPort = launch_options.get("viewPort")
 
+    async def close(self) -> None:
+        """
+        Hand the page's incognito context back to the shared browser pool
+        :return:
+        """
+        if self.blocker:
+            log.info(f"Request blocking: {self.blocker.stats()}")
+        if self.lease:
+            await get_pool(self.options).release(self.lease)
+            self.lease = None
+
     async def goto(self, url: str) -> None:
-        self.browser = await launch(options=self.options)
-        self.page = await self.browser.newPage()
+        self.lease = await get_pool(self.options).acquire()
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         await self.page.setUserAgent(
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/119.0",
         )
-        # make scraper stealth
+        # make scraper stealth, imported here so pyppeteer only loads when a page is opened
+        from pyppeteer_stealth import stealth
+
         await stealth(self.page)
+        # abort images, fonts, media and trackers the scrape never reads
+        self.blocker = RequestBlocker(SCRAPER_NAME)
+        await self.blocker.attach(self.page)
+        # track network activity from the first request on
+        self.readiness = PageReadiness(self.page)
         await self.page.goto(url, {"waitUntil": "load", "timeout": 600000})
 
-        # # wait for specific time to bypass store selection
-        await self.page.waitFor(3000)
-        # wait for element to appear
+        # wait for the tab, then briefly for the store selection modal to
+        # settle: analytics and long-polling may never let the network go
+        # quiet, so only the selector gets the long deadline
         selector = 'span[data-title*="Kids Workshops"]'
-        await self.page.waitForSelector(selector, {"visible": True, "timeout": 600000})
+        await self.readiness.wait(
+            selector=selector,
+            visible=True,
+            deadline_ms=600000,
+            label="home_depo.tabs",
+        )
+        await self.readiness.wait(
+            network_idle_ms=500, deadline_ms=5000, label="home_depo.tabs_idle"
+        )
 
         # close location select modal
         close_btn = await self.page.querySelector("button[class*=acl-reset-button]")
         if close_btn:
             await close_btn.click()
-            await self.page.waitFor(5000)
+            await self.readiness.wait(
+                network_idle_ms=500, deadline_ms=5000, label="home_depo.modal"
+            )
 
         # click kid diy tab button
         link = await self.page.querySelector(selector)
         await link.click()
-        await self.page.waitFor(5000)
+        await self.readiness.wait(
+            selector="localized-tabs-content > div",
+            network_idle_ms=500,
+            deadline_ms=5000,
+            label="home_depo.workshops",
+        )
 
     async def extract_many(self, selector: str, attr: str) -> list:
         """
-        Select and return a list of elements using queryAll
+        Read attr from every element matching selector in a single page.evaluate
         :param selector:
         :param attr:
         :return:
         """
-        result = []
-        elements = await self.page.querySelectorAll(selector)
-        for element in elements:
-            text = await element.getProperty(attr)
-            result.append(await text.jsonValue())
-        return result
+        return await extract_values(self.page, selector, attr)
 
     async def extract_one(self, selector: str, attr: str) -> str:
         """
-        Locate a single element using querySelector
+        Read attr from the first element matching selector, None if there is none
         :param selector:
         :param attr:
         :return:
         """
-        element = await self.page.querySelector(selector)
-        text = await element.getProperty(attr)
-        return await text.jsonValue()
+        return await extract_value(self.page, selector, attr)
+
+    async def extract_records(self, selector: str, schema: dict) -> list:
+        """
+        Extract one dict per element matching selector in a single page.evaluate
+        :param selector: CSS selector of the record elements
+        :param schema: output key -> selector (or {"selector", "attr"}) of each field
+        :return:
+        """
+        return await extract_records(self.page, selector, schema)
 
 
 async def run(proxy: str = None, port: int = None) -> None:
+    configure_notifier(SCRAPER_NAME)
     # define launch option
     launch_options = {
         "options": {
@@ -121,39 +187,39 @@ async def run(proxy: str = None, port: int = None) -> None:
 
     # Initialize the new scraper
     scraper = Scraper(launch_options)
+    try:
+        # Navigate to the target
+        # target_url = "https://www.homedepot.ca/workshops?store=7265"
+        target_url = (
+            "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId=7265&lang=en"
+        )
 
-    # Navigate to the target
-    # target_url = "https://www.homedepot.ca/workshops?store=7265"
-    target_url = (
-        "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId=7265&lang=en"
-    )
+        log.info(f"Navigate to: {target_url}")
+        await scraper.goto(target_url)
 
-    log.info(f"Navigate to: {target_url}")
-    await scraper.goto(target_url)
-
-    log.info("Start scraping Kids Workshop...")
-
-    ws_elements = await scraper.page.querySelectorAll("localized-tabs-content > div")
-    log.info(f"{len(ws_elements)} events found")
-    for workshop in ws_elements:
-        title_elem = await workshop.querySelector("h3")
-        title = await title_elem.getProperty("textContent")
-        title_str = await title.jsonValue()
-        status_elem = await workshop.querySelector("button")
-        status = await status_elem.getProperty("textContent")
-        status_str = await status.jsonValue()
-        start_elem = await workshop.querySelector("p")
-        start = await start_elem.getProperty("textContent")
-        start_str = await start.jsonValue()
-        log.info(f"Found event: {title_str}, status: {status_str}")
-        if "full" in status_str.lower() or "closed" in status_str.lower():
-            log.info("Event is not open for registration!")
-            continue
-        shop = {"title": title_str, "start": start_str, "status": status_str}
-        if "register" in status_str.lower():
-            log.info(f"{title_str} is open for registration: {status_str}")
-            send_home_depo_alert(shop, target_url)
-    await scraper.browser.close()
+        log.info("Start scraping Kids Workshop...")
+
+        workshops = await scraper.extract_records(
+            "localized-tabs-content > div",
+            {"title": "h3", "status": "button", "start": "p"},
+        )
+        log.info(f"{len(workshops)} events found")
+        for workshop in workshops:
+            title_str = workshop["title"] or ""
+            status_str = workshop["status"] or ""
+            start_str = workshop["start"] or ""
+            log.info(f"Found event: {title_str}, status: {status_str}")
+            if "full" in status_str.lower() or "closed" in status_str.lower():
+                log.info("Event is not open for registration!")
+                continue
+            shop = {"title": title_str, "start": start_str, "status": status_str}
+            if "register" in status_str.lower():
+                log.info(f"{title_str} is open for registration: {status_str}")
+                send_home_depo_alert(shop, target_url)
+    finally:
+        # hand the context back even when the scrape failed
+        await scraper.close()
+        await shutdown_pools()
 
 
 def send_home_depo_alert(workshop: dict, link):
@@ -168,18 +234,18 @@ def send_home_depo_alert(workshop: dict, link):
     msg = f"*<{link}|{title}>* on *{start}* is open for registration: {link}"
 
     # get last alert date
-    alert_date = get_last_alert_date("home_depo")
+    alert_date = get_last_alert_date(SCRAPER_NAME)
     log.info(f"Previous alert was sent on {alert_date}")
     current_date = datetime.now().date()
     if not alert_date or alert_date < current_date:
         log.info("Sending new alert...")
-        send_slack_message(msg)
-        update_last_alert_date("home_depo", current_date)
+        dispatch(send_slack_message, msg)
+        update_last_alert_date(SCRAPER_NAME, current_date)
     else:
         log.info("No alerts were needed.")
 
 
-def register_home_depot_workshop(
+async def register_home_depot_workshop(
     event_code,
     workshop_event_id,
     first_name="En",
@@ -203,7 +269,7 @@ def register_home_depot_workshop(
     Returns:
         tuple: (success, response_text)
     """
-    from service.alert import send_api_error_alert
+    from service.alert import send_api_error_alert, send_slack_message
 
     log.info(
         f"Attempting to register for workshop with event code: {event_code}, workshop event ID: {workshop_event_id}"
@@ -239,9 +305,11 @@ def register_home_depot_workshop(
 
     try:
         log.info("Sending registration request...")
-        response = requests.post(url, headers=headers, json=payload)
+        response = await get_http_client().post(url, headers=headers, json=payload)
 
-        log.info(f"Response status code: {response.status_code}")
+        log.info(
+            f"Response status code: {response.status_code} in {response.elapsed_ms}ms"
+        )
         log.info(f"Response headers: {dict(response.headers)}")
 
         try:
@@ -249,7 +317,8 @@ def register_home_depot_workshop(
             log.info(f"Response JSON: {json.dumps(response_json, indent=2)}")
         except json.JSONDecodeError as e:
             log.warning(f"Response is not JSON: {response.text[:500]}")
-            send_api_error_alert(
+            dispatch(
+                send_api_error_alert,
                 "Home Depot Registration",
                 "JSON parsing error in registration response",
                 f"Event code: {event_code}\nError: {str(e)}\nResponse: {response.text[:500]}",
@@ -257,26 +326,29 @@ def register_home_depot_workshop(
 
         if response.ok:
             log.info("Registration request was successful")
-            send_api_error_alert(
-                "Home Depot Registration",
-                f"✅ Registration successful for workshop {event_code}",
-                f"Name: {first_name} {last_name}\nEmail: {email}\nStore: {store_id}\nParticipants: {participant_count}",
+            dispatch(
+                send_slack_message,
+                f"✅ Registration successful for workshop {event_code}\n"
+                f"Name: {first_name} {last_name}\nEmail: {email}\nStore: {store_id}\n"
+                f"Participants: {participant_count}",
             )
             return True, response.text
         else:
             error_msg = f"Registration failed with status code {response.status_code}"
             log.error(error_msg)
             log.error(f"Error response: {response.text[:500]}")
-            send_api_error_alert(
+            dispatch(
+                send_api_error_alert,
                 "Home Depot Registration",
                 f"❌ Registration failed for workshop {event_code}",
                 f"Status: {response.status_code}\nName: {first_name} {last_name}\nResponse: {response.text[:500]}",
             )
             return False, response.text
-    except requests.exceptions.RequestException as e:
+    except HttpClientError as e:
         error_msg = f"Request exception occurred: {str(e)}"
         log.error(error_msg)
-        send_api_error_alert(
+        dispatch(
+            send_api_error_alert,
             "Home Depot Registration",
             f"❌ Registration request error for workshop {event_code}",
             f"Error: {str(e)}\nURL: {url}",
@@ -285,7 +357,8 @@ def register_home_depot_workshop(
     except Exception as e:
         error_msg = f"Unexpected exception during registration: {str(e)}"
         log.error(error_msg, exc_info=True)
-        send_api_error_alert(
+        dispatch(
+            send_api_error_alert,
             "Home Depot Registration",
             f"❌ Unexpected error during registration for workshop {event_code}",
             f"Error: {str(e)}",
@@ -330,351 +403,482 @@ def should_register_workshop(workshop_id, start_time, attendee_limit, remaining_
     )
 
 
-async def run2(proxy: str = None, port: int = None) -> None:
-    from playwright.async_api import async_playwright
+async def fetch_store_listing(
+    client, store_id: str, cache: ConditionalCache = None, semaphore=None
+) -> dict:
+    """
+    Fetch and validate the workshop listing of one store. Problems are alerted
+    and reported in the result instead of raised, so one store never stops
+    the others.
+    :param client: shared HttpClient
+    :param store_id: Home Depot store id
+    :param cache: optional ConditionalCache for conditional polling
+    :param semaphore: bounds how many stores are fetched at once
+    :return: dict with store_id, url, events (None when there is nothing to
+        process), headers, text, latency_ms and error
+    """
+    target_url = LISTING_URL.format(store_id=store_id)
+    result = {
+        "store_id": store_id,
+        "url": target_url,
+        "events": None,
+        "headers": {},
+        "text": "",
+        "latency_ms": None,
+        "error": None,
+    }
+    from service.alert import send_api_error_alert
 
-    target_url = (
-        "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId=7265&lang=en"
-    )
+    started = time.monotonic()
+    try:
+        async with semaphore or asyncio.Semaphore(1):
+            request_headers = cache.request_headers(target_url) if cache else {}
+            response = await asyncio.wait_for(
+                client.get(target_url, headers=request_headers), STORE_FETCH_TIMEOUT
+            )
+        result["latency_ms"] = int((time.monotonic() - started) * 1000)
 
-    async with async_playwright() as playwright:
-        context = await playwright.request.new_context()
-        try:
-            response = await context.get(target_url)
-
-            # First check if the response is valid
-            status = response.status
-            log.info(f"Response status code: {status}")
-
-            # Check for non-successful status codes
-            if status != 200:
-                error_msg = f"Home Depot API returned non-200 status code: {status}"
-                log.error(error_msg)
-                from service.alert import send_api_error_alert
-
-                send_api_error_alert(
-                    "Home Depot API",
-                    error_msg,
-                    f"URL: {target_url}\nStatus Code: {status}",
-                )
-                return
+        # First check if the response is valid
+        status = response.status_code
+        log.info(f"Store {store_id} response status code: {status} in {result['latency_ms']}ms")
 
-            # Log response headers and text content for debugging
-            headers = response.headers
-            log.info(f"Response headers: {headers}")
+        if cache and status == 304 and cache.unchanged(target_url, status):
+            log.info(f"Store {store_id} workshops not modified since last poll")
+            return result
 
-            text_content = await response.text()
-            log.info(f"Response content preview: {text_content[:200]}")
+        # Check for non-successful status codes
+        if status != 200:
+            error_msg = f"Home Depot API returned non-200 status code: {status}"
+            log.error(error_msg)
+            result["error"] = error_msg
+            dispatch(
+                send_api_error_alert,
+                "Home Depot API",
+                error_msg,
+                f"URL: {target_url}\nStatus Code: {status}",
+            )
+            return result
+
+        # Log response headers and text content for debugging
+        headers = response.headers
+        log.info(f"Response headers: {headers}")
+        text_content = response.text
+        log.info(f"Response content preview: {text_content[:200]}")
+        result["headers"], result["text"] = headers, text_content
+
+        if cache and cache.unchanged(target_url, status, text_content):
+            log.info(f"Store {store_id} workshops unchanged since last poll")
+            return result
+
+        # Only try to parse as JSON if we have content
+        if not text_content.strip():
+            error_msg = "Received empty response from Home Depot API"
+            log.error(error_msg)
+            result["error"] = error_msg
+            dispatch(send_api_error_alert, "Home Depot API", error_msg, f"URL: {target_url}")
+            return result
 
-            # Only try to parse as JSON if we have content
-            if text_content.strip():
-                try:
-                    content = await response.json()
+        try:
+            content = response.json()
+        except json.JSONDecodeError as e:
+            error_msg = f"Failed to decode JSON response: {e}"
+            log.error(error_msg)
+            log.error(f"Response content was: {text_content[:500]}")
+            result["error"] = error_msg
+            dispatch(
+                send_api_error_alert,
+                "Home Depot API",
+                "JSON parsing error",
+                f"Error: {str(e)}\nFirst 500 chars of response: {text_content[:500]}",
+            )
+            return result
 
-                    # Check if expected key exists
-                    if "workshopEventWsDTO" not in content:
-                        error_msg = "Home Depot API response missing expected 'workshopEventWsDTO' key"
-                        log.error(error_msg)
-                        from service.alert import send_api_error_alert
+        # Check if expected key exists
+        if "workshopEventWsDTO" not in content:
+            error_msg = "Home Depot API response missing expected 'workshopEventWsDTO' key"
+            log.error(error_msg)
+            result["error"] = error_msg
+            dispatch(
+                send_api_error_alert,
+                "Home Depot API",
+                error_msg,
+                f"Response Keys: {list(content.keys())}",
+            )
+            return result
 
-                        send_api_error_alert(
-                            "Home Depot API",
-                            error_msg,
-                            f"Response Keys: {list(content.keys())}",
-                        )
-                        return
-
-                    log.info(f"{json.dumps(content['workshopEventWsDTO'], indent=4)}")
-
-                    if not content.get("workshopEventWsDTO"):
-                        log.info("No workshop events found")
-                        return
-
-                    for event in content["workshopEventWsDTO"]:
-                        workshop_id = event.get("workshopId", "")
-                        event_type = event.get("workshopType", "")
-                        details = event.get("eventType", {})
-                        event_code = details.get(
-                            "workshopEventId", ""
-                        )  # FIX: get from eventType.workshopEventId
-                        seats_left = event.get("remainingSeats", 0)
-                        attendee_limit = event.get("attendeeLimit", 0)
-                        status = event.get("workshopStatus", "")
-                        title = details.get("name", "Unknown workshop")
-                        event_date = event.get("eventDate", "")
-                        start_time_str = event.get("startTime", "")
-                        start_datetime = start_time_str
-                        if start_time_str:
-                            try:
-                                # Handle ISO format with different timezone formats
-                                # For formats like 2025-08-09T08:30:00-0400
-                                if "-" in start_time_str and len(start_time_str) > 20:
-                                    # Convert -0400 format to -04:00 which fromisoformat can handle
-                                    offset_idx = start_time_str.rfind("-")
-                                    if (
-                                        offset_idx > 10
-                                    ):  # Make sure we're looking at timezone, not date
-                                        offset = start_time_str[offset_idx:]
-                                        if len(offset) == 5:  # -0400 format
-                                            new_offset = f"{offset[:3]}:{offset[3:]}"
-                                            start_time_str = (
-                                                start_time_str[:offset_idx] + new_offset
-                                            )
-                                # For Z format like 2023-12-31T14:00:00Z
-                                start_time_str = start_time_str.replace("Z", "+00:00")
-                                start_datetime = datetime.fromisoformat(start_time_str)
-                            except ValueError as e:
-                                log.warning(
-                                    f"Could not parse date '{start_time_str}': {str(e)}"
-                                )
-                                # Continue with the original string if parsing fails
-                                pass
-
-                        seats_taken = attendee_limit - seats_left
-                        log.info(
-                            f"--- Workshop: {title} | ID: {workshop_id} | Event Code: {event_code} ---"
-                        )
-                        log.info(
-                            f"    Date: {start_datetime} | Type: {event_type} | Status: {status}"
-                        )
-                        log.info(
-                            f"    Seats: {seats_left} remaining / {attendee_limit} total ({seats_taken} taken)"
-                        )
+        log.info(f"{json.dumps(content['workshopEventWsDTO'], indent=4)}")
+        if not content.get("workshopEventWsDTO"):
+            log.info(f"No workshop events found for store {store_id}")
+        result["events"] = content["workshopEventWsDTO"] or []
+        return result
+    except Exception as e:
+        result["latency_ms"] = int((time.monotonic() - started) * 1000)
+        error_msg = f"Unexpected error accessing Home Depot API: {str(e) or type(e).__name__}"
+        log.error(error_msg, exc_info=True)
+        result["error"] = error_msg
+        dispatch(
+            send_api_error_alert,
+            "Home Depot API",
+            "Unexpected error",
+            f"Error: {str(e) or type(e).__name__}\nURL: {target_url}",
+        )
+        return result
 
-                        if seats_left == 0:
-                            log.info(f"    SKIP: No seats available (fully booked)")
-                            log.info(f"    DECISION: No notification sent")
-                            continue
-                        if event_type != "KID":
-                            log.info(f"    SKIP: Not a KID workshop (type={event_type})")
-                            log.info(f"    DECISION: No notification sent")
-                            continue
-                        if status != "ACTIVE":
-                            log.info(f"    SKIP: Status is not ACTIVE (status={status})")
-                            log.info(f"    DECISION: No notification sent")
-                            continue
-
-                        # Format date early for use in storage and alerts
-                        formatted_date = start_datetime
-                        if isinstance(start_datetime, datetime):
-                            formatted_date = start_datetime.strftime(
-                                "%A, %B %d, %Y at %I:%M %p"
-                            )
 
-                        # Check if already registered or discovered
-                        from service.alert import (
-                            is_workshop_registered,
-                            save_registered_workshop,
-                            get_registered_workshops,
+async def process_workshop_event(
+    event: dict, store_id: str, registrations: RegistrationSnapshot
+) -> bool:
+    """
+    Filter one workshop event, alert when it is open and auto-register when
+    it matches should_register_workshop
+    :param event: one entry of the listing's workshopEventWsDTO
+    :param store_id: store the listing came from
+    :param registrations: this run's snapshot of the registered workshops
+    :return: False while the workshop is open and still not registered, so
+        the next poll must alert (and try to register) again
+    """
+    workshop_id = event.get("workshopId", "")
+    event_type = event.get("workshopType", "")
+    details = event.get("eventType", {})
+    event_code = details.get(
+        "workshopEventId", ""
+    )  # FIX: get from eventType.workshopEventId
+    seats_left = event.get("remainingSeats", 0)
+    attendee_limit = event.get("attendeeLimit", 0)
+    status = event.get("workshopStatus", "")
+    title = details.get("name", "Unknown workshop")
+    event_date = event.get("eventDate", "")
+    start_time_str = event.get("startTime", "")
+    start_datetime = start_time_str
+    if start_time_str:
+        try:
+            # Handle ISO format with different timezone formats
+            # For formats like 2025-08-09T08:30:00-0400
+            if "-" in start_time_str and len(start_time_str) > 20:
+                # Convert -0400 format to -04:00 which fromisoformat can handle
+                offset_idx = start_time_str.rfind("-")
+                if (
+                    offset_idx > 10
+                ):  # Make sure we're looking at timezone, not date
+                    offset = start_time_str[offset_idx:]
+                    if len(offset) == 5:  # -0400 format
+                        new_offset = f"{offset[:3]}:{offset[3:]}"
+                        start_time_str = (
+                            start_time_str[:offset_idx] + new_offset
                         )
+            # For Z format like 2023-12-31T14:00:00Z
+            start_time_str = start_time_str.replace("Z", "+00:00")
+            start_datetime = datetime.fromisoformat(start_time_str)
+        except ValueError as e:
+            log.warning(
+                f"Could not parse date '{start_time_str}': {str(e)}"
+            )
+            # Continue with the original string if parsing fails
+            pass
 
-                        # If this is a newly discovered workshop (not in storage at all), save it as discovered
-                        known_workshops = get_registered_workshops("home_depo")
-                        if event_code not in known_workshops:
-                            log.info(f"    New workshop discovered, saving to DB: {title} ({event_code})")
-                            save_registered_workshop(
-                                scraper_name="home_depo",
-                                workshop_event_id=event_code,
-                                workshop_id=workshop_id,
-                                title=title,
-                                event_date=str(formatted_date),
-                                is_registered=False,
-                            )
-                        else:
-                            log.info(f"    Workshop already known in DB: {event_code}")
+    seats_taken = attendee_limit - seats_left
+    log.info(
+        f"--- Workshop: {title} | ID: {workshop_id} | Event Code: {event_code} | Store: {store_id} ---"
+    )
+    log.info(
+        f"    Date: {start_datetime} | Type: {event_type} | Status: {status}"
+    )
+    log.info(
+        f"    Seats: {seats_left} remaining / {attendee_limit} total ({seats_taken} taken)"
+    )
 
-                        if is_workshop_registered("home_depo", event_code):
-                            log.info(
-                                f"    SKIP: Already registered for {event_code}"
-                            )
-                            log.info(f"    DECISION: No notification sent (already registered)")
-                            continue
+    if seats_left == 0:
+        log.info(f"    SKIP: No seats available (fully booked)")
+        log.info(f"    DECISION: No notification sent")
+        return True
+    if event_type != "KID":
+        log.info(f"    SKIP: Not a KID workshop (type={event_type})")
+        log.info(f"    DECISION: No notification sent")
+        return True
+    if status != "ACTIVE":
+        log.info(f"    SKIP: Status is not ACTIVE (status={status})")
+        log.info(f"    DECISION: No notification sent")
+        return True
+
+    # Format date early for use in storage and alerts
+    formatted_date = start_datetime
+    if isinstance(start_datetime, datetime):
+        formatted_date = start_datetime.strftime(
+            "%A, %B %d, %Y at %I:%M %p"
+        )
 
-                        # Workshop has open spots and is not registered
-                        # — send alert every run until registered
-                        log.info(f"    Passes all filters: seats available, KID type, ACTIVE, not yet registered")
-                        log.info("    Sending alert...")
+    # If this is a newly discovered workshop (not in storage at all), save it as discovered
+    if event_code not in registrations:
+        log.info(f"    New workshop discovered, saving to DB: {title} ({event_code})")
+        registrations.save(
+            registration_info(
+                event_code, workshop_id, title, str(formatted_date), is_registered=False
+            )
+        )
+    else:
+        log.info(f"    Workshop already known in DB: {event_code}")
 
-                        # General workshop page link
-                        workshop_page_link = (
-                            "https://www.homedepot.ca/workshops?store=7265"
-                        )
+    # Check if already registered
+    if registrations.is_registered(event_code):
+        log.info(
+            f"    SKIP: Already registered for {event_code}"
+        )
+        log.info(f"    DECISION: No notification sent (already registered)")
+        return True
 
-                        # Build a direct registration link if possible
-                        registration_link = (
-                            f"https://www.homedepot.ca/workshops?storeId=7265"
-                        )
+    # Workshop has open spots and is not registered
+    # — send alert every run until registered
+    log.info(f"    Passes all filters: seats available, KID type, ACTIVE, not yet registered")
+    log.info("    Sending alert...")
 
-                        # Send standard alert for continuity
-                        msg = f"*<{workshop_page_link}|{title}>* starts on *{start_datetime}* is open for registration: {workshop_page_link}"
-                        send_slack_message(msg)
-                        log.info(f"    DECISION: Slack notification sent")
-
-                        # Also send an urgent, high-visibility alert for time-sensitive workshops
-                        from service.alert import send_urgent_workshop_alert
-
-                        # Create workshop details for the urgent alert
-                        workshop_details = {
-                            "title": title,
-                            "date": formatted_date,
-                            "event_code": event_code,
-                            "seats_left": seats_left,
-                        }
-
-                        # Send the urgent alert with direct registration link
-                        send_urgent_workshop_alert(workshop_details, registration_link)
-
-                        # Check for specific workshops to register automatically
-                        # Use the original start time string from API for the check
-                        start_time_for_check = event.get("startTime", "")
-                        should_register, reason = should_register_workshop(
-                            workshop_id,
-                            start_time_for_check,
-                            attendee_limit,
-                            seats_left,
-                        )
-                        log.info(f"    Auto-register check: {reason}")
-                        log.info(f"    Auto-register decision: {'YES' if should_register else 'NO'}")
-
-                        if should_register:
-                            registration_msg = (
-                                f"🎯 Auto-registering for workshop:\n"
-                                f"• Event Code: *{event_code}*\n"
-                                f"• Workshop ID: *{workshop_id}*\n"
-                                f"• Title: *{title}*\n"
-                                f"• Date: *{formatted_date}*\n"
-                                f"• Seats Left: *{seats_left}*\n"
-                                f"• Reason: {reason}"
-                            )
-                            log.info(registration_msg)
-                            send_slack_message(registration_msg)
+    # General workshop page link
+    workshop_page_link = (
+        f"https://www.homedepot.ca/workshops?store={store_id}"
+    )
 
-                            log.info(
-                                f"Registering workshop - Event Code: {event_code}, Workshop Event ID: {event_code}..."
-                            )
-                            success, response = register_home_depot_workshop(
-                                workshop_id, event_code
-                            )
-                            if success:
-                                # Save the registration to storage
-                                save_registered_workshop(
-                                    scraper_name="home_depo",
-                                    workshop_event_id=event_code,
-                                    workshop_id=workshop_id,
-                                    title=title,
-                                    event_date=str(formatted_date),
-                                )
-
-                                success_msg = (
-                                    f"✅ Successfully registered:\n"
-                                    f"• Event: *{title}*\n"
-                                    f"• Workshop ID: *{workshop_id}*\n"
-                                    f"• Workshop Event ID: *{event_code}*\n"
-                                    f"• Date: *{formatted_date}*\n"
-                                    f"• Link: {registration_link}"
-                                )
-                                log.info(success_msg)
-                                send_slack_message(success_msg)
-                            else:
-                                error_msg = (
-                                    f"❌ Registration failed for:\n"
-                                    f"• Event: *{title}*\n"
-                                    f"• Workshop ID: *{workshop_id}*\n"
-                                    f"• Workshop Event ID: *{event_code}*\n"
-                                    f"• Error: {response}"
-                                )
-                                log.error(error_msg)
-                                send_slack_message(error_msg)
-                        else:
-                            # Send notification that registration was skipped with reason
-                            skip_msg = (
-                                f"⏭️ Skipping auto-registration:\n"
-                                f"• Event: *{title}*\n"
-                                f"• Workshop ID: *{workshop_id}*\n"
-                                f"• Date: *{formatted_date}*\n"
-                                f"• Seats Left: *{seats_left}*\n"
-                                f"• Reason: {reason}"
-                            )
-                            log.info(skip_msg)
-                            send_slack_message(skip_msg)
-                except json.JSONDecodeError as e:
-                    error_msg = f"Failed to decode JSON response: {e}"
-                    log.error(error_msg)
-                    log.error(f"Response content was: {text_content[:500]}")
-                    from service.alert import send_api_error_alert
-
-                    send_api_error_alert(
-                        "Home Depot API",
-                        "JSON parsing error",
-                        f"Error: {str(e)}\nFirst 500 chars of response: {text_content[:500]}",
-                    )
-                    return
-            else:
-                error_msg = "Received empty response from Home Depot API"
-                log.error(error_msg)
-                from service.alert import send_api_error_alert
-
-                send_api_error_alert("Home Depot API", error_msg, f"URL: {target_url}")
-                return
-        except Exception as e:
-            error_msg = f"Unexpected error accessing Home Depot API: {str(e)}"
-            log.error(error_msg, exc_info=True)
-            from service.alert import send_api_error_alert
-
-            send_api_error_alert(
-                "Home Depot API",
-                "Unexpected error",
-                f"Error: {str(e)}\nURL: {target_url}",
+    # Build a direct registration link if possible
+    registration_link = (
+        f"https://www.homedepot.ca/workshops?storeId={store_id}"
+    )
+
+    # Send standard alert for continuity
+    msg = f"*<{workshop_page_link}|{title}>* starts on *{start_datetime}* is open for registration: {workshop_page_link}"
+    dispatch(send_slack_message, msg)
+    log.info(f"    DECISION: Slack notification sent")
+
+    # Also send an urgent, high-visibility alert for time-sensitive workshops
+    from service.alert import send_urgent_workshop_alert
+
+    # Create workshop details for the urgent alert
+    workshop_details = {
+        "title": title,
+        "date": formatted_date,
+        "event_code": event_code,
+        "seats_left": seats_left,
+    }
+
+    # Send the urgent alert with direct registration link
+    dispatch(send_urgent_workshop_alert, workshop_details, registration_link)
+
+    # Check for specific workshops to register automatically
+    # Use the original start time string from API for the check
+    start_time_for_check = event.get("startTime", "")
+    should_register, reason = should_register_workshop(
+        workshop_id,
+        start_time_for_check,
+        attendee_limit,
+        seats_left,
+    )
+    log.info(f"    Auto-register check: {reason}")
+    log.info(f"    Auto-register decision: {'YES' if should_register else 'NO'}")
+
+    if should_register:
+        registration_msg = (
+            f"🎯 Auto-registering for workshop:\n"
+            f"• Event Code: *{event_code}*\n"
+            f"• Workshop ID: *{workshop_id}*\n"
+            f"• Title: *{title}*\n"
+            f"• Date: *{formatted_date}*\n"
+            f"• Seats Left: *{seats_left}*\n"
+            f"• Reason: {reason}"
+        )
+        log.info(registration_msg)
+        dispatch(send_slack_message, registration_msg)
+
+        log.info(
+            f"Registering workshop - Event Code: {event_code}, Workshop Event ID: {event_code}..."
+        )
+        success, response = await register_home_depot_workshop(
+            workshop_id, event_code, store_id=store_id
+        )
+        if success:
+            # Save the registration to storage, written immediately
+            registrations.save(
+                registration_info(event_code, workshop_id, title, str(formatted_date))
             )
-            return
 
+            success_msg = (
+                f"✅ Successfully registered:\n"
+                f"• Event: *{title}*\n"
+                f"• Workshop ID: *{workshop_id}*\n"
+                f"• Workshop Event ID: *{event_code}*\n"
+                f"• Date: *{formatted_date}*\n"
+                f"• Link: {registration_link}"
+            )
+            log.info(success_msg)
+            dispatch(send_slack_message, success_msg)
+            return True
+        else:
+            error_msg = (
+                f"❌ Registration failed for:\n"
+                f"• Event: *{title}*\n"
+                f"• Workshop ID: *{workshop_id}*\n"
+                f"• Workshop Event ID: *{event_code}*\n"
+                f"• Error: {response}"
+            )
+            log.error(error_msg)
+            dispatch(send_slack_message, error_msg)
+    else:
+        # Send notification that registration was skipped with reason
+        skip_msg = (
+            f"⏭️ Skipping auto-registration:\n"
+            f"• Event: *{title}*\n"
+            f"• Workshop ID: *{workshop_id}*\n"
+            f"• Date: *{formatted_date}*\n"
+            f"• Seats Left: *{seats_left}*\n"
+            f"• Reason: {reason}"
+        )
+        log.info(skip_msg)
+        dispatch(send_slack_message, skip_msg)
+    return False
 
-SCRAPER_NAME = "home_depo"
 
+async def run2(
+    proxy: str = None,
+    port: int = None,
+    conditional: bool = False,
+    store_ids: list = None,
+) -> None:
+    """
+    Poll the workshops API of every store, alert on open KID workshops and
+    auto-register
+    :param proxy:
+    :param port:
+    :param conditional: send ETag/Last-Modified validators and skip a store
+        when its listing has not changed since the last handled poll
+    :param store_ids: stores to watch, HOME_DEPOT_STORES by default
+    :return:
+    """
+    configure_notifier(SCRAPER_NAME)
+    store_ids = store_ids or HOME_DEPOT_STORES
+    cache = ConditionalCache() if conditional else None
+    client = get_http_client()
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    # Slack alerts are stored in the outbox, sent in the background and
+    # drained when the pass is over (or posted as one digest, see ALERT_DIGEST)
+    dispatcher = AlertDispatcher(
+        digest=AlertDigest.for_scraper(SCRAPER_NAME), outbox=get_outbox()
+    )
+    # registrations are read once per pass, discoveries written when it ends
+    registrations = get_store().snapshot(SCRAPER_NAME)
+    async with dispatcher as alerts:
+        with registrations:
+            with stage("fetch"):
+                results = await asyncio.gather(
+                    *(fetch_store_listing(client, store_id, cache, semaphore) for store_id in store_ids)
+                )
+            report = {
+                result["store_id"]: {
+                    "latency_ms": result["latency_ms"],
+                    "events": None if result["events"] is None else len(result["events"]),
+                    "error": result["error"],
+                }
+                for result in results
+            }
+            failures = [store_id for store_id, item in report.items() if item["error"]]
+            log.info(f"Fetched {len(results)} store(s), {len(failures)} failed: {report}")
+
+            # one processing pass over the merged listings
+            with stage("process"):
+                for result in results:
+                    if result["events"] is None:
+                        continue
+                    unsettled = 0
+                    try:
+                        for event in result["events"]:
+                            settled = await process_workshop_event(
+                                event, result["store_id"], registrations
+                            )
+                            unsettled += not settled
+                    except Exception as e:
+                        error_msg = f"Unexpected error processing Home Depot workshops: {str(e)}"
+                        log.error(error_msg, exc_info=True)
+                        from service.alert import send_api_error_alert
 
-def _get_db_conn():
-    import psycopg2
-    url = os.environ.get("POSTGRES_URL", "")
-    if "sslmode" not in url:
-        url += "?sslmode=require"
-    return psycopg2.connect(url)
+                        dispatch(
+                            send_api_error_alert,
+                            "Home Depot API",
+                            "Unexpected error",
+                            f"Error: {str(e)}\nURL: {result['url']}",
+                        )
+                        continue
+
+                    # only a fully handled listing may short-circuit the next poll:
+                    # open workshops not registered yet are alerted on (and
+                    # retried) every poll
+                    if cache and not unsettled:
+                        cache.store(result["url"], result["headers"], result["text"])
+                    elif cache:
+                        log.info(
+                            f"Store {result['store_id']}: {unsettled} open workshop(s) "
+                            f"not registered, listing not cached"
+                        )
+
+    log.info(f"Slack dispatch: {alerts.stats()}")
+
+
+def poll_interval(now: datetime) -> int:
+    """
+    Seconds until the next daemon poll: every 10 minutes in the Monday
+    10am-1pm (UTC-6) release window, hourly otherwise. HOME_DEPOT_POLL_SECONDS
+    pins a fixed interval instead.
+    """
+    fixed = os.environ.get("HOME_DEPOT_POLL_SECONDS")
+    if fixed:
+        return int(fixed)
+    utc = now.astimezone(timezone.utc)
+    if utc.weekday() == 0 and 16 <= utc.hour < 20:
+        return 600
+    return 3600
 
 
-def write_run_log(started_at: float, status: str, message: str) -> None:
-    duration_ms = int((time.time() - started_at) * 1000)
+async def poll_once() -> None:
+    """
+    One conditional poll plus its run log, as cron would have done it. The
+    run log is buffered and written in bulk by the telemetry writer.
+    """
+    run_log = get_telemetry().start_run(SCRAPER_NAME)
     try:
-        conn = _get_db_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO scraper_runs (scraper_id, started_at, duration_ms, status, message)
-            VALUES (%s, to_timestamp(%s), %s, %s, %s)
-            """,
-            (SCRAPER_NAME, started_at, duration_ms, status, message[:500]),
-        )
-        cur.execute(
-            """
-            UPDATE scrapers SET
-                last_run_at = to_timestamp(%s),
-                last_run_duration_ms = %s,
-                last_run_status = %s,
-                last_run_message = %s
-            WHERE id = %s
-            """,
-            (started_at, duration_ms, status, message[:500], SCRAPER_NAME),
-        )
-        conn.commit()
-        conn.close()
+        await run2(conditional=True)
+        run_log.finish("success", "completed")
     except Exception as e:
-        log.warning(f"Could not write run log: {e}")
+        run_log.finish("fail", str(e))
+        raise
+    finally:
+        log.info(f"HTTP latency: {get_http_client().stats()}")
+        log.info(f"Slack user cache: {get_user_cache_stats()}")
+        log.info(f"Slack rate limits: {get_slack_stats()}")
+        log.info(f"DB latency: {db.query_stats()}")
+        log.info(f"Run telemetry: {get_telemetry().stats()}")
+
+
+async def shutdown() -> None:
+    await get_http_client().close()
+    # last flush before the pool it writes through is closed
+    await asyncio.to_thread(get_telemetry().close)
+    db.close_pool()
+
+
+async def daemon(max_polls: int = None) -> None:
+    """
+    Stay resident and poll on poll_interval, keeping the HTTP client, Slack
+    client and Postgres connection warm between polls. Stops cleanly on
+    SIGTERM and writes a heartbeat to storage/home_depo.heartbeat.json.
+    :param max_polls: stop after this many polls
+    :return:
+    """
+    await PollingDaemon(
+        SCRAPER_NAME, poll_once, interval=poll_interval, on_shutdown=shutdown
+    ).run(max_polls=max_polls)
 
 
 if __name__ == "__main__":
-    started_at = time.time()
     loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(run2())
-        write_run_log(started_at, "success", "completed")
-    except Exception as e:
-        write_run_log(started_at, "fail", str(e))
-        raise
+    if "--daemon" in sys.argv:
+        loop.run_until_complete(daemon())
+    else:
+        try:
+            loop.run_until_complete(poll_once())
+        finally:
+            loop.run_until_complete(shutdown())
@@ -21,14 +21,18 @@ if platform.system() != "Darwin":
 from datetime import datetime, timedelta
 
 import nest_asyncio
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
 
 from service.alert import (
     send_slack_message,
     get_last_alert_date,
     update_last_alert_date,
 )
+from service.alert_queue import dispatch
+from service.browser_pool import get_pool, shutdown_pools
+from service.extract import extract_records
+from service.readiness import PageReadiness
+from service.interception import RequestBlocker
+from service.notifiers import configure_notifier
 
 SCRAPER_NAME = "library_event"
 
@@ -44,24 +48,62 @@ class Scraper:
     def __init__(self, launch_options: dict) -> None:
         self.page = None
         self.browser = None
+        self.lease = None
+        self.readiness = None
+        self.blocker = None
         self.options = launch_options.get("options")
         self.viewPort = launch_options.get("viewPort")
 
+    async def close(self) -> None:
+        """
+        Hand the page's incognito context back to the shared browser pool
+        :return:
+        """
+        if self.blocker:
+            log.info(f"Request blocking: {self.blocker.stats()}")
+        if self.lease:
+            await get_pool(self.options).release(self.lease)
+            self.lease = None
+
     async def goto(self, url: str) -> None:
-        self.browser = await launch(options=self.options)
-        self.page = await self.browser.newPage()
+        self.lease = await get_pool(self.options).acquire()
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         await self.page.setUserAgent(
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/119.0",
         )
-        # make scraper stealth
+        # make scraper stealth, imported here so pyppeteer only loads when a page is opened
+        from pyppeteer_stealth import stealth
+
         await stealth(self.page)
+        # abort images, fonts, media and trackers the scrape never reads
+        self.blocker = RequestBlocker("library_event")
+        await self.blocker.attach(self.page)
+        # track network activity from the first request on
+        self.readiness = PageReadiness(self.page)
         await self.page.goto(url)
 
-        # wait for specific time
-        await self.page.waitFor(5000)
+        # wait for the event cards, or for the page to go quiet when there are none
+        await self.readiness.wait(
+            selector="div.day-event-card",
+            network_idle_ms=1000,
+            mode="any",
+            deadline_ms=5000,
+            label="library_event.events",
+        )
+
+    async def extract_records(self, selector: str, schema: dict) -> list:
+        """
+        Extract one dict per element matching selector in a single page.evaluate
+        :param selector: CSS selector of the record elements
+        :param schema: output key -> selector (or {"selector", "attr"}) of each field
+        :return:
+        """
+        return await extract_records(self.page, selector, schema)
 
 
 async def run(proxy: str = None, port: int = None) -> None:
+    configure_notifier(SCRAPER_NAME)
     # define launch option
     launch_options = {
         "options": {
@@ -83,84 +125,78 @@ async def run(proxy: str = None, port: int = None) -> None:
 
     # Initialize the new scraper
     scraper = Scraper(launch_options)
-
-    # Navigate to the target
-    location = "3090"  # Round Prairie Library
-    start_date = datetime.now().strftime("%Y-%m-%d")
-    end_date = (datetime.now() + timedelta(days=180)).date().strftime("%Y-%m-%d")
-    keywords = "code+club"
-    target_url = f"https://saskatoonlibrary.ca/events-guide/results/?startDate={start_date}&endDate={end_date}&ages=all&locations={location}&types=all&keyword={keywords}"
-
-    log.info(f"Navigate to: {target_url}")
-    await scraper.goto(target_url)
-
-    log.info("Start scraping events for Round Prairie Library ...")
-    # result_elem = await scraper.page.querySelector("div.day-event-card")
-    # if result_elem is None:
-    #     log.info("Failed to find any events.")
-    #     await scraper.browser.close()
-    #     return
-    # result = await result_elem.getProperty("textContent")
-    # result_str = await result.jsonValue()
-    # if "There are no results for your search." in result_str:
-    #     log.info("There are no results for your search. Please adjust the filters and try again. ")
-    #     await scraper.browser.close()
-    #     return
-    event_elements = await scraper.page.querySelectorAll("div.day-event-card")
-    for event in event_elements:
-
-        title_elem = await event.querySelector("h3")
-        title = await title_elem.getProperty("textContent")
-        title_str = await title.jsonValue()
-
-        status_elem = await event.querySelector("div.card-reg")
-        status = await status_elem.getProperty("textContent")
-        status_str = await status.jsonValue()
-
-        dow_elem = await event.querySelector("span.event-dow")
-        dow = await dow_elem.getProperty("textContent")
-        dow_str = await dow.jsonValue()
-
-        event_date_elem = await event.querySelector("span.event-date")
-        event_date = await event_date_elem.getProperty("textContent")
-        event_date_str = await event_date.jsonValue()
-
-        event_month_elem = await event.querySelector("span.event-month")
-        event_month = await event_month_elem.getProperty("textContent")
-        event_month_str = await event_month.jsonValue()
-
-        try:
-            event_month_int = int(event_month_str)
-            event_month_str = event_month_int + 1
-        except Exception as err:
-            log.error(f"Failed to convert month of {event_month_str} to 1-based")
-
-        start_str = f"{event_month_str}-{event_date_str}, {dow_str}"
-
-        log.info(f"{title_str} starts on {start_str}: {status_str}")
-        if "full" in status_str.lower() or "closed" in status_str.lower():
-            log.info("Event is not open for registration!")
-            continue
-        else:
-            log.info(f"{title_str} is open for registration: {status_str}")
-            reg_elem = await event.querySelector("div[class='card-reg future'")
-            reg_details = await reg_elem.getProperty("textContent")
-            reg_details_str = await reg_details.jsonValue()
-
-            location_elem = await event.querySelector("strong")
-            location_details = await location_elem.getProperty("textContent")
-            location_str = await location_details.jsonValue()
-            location_link = f"[{location_str}](https://www.google.com/maps/place/{location_str.replace(' ', '+')}/{MAP_DATA})"
-
-            event_detail = f"{reg_details_str} at {location_link}"
-            event_found = {
-                "title": title_str,
-                "start": start_str,
-                "status": event_detail
-            }
-            send_library_event_alert(event_found, target_url)
-            break
-    await scraper.browser.close()
+    try:
+        # Navigate to the target
+        location = "3090"  # Round Prairie Library
+        start_date = datetime.now().strftime("%Y-%m-%d")
+        end_date = (datetime.now() + timedelta(days=180)).date().strftime("%Y-%m-%d")
+        keywords = "code+club"
+        target_url = f"https://saskatoonlibrary.ca/events-guide/results/?startDate={start_date}&endDate={end_date}&ages=all&locations={location}&types=all&keyword={keywords}"
+
+        log.info(f"Navigate to: {target_url}")
+        await scraper.goto(target_url)
+
+        log.info("Start scraping events for Round Prairie Library ...")
+        # result_elem = await scraper.page.querySelector("div.day-event-card")
+        # if result_elem is None:
+        #     log.info("Failed to find any events.")
+        #     await scraper.close()
+        #     return
+        # result = await result_elem.getProperty("textContent")
+        # result_str = await result.jsonValue()
+        # if "There are no results for your search." in result_str:
+        #     log.info("There are no results for your search. Please adjust the filters and try again. ")
+        #     await scraper.close()
+        #     return
+        events = await scraper.extract_records(
+            "div.day-event-card",
+            {
+                "title": "h3",
+                "status": "div.card-reg",
+                "dow": "span.event-dow",
+                "date": "span.event-date",
+                "month": "span.event-month",
+                "reg_details": "div[class='card-reg future']",
+                "location": "strong",
+            },
+        )
+        for event in events:
+            title_str = event["title"] or ""
+            status_str = event["status"] or ""
+            dow_str = event["dow"]
+            event_date_str = event["date"]
+            event_month_str = event["month"]
+
+            try:
+                event_month_int = int(event_month_str)
+                event_month_str = event_month_int + 1
+            except Exception as err:
+                log.error(f"Failed to convert month of {event_month_str} to 1-based")
+
+            start_str = f"{event_month_str}-{event_date_str}, {dow_str}"
+
+            log.info(f"{title_str} starts on {start_str}: {status_str}")
+            if "full" in status_str.lower() or "closed" in status_str.lower():
+                log.info("Event is not open for registration!")
+                continue
+            else:
+                log.info(f"{title_str} is open for registration: {status_str}")
+                reg_details_str = event["reg_details"]
+                location_str = event["location"] or ""
+                location_link = f"[{location_str}](https://www.google.com/maps/place/{location_str.replace(' ', '+')}/{MAP_DATA})"
+
+                event_detail = f"{reg_details_str} at {location_link}"
+                event_found = {
+                    "title": title_str,
+                    "start": start_str,
+                    "status": event_detail
+                }
+                send_library_event_alert(event_found, target_url)
+                break
+    finally:
+        # hand the context back even when the scrape failed
+        await scraper.close()
+        await shutdown_pools()
 
 
 def send_library_event_alert(workshop: dict, link):
@@ -181,7 +217,7 @@ def send_library_event_alert(workshop: dict, link):
     current_date = datetime.now().date()
     if not alert_date or alert_date < current_date:
         log.info("Sending new alert...")
-        send_slack_message(msg)
+        dispatch(send_slack_message, msg)
         update_last_alert_date(SCRAPER_NAME, current_date)
     else:
         log.info("No alerts are needed.")
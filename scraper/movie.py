@@ -18,14 +18,18 @@ if platform.system() != "Darwin":
 from datetime import datetime
 
 import nest_asyncio
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
 
 from service.alert import (
     send_slack_message,
     get_last_alert_date,
     update_last_alert_date,
 )
+from service.alert_queue import dispatch
+from service.browser_pool import get_pool, shutdown_pools
+from service.extract import extract_records, extract_value, extract_values
+from service.readiness import PageReadiness
+from service.interception import RequestBlocker
+from service.notifiers import configure_notifier
 
 log = my_logger.CustomLogger("movie", verbose=True, log_dir="logs")
 TARGET_SITE = "https://www.1377x.to/popular-movies"
@@ -38,21 +42,48 @@ class Scraper:
     def __init__(self, launch_options: dict) -> None:
         self.page = None
         self.browser = None
+        self.lease = None
+        self.readiness = None
+        self.blocker = None
         self.options = launch_options.get("options")
         self.viewPort = launch_options.get("viewPort")
 
+    async def close(self) -> None:
+        """
+        Hand the page's incognito context back to the shared browser pool
+        :return:
+        """
+        if self.blocker:
+            log.info(f"Request blocking: {self.blocker.stats()}")
+        if self.lease:
+            await get_pool(self.options).release(self.lease)
+            self.lease = None
+
     async def goto(self, url: str) -> None:
-        self.browser = await launch(options=self.options)
-        self.page = await self.browser.newPage()
+        self.lease = await get_pool(self.options).acquire()
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         await self.page.setUserAgent(
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.4963.0 Safari/537.36",
         )
-        # make scraper stealth
+        # make scraper stealth, imported here so pyppeteer only loads when a page is opened
+        from pyppeteer_stealth import stealth
+
         await stealth(self.page)
+        # abort images, fonts, media and trackers the scrape never reads
+        self.blocker = RequestBlocker("movie")
+        await self.blocker.attach(self.page)
+        # track network activity from the first request on
+        self.readiness = PageReadiness(self.page)
         await self.page.goto(url)
 
-        # wait for specific time
-        await self.page.waitFor(10000)
+        # wait for the movie table to render
+        await self.readiness.wait(
+            selector="tbody tr",
+            network_idle_ms=1000,
+            deadline_ms=10000,
+            label="movie.table",
+        )
         # wait for element to appear
         # await self.page.waitForSelector(
         #     'span[data-title*="Kids Workshops"]', {"visible": True}
@@ -65,31 +96,34 @@ class Scraper:
 
     async def extract_many(self, selector: str, attr: str) -> list:
         """
-        Select and return a list of elements using queryAll
+        Read attr from every element matching selector in a single page.evaluate
         :param selector:
         :param attr:
         :return:
         """
-        result = []
-        elements = await self.page.querySelectorAll(selector)
-        for element in elements:
-            text = await element.getProperty(attr)
-            result.append(await text.jsonValue())
-        return result
+        return await extract_values(self.page, selector, attr)
 
     async def extract_one(self, selector: str, attr: str) -> str:
         """
-        Locate a single element using querySelector
+        Read attr from the first element matching selector, None if there is none
         :param selector:
         :param attr:
         :return:
         """
-        element = await self.page.querySelector(selector)
-        text = await element.getProperty(attr)
-        return await text.jsonValue()
+        return await extract_value(self.page, selector, attr)
+
+    async def extract_records(self, selector: str, schema: dict) -> list:
+        """
+        Extract one dict per element matching selector in a single page.evaluate
+        :param selector: CSS selector of the record elements
+        :param schema: output key -> selector (or {"selector", "attr"}) of each field
+        :return:
+        """
+        return await extract_records(self.page, selector, schema)
 
 
 async def run(proxy: str = None, port: int = None) -> None:
+    configure_notifier("movie")
     # define launch option
     launch_options = {
         "options": {
@@ -110,37 +144,38 @@ async def run(proxy: str = None, port: int = None) -> None:
 
     # Initialize the new scraper
     scraper = Scraper(launch_options)
-
-    log.info(f"Navigate to: {TARGET_SITE}")
-    await scraper.goto(TARGET_SITE)
-
-    log.info("Start scraping movies...")
-
-    movies = await scraper.page.querySelectorAll("tbody tr")
-    current_year = datetime.utcnow().year
-    log.info(f"{len(movies)} events found")
-    for movie in movies:
-        title_elem = await movie.querySelector("td.name")
-        title = await title_elem.getProperty("textContent")
-        title_str = await title.jsonValue()
-        if current_year in title_str:
-            log.info(f"Found movie: {title_str}")
-    #     status_elem = await workshop.querySelector("button")
-    #     status = await status_elem.getProperty("textContent")
-    #     status_str = await status.jsonValue()
-    #     start_elem = await workshop.querySelector("p")
-    #     start = await start_elem.getProperty("textContent")
-    #     start_str = await start.jsonValue()
-    #     log.info(f"Found event: {title_str}, status: {status_str}")
-    #     if "full" in status_str.lower() or "closed" in status_str.lower():
-    #         continue
-    #     shop = {"title": title_str, "start": start_str, "status": status_str}
-    #     if "register" in status_str.lower():
-    #         log.info(
-    #             f"{title_str} is open for registration: {status_str}, sending alert..."
-    #         )
-    #         send_alert(shop, TARGET_SITE)
-    await scraper.browser.close()
+    try:
+        log.info(f"Navigate to: {TARGET_SITE}")
+        await scraper.goto(TARGET_SITE)
+
+        log.info("Start scraping movies...")
+
+        movies = await scraper.extract_records("tbody tr", {"title": "td.name"})
+        current_year = datetime.utcnow().year
+        log.info(f"{len(movies)} events found")
+        for movie in movies:
+            title_str = movie["title"] or ""
+            if str(current_year) in title_str:
+                log.info(f"Found movie: {title_str}")
+        #     status_elem = await workshop.querySelector("button")
+        #     status = await status_elem.getProperty("textContent")
+        #     status_str = await status.jsonValue()
+        #     start_elem = await workshop.querySelector("p")
+        #     start = await start_elem.getProperty("textContent")
+        #     start_str = await start.jsonValue()
+        #     log.info(f"Found event: {title_str}, status: {status_str}")
+        #     if "full" in status_str.lower() or "closed" in status_str.lower():
+        #         continue
+        #     shop = {"title": title_str, "start": start_str, "status": status_str}
+        #     if "register" in status_str.lower():
+        #         log.info(
+        #             f"{title_str} is open for registration: {status_str}, sending alert..."
+        #         )
+        #         send_alert(shop, TARGET_SITE)
+    finally:
+        # hand the context back even when the scrape failed
+        await scraper.close()
+        await shutdown_pools()
 
 
 def send_alert(workshop: dict, link):
@@ -160,7 +195,7 @@ def send_alert(workshop: dict, link):
     current_date = datetime.now().date()
     if not alert_date or alert_date < current_date:
         log.info("Sending new alert...")
-        send_slack_message(msg)
+        dispatch(send_slack_message, msg)
         update_last_alert_date("home_depo", current_date)
 
 
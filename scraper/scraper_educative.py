@@ -1,8 +1,22 @@
 import asyncio
+import os
+import sys
 from typing import List
 
 from pyppeteer import launch
 
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.readiness import PageReadiness
+
+# titles inside the search results list; a bare "h2" also matches the static
+# headings of the page, which are there before any result has loaded
+RESULTS_SELECTOR = (
+    "[class*='searchresult' i] h2, [class*='search-result' i] h2"
+)
+
 
 async def get_article_titles(keywords: List[str]):
     # launch browser in headless mode
@@ -12,6 +26,8 @@ async def get_article_titles(keywords: List[str]):
     page = await browser.newPage()
     # set page viewport to the largest size
     await page.setViewport({"width": 1600, "height": 900})
+    # track network activity so we can wait for search results to arrive
+    readiness = PageReadiness(page)
     # navigate to the page
     await page.goto("https://www.educative.io/edpresso")
     # locate the search box
@@ -25,9 +41,14 @@ async def get_article_titles(keywords: List[str]):
         # type keyword in search box
         await entry_box.type(keyword)
         # wait for search results to load
-        await page.waitFor(40000)
+        await readiness.wait(
+            selector=RESULTS_SELECTOR,
+            network_idle_ms=1000,
+            deadline_ms=40000,
+            label="educative.search",
+        )
         # extract the article titles
-        topics = await page.querySelectorAll("h2")
+        topics = await page.querySelectorAll(RESULTS_SELECTOR)
         for topic in topics:
             title = await topic.getProperty("textContent")
             # print the article titles
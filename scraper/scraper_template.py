@@ -1,10 +1,18 @@
 import asyncio
 import os
+import sys
 from pprint import pprint
 
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
 import nest_asyncio
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
+
+from service.browser_pool import get_pool, shutdown_pools
+from service.extract import extract_records, extract_value, extract_values
+from service.readiness import PageReadiness
+from service.interception import RequestBlocker
 
 nest_asyncio.apply()
 
@@ -29,13 +37,28 @@ class Scraper:
     def __init__(self, launch_options: dict) -> None:
         self.page = None
         self.browser = None
+        self.lease = None
+        self.readiness = None
+        self.blocker = None
         self.options = launch_options.get("options")
         self.viewPort = launch_options.get("viewPort")
         self.proxy_auth = get_proxy_auth()
 
+    async def close(self) -> None:
+        """
+        Hand the page's incognito context back to the shared browser pool
+        :return:
+        """
+        if self.blocker:
+            print(f"[i] request blocking: {self.blocker.stats()}")
+        if self.lease:
+            await get_pool(self.options).release(self.lease)
+            self.lease = None
+
     async def goto(self, url: str) -> None:
-        self.browser = await launch(options=self.options)
-        self.page = await self.browser.newPage()
+        self.lease = await get_pool(self.options).acquire()
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         # add proxy auth
         # await self.page.authenticate(
         #     {
@@ -46,15 +69,24 @@ class Scraper:
         await self.page.setUserAgent(
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.5 Safari/605.1.15",
         )
-        # make scraper stealth
+        # make scraper stealth, imported here so pyppeteer only loads when a page is opened
+        from pyppeteer_stealth import stealth
+
         await stealth(self.page)
         await self.page.setViewport(
             self.viewPort) if self.viewPort is not None else print(
             "[i] using default viewport")
+        # abort images, fonts, media and trackers the scrape never reads
+        self.blocker = RequestBlocker("default")
+        await self.blocker.attach(self.page)
+        # track network activity from the first request on
+        self.readiness = PageReadiness(self.page)
         await self.page.goto(url)
 
-        # wait for specific time
-        await self.page.waitFor(6000)
+        # wait for the page to go quiet instead of sleeping
+        await self.readiness.wait(
+            network_idle_ms=1000, deadline_ms=6000, label="template.page"
+        )
         # wait for element to appear
         # await self.page.waitForSelector('h1', {'visible': True})
 
@@ -86,28 +118,30 @@ class Scraper:
 
     async def extract_many(self, selector: str, attr: str) -> list:
         """
-        Select and return a list of elements using queryAll
+        Read attr from every element matching selector in a single page.evaluate
         :param selector:
         :param attr:
         :return:
         """
-        result = []
-        elements = await self.page.querySelectorAll(selector)
-        for element in elements:
-            text = await element.getProperty(attr)
-            result.append(await text.jsonValue())
-        return result
+        return await extract_values(self.page, selector, attr)
 
     async def extract_one(self, selector: str, attr: str) -> str:
         """
-        Locate a single element using querySelector
+        Read attr from the first element matching selector, None if there is none
         :param selector:
         :param attr:
         :return:
         """
-        element = await self.page.querySelector(selector)
-        text = await element.getProperty(attr)
-        return await text.jsonValue()
+        return await extract_value(self.page, selector, attr)
+
+    async def extract_records(self, selector: str, schema: dict) -> list:
+        """
+        Extract one dict per element matching selector in a single page.evaluate
+        :param selector: CSS selector of the record elements
+        :param schema: output key -> selector (or {"selector", "attr"}) of each field
+        :return:
+        """
+        return await extract_records(self.page, selector, schema)
 
 
 async def run(proxy: str = None, port: int = None) -> None:
@@ -138,39 +172,43 @@ async def run(proxy: str = None, port: int = None) -> None:
 
     # Initialize the new scraper
     scraper = Scraper(launch_options)
-
-    # Navigate to the target
-    target_url = "https://hotels.com/ho237271/simba-run-condos-2bed-2bath-vail-united-states-of-america/"
-    # target_url = "https://quotes.toscrape.com/"
-    if scraper.proxy_auth.get(API_URL):
-        target_url = f"{scraper.proxy_auth.get(API_URL)}/?api_key={scraper.proxy_auth.get(API_KEY)}&url=" + target_url
-    # target_url = f"https://api.webscrapingapi.com/v1/?api_key={scraper.proxy_auth.get(PROXY_API_KEY)}&url=" + target_url
-
-    pprint(f"Navigate to: {target_url}")
-    await scraper.goto(target_url)
-
-    # Type "this is me" inside the input box
-    # pprint("Type 'this is me' inside the input box")
-    # await scraper.type_value("#fish", "this is me")
-
-    # Scrape the entire page
-    # pprint("Scrape entire page")
-    # content = await scraper.get_full_content()
-    # print(content)
-
-    # Scrape one single element
-    pprint("Scrape one single element")
-    elem = await scraper.extract_one("h1", "textContent")
-    print(elem)
-
-    # Scrape multiple elements
-    pprint("Scrape multiple elements")
-    elems = await scraper.extract_many("li[role=listitem", "textContent")
-    print(elems)
-
-    # Execute javascript
-    # content = await page.evaluate(
-    # 'document.body.textContent', force_expr=True)
+    try:
+        # Navigate to the target
+        target_url = "https://hotels.com/ho237271/simba-run-condos-2bed-2bath-vail-united-states-of-america/"
+        # target_url = "https://quotes.toscrape.com/"
+        if scraper.proxy_auth.get(API_URL):
+            target_url = f"{scraper.proxy_auth.get(API_URL)}/?api_key={scraper.proxy_auth.get(API_KEY)}&url=" + target_url
+        # target_url = f"https://api.webscrapingapi.com/v1/?api_key={scraper.proxy_auth.get(PROXY_API_KEY)}&url=" + target_url
+
+        pprint(f"Navigate to: {target_url}")
+        await scraper.goto(target_url)
+
+        # Type "this is me" inside the input box
+        # pprint("Type 'this is me' inside the input box")
+        # await scraper.type_value("#fish", "this is me")
+
+        # Scrape the entire page
+        # pprint("Scrape entire page")
+        # content = await scraper.get_full_content()
+        # print(content)
+
+        # Scrape one single element
+        pprint("Scrape one single element")
+        elem = await scraper.extract_one("h1", "textContent")
+        print(elem)
+
+        # Scrape multiple elements
+        pprint("Scrape multiple elements")
+        elems = await scraper.extract_many("li[role=listitem", "textContent")
+        print(elems)
+
+        # Execute javascript
+        # content = await page.evaluate(
+        # 'document.body.textContent', force_expr=True)
+    finally:
+        # hand the context back even when the scrape failed
+        await scraper.close()
+        await shutdown_pools()
 
 
 if __name__ == '__main__':
@@ -22,14 +22,18 @@ if platform.system() != "Darwin":
         sys.path.append("/home/pi/Projects/pyppeteer-scraper")
 
 import nest_asyncio
-from pyppeteer import launch
-from pyppeteer_stealth import stealth
 
 from service.alert import (
     send_slack_message,
     get_last_alert_date,
     update_last_alert_date,
 )
+from service.alert_queue import dispatch
+from service.browser_pool import get_pool, shutdown_pools
+from service.extract import extract_records
+from service.readiness import PageReadiness
+from service.interception import RequestBlocker
+from service.notifiers import configure_notifier
 
 SCRAPER_NAME = "stonebridge_event"
 
@@ -43,24 +47,62 @@ class Scraper:
     def __init__(self, launch_options: dict) -> None:
         self.page = None
         self.browser = None
+        self.lease = None
+        self.readiness = None
+        self.blocker = None
         self.options = launch_options.get("options")
         self.viewPort = launch_options.get("viewPort")
 
+    async def close(self) -> None:
+        """
+        Hand the page's incognito context back to the shared browser pool
+        :return:
+        """
+        if self.blocker:
+            log.info(f"Request blocking: {self.blocker.stats()}")
+        if self.lease:
+            await get_pool(self.options).release(self.lease)
+            self.lease = None
+
     async def goto(self, url: str) -> None:
-        self.browser = await launch(options=self.options)
-        self.page = await self.browser.newPage()
+        self.lease = await get_pool(self.options).acquire()
+        self.browser = self.lease.browser
+        self.page = self.lease.page
         await self.page.setUserAgent(
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/119.0",
         )
-        # make scraper stealth
+        # make scraper stealth, imported here so pyppeteer only loads when a page is opened
+        from pyppeteer_stealth import stealth
+
         await stealth(self.page)
+        # abort images, fonts, media and trackers the scrape never reads
+        self.blocker = RequestBlocker("stonebridge_event")
+        await self.blocker.attach(self.page)
+        # track network activity from the first request on
+        self.readiness = PageReadiness(self.page)
         await self.page.goto(url)
 
-        # wait for specific time
-        await self.page.waitFor(5000)
+        # wait for the events menu, or for the page to go quiet without it
+        await self.readiness.wait(
+            selector="#menu-item-2452 li",
+            network_idle_ms=1000,
+            mode="any",
+            deadline_ms=5000,
+            label="stonebridge_event.menu",
+        )
+
+    async def extract_records(self, selector: str, schema: dict) -> list:
+        """
+        Extract one dict per element matching selector in a single page.evaluate
+        :param selector: CSS selector of the record elements
+        :param schema: output key -> selector (or {"selector", "attr"}) of each field
+        :return:
+        """
+        return await extract_records(self.page, selector, schema)
 
 
 async def run(proxy: str = None, port: int = None) -> None:
+    configure_notifier(SCRAPER_NAME)
     # define launch option
     launch_options = {
         "options": {
@@ -81,30 +123,32 @@ async def run(proxy: str = None, port: int = None) -> None:
 
     # Initialize the new scraper
     scraper = Scraper(launch_options)
-    target_url = "https://www.ourstonebridge.ca/"
-
-    log.info(f"Navigate to: {target_url}")
-    await scraper.goto(target_url)
-
-    log.info("Start Stonebridge events...")
-
-    event_elements = await scraper.page.querySelectorAll("#menu-item-2452 li")
-    for event in event_elements:
-        title_elem = await event.querySelector("a")
-        title = await title_elem.getProperty("textContent")
-        title_str = await title.jsonValue()
-        log.info(f"Going through event: {title_str}")
-
-        if "2025" in title_str and "winter" in title_str.lower():
-            # if "summer" in title_str.lower() or "winter" in title_str.lower() or "fall" in title_str.lower():
-            if ((
-                    "soccer" in title_str.lower() or "basketball" in title_str.lower())
-                    and "kinder" not in title_str.lower()):
-                log.info(f"Found potential events: {title_str}")
-                event_found = {"title": title_str, "start": "", "status": ""}
-                send_stonebridge_event_alert(event_found, target_url)
-                break
-    await scraper.browser.close()
+    try:
+        target_url = "https://www.ourstonebridge.ca/"
+
+        log.info(f"Navigate to: {target_url}")
+        await scraper.goto(target_url)
+
+        log.info("Start Stonebridge events...")
+
+        events = await scraper.extract_records("#menu-item-2452 li", {"title": "a"})
+        for event in events:
+            title_str = event["title"] or ""
+            log.info(f"Going through event: {title_str}")
+
+            if "2025" in title_str and "winter" in title_str.lower():
+                # if "summer" in title_str.lower() or "winter" in title_str.lower() or "fall" in title_str.lower():
+                if ((
+                        "soccer" in title_str.lower() or "basketball" in title_str.lower())
+                        and "kinder" not in title_str.lower()):
+                    log.info(f"Found potential events: {title_str}")
+                    event_found = {"title": title_str, "start": "", "status": ""}
+                    send_stonebridge_event_alert(event_found, target_url)
+                    break
+    finally:
+        # hand the context back even when the scrape failed
+        await scraper.close()
+        await shutdown_pools()
 
 
 def send_stonebridge_event_alert(workshop: dict, link):
@@ -123,7 +167,7 @@ def send_stonebridge_event_alert(workshop: dict, link):
     current_date = datetime.now().date()
     if not alert_date or alert_date < current_date:
         log.info("Sending new alert...")
-        send_slack_message(msg)
+        dispatch(send_slack_message, msg)
         update_last_alert_date(SCRAPER_NAME, current_date)
     else:
         log.info("No alerts are needed!")
@@ -0,0 +1,295 @@
+"""
+Alert-path benchmark against a local fake Slack.
+
+Starts an HTTP server that answers the Slack Web API methods the alerts use
+(chat.postMessage, pins.add, users.list, files.upload) after a configurable
+latency, answering a share of the requests with 429 ratelimited, points
+``service.alert`` at it through SLACK_API_URL and drives the real senders:
+
+    python scripts/alert_benchmark.py                         # every scenario
+    python scripts/alert_benchmark.py urgent ircc -n 200 --latency-ms 80 --error-rate 0.05
+    python scripts/alert_benchmark.py dispatch --cold-cache
+
+For every scenario it prints p50/p95/p99 of the whole alert (end to end), of
+each Slack call it made, and of the local work in between (Block Kit
+rendering, owner cache, logging). ``dispatch`` queues the alerts on an
+AlertDispatcher instead and reports how long the caller was blocked and how
+long the queue took to drain. Nothing leaves the machine.
+
+The Slack rate limits are lifted by default so the numbers show the alert
+code rather than the token buckets; pass --slack-limits to keep them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+COUNT = 50
+LATENCY_MS = 50.0
+JITTER_MS = 20.0
+# token bucket that never runs dry, (requests per second, burst)
+UNLIMITED = (1e9, 1e9)
+
+WORKSHOP = {
+    "title": "Kids Workshop: Build a Birdhouse",
+    "date": "2026-11-07",
+    "event_code": "KW-1107",
+    "seats_left": 4,
+}
+
+SCENARIOS = {
+    "urgent": (
+        "send_urgent_workshop_alert",
+        (WORKSHOP, "https://www.homedepot.ca/workshops?store=7265"),
+    ),
+    "ircc": (
+        "send_ircc_status_card",
+        (
+            "Provincial Nominees · Online via Express Entry",
+            "6 months",
+            "About 400 people ahead of you",
+            "12,345",
+            "2026-10-14",
+            "https://www.canada.ca/en/immigration-refugees-citizenship/services/application/check-processing-times.html",
+        ),
+    ),
+    "message": ("send_slack_message", ("Item is back in stock",)),
+    "error": ("send_api_error_alert", ("Home Depot API", "HTTP 503", "benchmark")),
+}
+
+FAKE_RESPONSES = {
+    "chat.postMessage": {"ok": True, "channel": "C0BENCH"},
+    "users.list": {
+        "ok": True,
+        "members": [
+            {"id": "U0BENCH", "real_name": "Owner", "is_owner": True},
+            {"id": "U1BENCH", "real_name": "Member"},
+        ],
+        "response_metadata": {"next_cursor": ""},
+    },
+    "files.upload": {"ok": True, "file": {"id": "F0BENCH"}},
+}
+
+
+class FakeSlack:
+    """Slack Web API stand-in with configurable latency and 429 rate."""
+
+    def __init__(
+        self,
+        latency_ms: float = LATENCY_MS,
+        jitter_ms: float = JITTER_MS,
+        error_rate: float = 0.0,
+        port: int = 0,
+    ) -> None:
+        fake = self
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = {}
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                status, body = fake.answer(method)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/"
+
+    def answer(self, method: str) -> tuple:
+        with self.lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+        if random.random() < self.error_rate:
+            return 429, {"ok": False, "error": "ratelimited"}
+        body = dict(FAKE_RESPONSES.get(method, {"ok": True}))
+        if method == "chat.postMessage":
+            body["ts"] = f"{time.time():.6f}"
+        return 200, body
+
+    def start(self) -> "FakeSlack":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99 in ms, the single value when there is one sample"""
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def _row(label: str, samples: list) -> str:
+    p = percentiles(samples)
+    return (
+        f"    {label:<22} n={len(samples):<5} p50 {p['p50']:8.2f}ms  "
+        f"p95 {p['p95']:8.2f}ms  p99 {p['p99']:8.2f}ms"
+    )
+
+
+def _timed_limiter(slack_limits: bool, calls: list):
+    """Rate limiter recording (method, ms) of every Slack call into ``calls``."""
+    from service.slack_limits import METHOD_LIMITS, SlackRateLimiter
+
+    class TimedLimiter(SlackRateLimiter):
+        def call(self, method, request):
+            started = time.perf_counter()
+            try:
+                return super().call(method, request)
+            finally:
+                calls.append((method, (time.perf_counter() - started) * 1000))
+
+    if slack_limits:
+        return TimedLimiter()
+    return TimedLimiter(limits={method: UNLIMITED for method in METHOD_LIMITS})
+
+
+def run_scenario(name: str, count: int, slack_limits: bool, cold_cache: bool) -> dict:
+    """
+    Send ``count`` alerts of one scenario
+    :return: {"end_to_end": [ms], "local": [ms], "<method>": [ms], "failed": n}
+    """
+    import service.alert
+
+    calls = []
+    service.alert.rate_limiter = _timed_limiter(slack_limits, calls)
+    sender_name, args = SCENARIOS[name]
+    sender = getattr(service.alert, sender_name)
+    result = {"end_to_end": [], "local": [], "failed": 0}
+    for _ in range(count):
+        if cold_cache and os.path.exists(service.alert.USER_CACHE_FILE):
+            os.remove(service.alert.USER_CACHE_FILE)
+        del calls[:]
+        started = time.perf_counter()
+        ok = sender(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        result["failed"] += ok is False
+        result["end_to_end"].append(elapsed)
+        result["local"].append(elapsed - sum(ms for _, ms in calls))
+        for method, ms in calls:
+            result.setdefault(method, []).append(ms)
+    return result
+
+
+def run_dispatch(count: int, slack_limits: bool, cold_cache: bool) -> dict:
+    """
+    Queue ``count`` urgent alerts on an AlertDispatcher
+    :return: {"submit": [ms], "drain_ms": ms, "stats": dispatcher stats}
+    """
+    import service.alert
+    from service.alert_queue import AlertDispatcher, dispatch
+
+    service.alert.rate_limiter = _timed_limiter(slack_limits, [])
+    if cold_cache and os.path.exists(service.alert.USER_CACHE_FILE):
+        os.remove(service.alert.USER_CACHE_FILE)
+    sender_name, args = SCENARIOS["urgent"]
+    sender = getattr(service.alert, sender_name)
+
+    async def scenario():
+        submit = []
+        dispatcher = AlertDispatcher(maxsize=count + 1, drain_timeout=count * 10)
+        async with dispatcher:
+            for _ in range(count):
+                started = time.perf_counter()
+                dispatch(sender, *args)
+                submit.append((time.perf_counter() - started) * 1000)
+            drain_started = time.perf_counter()
+        drain_ms = (time.perf_counter() - drain_started) * 1000
+        return {"submit": submit, "drain_ms": drain_ms, "stats": dispatcher.stats()}
+
+    return asyncio.run(scenario())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenarios", nargs="*", help=f"{', '.join(SCENARIOS)}, dispatch (default: all)")
+    parser.add_argument("-n", "--count", type=int, default=COUNT)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered 429")
+    parser.add_argument("--slack-limits", action="store_true", help="keep the client-side rate limits")
+    parser.add_argument("--cold-cache", action="store_true", help="look the owner up on every alert")
+    options = parser.parse_args(argv)
+    scenarios = options.scenarios or [*SCENARIOS, "dispatch"]
+    unknown = [name for name in scenarios if name not in SCENARIOS and name != "dispatch"]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    fake = FakeSlack(options.latency_ms, options.jitter_ms, options.error_rate).start()
+    workdir = tempfile.TemporaryDirectory()
+    # must be set before service.alert is imported
+    os.environ.update(
+        {
+            "SLACK_API_URL": fake.url,
+            "SLACK_API_TOKEN": "xoxb-benchmark",
+            "CHANNEL_ID": "C0BENCH",
+            "NOTIFIER": "slack",
+            "SLACK_USER_CACHE_FILE": os.path.join(workdir.name, "slack_users.json"),
+        }
+    )
+    print(
+        f"fake Slack at {fake.url}: latency {options.latency_ms:.0f}±{options.jitter_ms:.0f}ms, "
+        f"429 rate {options.error_rate:.0%}, {options.count} alert(s) per scenario"
+    )
+    try:
+        for name in scenarios:
+            started = time.perf_counter()
+            if name == "dispatch":
+                result = run_dispatch(options.count, options.slack_limits, options.cold_cache)
+                print(f"dispatch ({result['stats']})")
+                print(_row("submit (caller)", result["submit"]))
+                print(f"    {'drain':<22} {result['drain_ms']:.1f}ms")
+                continue
+            result = run_scenario(name, options.count, options.slack_limits, options.cold_cache)
+            wall = time.perf_counter() - started
+            print(
+                f"{name} ({SCENARIOS[name][0]}): {options.count / wall:.1f} alerts/s, "
+                f"{result['failed']} failed"
+            )
+            print(_row("end to end", result.pop("end_to_end")))
+            print(_row("local work", result.pop("local")))
+            result.pop("failed")
+            for method, samples in sorted(result.items()):
+                print(_row(method, samples))
+    finally:
+        fake.stop()
+        workdir.cleanup()
+    print(f"requests served: {fake.requests}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Cold-start import benchmark for the scraper entry points.
+
+Every scraper module is imported in a fresh interpreter under
+``python -X importtime`` a few times; the median import time of the module and
+the wall time of the whole interpreter are reported next to the module's
+slowest imports, and any heavy dependency (Slack SDK, browsers, HTTP stacks)
+that is imported eagerly is flagged:
+
+    python scripts/import_benchmark.py                 # all scrapers
+    python scripts/import_benchmark.py home_depo 10    # one scraper, 10 runs
+
+Exits non-zero when a scraper takes longer than IMPORT_BUDGET_MS to import, so
+the check can run on the Pi after dependency upgrades.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+
+SCRAPERS = ["home_depo", "canada_ircc", "library_event", "stonebridge_event", "movie"]
+# start-up budget for importing one scraper module on the Pi
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 250))
+RUNS = 5
+# only needed on some code paths, so they must not be imported at start-up
+HEAVY_MODULES = ["slack", "aiohttp", "pyppeteer", "playwright", "curl_cffi", "selenium"]
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse ``-X importtime`` output
+    :param stderr: stderr of the interpreter
+    :return: list of (module, self_ms, cumulative_ms, depth)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append(
+            (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth)
+        )
+    return rows
+
+
+def slowest_imports(rows: list, module: str) -> list:
+    """
+    The direct imports of ``module``, slowest first. importtime prints a
+    module after everything it imports, one level deeper.
+    """
+    index = next(i for i, row in enumerate(rows) if row[0] == module)
+    depth = rows[index][3]
+    children = []
+    for row in reversed(rows[:index]):
+        if row[3] <= depth:
+            break
+        if row[3] == depth + 1:
+            children.append(row)
+    return sorted(children, key=lambda row: row[2], reverse=True)
+
+
+def measure(scraper: str) -> tuple:
+    """
+    Import one scraper in a fresh interpreter
+    :param scraper: module name under scraper/
+    :return: (import_ms, wall_ms, importtime rows)
+    """
+    env = dict(os.environ)
+    # service.alert refuses to import without Slack settings
+    env.setdefault("SLACK_API_TOKEN", "benchmark")
+    env.setdefault("CHANNEL_ID", "benchmark")
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import scraper.{scraper}"],
+        cwd=parent,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.monotonic() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"importing scraper.{scraper} failed:\n{result.stderr[-2000:]}")
+    rows = parse_importtime(result.stderr)
+    import_ms = next(
+        (cumulative for name, _, cumulative, _ in rows if name == f"scraper.{scraper}"),
+        0.0,
+    )
+    return import_ms, wall_ms, rows
+
+
+def report(scraper: str, runs: int = RUNS) -> bool:
+    """
+    Print the benchmark of one scraper
+    :return: True when the median import time is within the budget
+    """
+    samples = [measure(scraper) for _ in range(runs)]
+    import_ms = statistics.median(sample[0] for sample in samples)
+    wall_ms = statistics.median(sample[1] for sample in samples)
+    rows = samples[-1][2]
+    within_budget = import_ms <= IMPORT_BUDGET_MS
+
+    print(
+        f"{scraper}: import {import_ms:.0f}ms, interpreter {wall_ms:.0f}ms "
+        f"(budget {IMPORT_BUDGET_MS:.0f}ms) {'OK' if within_budget else 'OVER BUDGET'}"
+    )
+    for name, _, cumulative, _ in slowest_imports(rows, f"scraper.{scraper}")[:5]:
+        print(f"    {cumulative:8.1f}ms  {name}")
+    loaded = {row[0].split(".")[0] for row in rows}
+    eager = [module for module in HEAVY_MODULES if module in loaded]
+    if eager:
+        print(f"    imported eagerly: {', '.join(eager)}")
+    return within_budget
+
+
+if __name__ == "__main__":
+    scrapers = sys.argv[1:2] or SCRAPERS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else RUNS
+    results = [report(scraper, runs) for scraper in scrapers]
+    sys.exit(0 if all(results) else 1)
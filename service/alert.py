@@ -1,17 +1,15 @@
 import datetime
+import functools
 import json
 import logging
 import os
-import smtplib
-import sys
-from email import encoders
-from email.mime.base import MIMEBase
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import time
 
 from dotenv import load_dotenv
-from slack import WebClient
-from slack.errors import SlackApiError
+
+from service.mailer import get_mailer
+from service.slack_limits import SlackRateLimiter
+from service.storage import get_store, registration_info
 
 logging.basicConfig(
     filename="app.log", filemode="w", format="%(name)s - %(levelname)s - %(message)s"
@@ -22,29 +20,178 @@ load_dotenv()
 # Your Slack API token
 slack_token = os.environ.get("SLACK_API_TOKEN")
 channel_id = os.environ.get("CHANNEL_ID")
+# point the client at a fake Slack, see scripts/alert_benchmark.py
+slack_api_url = os.environ.get("SLACK_API_URL", "https://www.slack.com/api/")
 if not (slack_token and channel_id):
+    # alerts go to the file notifier instead (or the run fails in CI), see
+    # service/notifiers.py
     logging.error("No Slack token or channel ID found.")
-    sys.exit(1)
+
+
+class SlackApiError(Exception):
+    """Stand-in until the Slack SDK is loaded, replaced by slack.errors.SlackApiError."""
+
+
+class _LazySlackClient:
+    """
+    Builds the Slack WebClient on first use. Importing the SDK pulls in aiohttp
+    (about 0.2s), which runs that never alert should not pay for.
+    """
+
+    def __init__(self) -> None:
+        self._client = None
+
+    def _load(self):
+        global SlackApiError
+        if self._client is None:
+            from slack import WebClient
+            from slack.errors import SlackApiError
+
+            self._client = WebClient(token=slack_token, base_url=slack_api_url)
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
 
 # Initialize the Slack API client
-client = WebClient(token=slack_token)
+client = _LazySlackClient()
+rate_limiter = SlackRateLimiter()
 
 
-def get_owner_id():
+def routed(sender):
+    """Send the alert through the notifier configured for this scraper."""
+
+    @functools.wraps(sender)
+    def route(*args, **kwargs):
+        from service.notifiers import get_notifier
+
+        return get_notifier().notify(sender.__name__, args, kwargs)
+
+    return route
+
+
+def _call(method: str, **kwargs):
     """
-    Gets the channel owner ID and tag it in the message
+    Call a Slack Web API method within its rate limit, retrying it after
+    Retry-After when Slack still answers ratelimited
+    """
+    return rate_limiter.call(method, lambda: getattr(client, method)(**kwargs))
+
+
+def get_slack_stats() -> dict:
+    """Rate limiter metrics: calls, throttled, retries, waiting and delays."""
+    return rate_limiter.stats()
+
+
+# Workspace users (and the owner to tag) are cached on disk so alerts do not
+# list the whole workspace every time
+USER_CACHE_FILE = os.environ.get("SLACK_USER_CACHE_FILE", "storage/slack_users.json")
+USER_CACHE_TTL = int(os.environ.get("SLACK_USER_CACHE_TTL", 24 * 3600))
+USERS_PAGE_SIZE = 200
+
+# USER_CACHE_FILE -> its contents, read once per process
+_user_caches = {}
+# USER_CACHE_FILE -> hits and misses of this process, never written to the file
+_user_cache_stats = {}
+
+
+def _read_user_cache() -> dict:
+    try:
+        with open(USER_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_user_cache(cache: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(USER_CACHE_FILE) or ".", exist_ok=True)
+        tmp_path = f"{USER_CACHE_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, USER_CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"Could not write Slack user cache: {e}")
+
+
+def _list_users() -> list:
+    """
+    All workspace members, following the users.list pagination cursor
     :return:
     """
-    response = client.users_list()
-    users = response["members"]
-    logging.info(f"Getting all users: {users}")
-    for user in users:
-        logging.info(f"User: {user['real_name']}, ID: {user['id']}")
-        if user.get("is_owner"):
-            return user.get("id")
+    users, cursor = [], None
+    while True:
+        kwargs = {"limit": USERS_PAGE_SIZE}
+        if cursor:
+            kwargs["cursor"] = cursor
+        response = _call("users_list", **kwargs)
+        users.extend(response["members"])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return users
+
+
+def _user_cache() -> dict:
+    cache = _user_caches.get(USER_CACHE_FILE)
+    if cache is None:
+        cache = _user_caches[USER_CACHE_FILE] = _read_user_cache()
+        # written by older versions, the counts of some earlier run
+        cache.pop("stats", None)
+    return cache
+
+
+def _user_stats() -> dict:
+    return _user_cache_stats.setdefault(USER_CACHE_FILE, {"hits": 0, "misses": 0})
 
 
+def get_owner_id():
+    """
+    Gets the channel owner ID and tag it in the message. Served from
+    USER_CACHE_FILE (read once per process) until it is USER_CACHE_TTL seconds
+    old, including a workspace without an owner; the file is only rewritten
+    on a refresh
+    :return: the owner's user ID, None when there is no owner
+    """
+    cache = _user_cache()
+    stats = _user_stats()
+    if "fetched_at" in cache and time.time() - cache["fetched_at"] < USER_CACHE_TTL:
+        stats["hits"] += 1
+        return cache["owner_id"]
+
+    stats["misses"] += 1
+    users = _list_users()
+    logging.info(f"Refreshing Slack user cache: {len(users)} users")
+    owner_id = None
+    for user in users:
+        if user.get("is_owner") and owner_id is None:
+            owner_id = user.get("id")
+    cache.update(
+        {
+            "fetched_at": time.time(),
+            "owner_id": owner_id,
+            "users": {user.get("id"): user.get("real_name") for user in users},
+        }
+    )
+    _write_user_cache(cache)
+    return owner_id
+
+
+def get_user_cache_stats() -> dict:
+    """Owner lookups served from the cache (hits) versus from users.list (misses)."""
+    stats = _user_stats()
+    total = stats["hits"] + stats["misses"]
+    return {**stats, "hit_rate": round(stats["hits"] / total, 3) if total else None}
+
+
+@routed
 def send_slack_message(message, screenshot_path=None):
+    """
+    Post a message tagging the owner, optionally followed by a screenshot
+    :return: whether the message was posted (a failed screenshot upload does
+        not count, retrying would post the message twice)
+    """
+    sent = False
     try:
         # Send the message to Slack
         user_id = get_owner_id()
@@ -61,10 +208,11 @@ def send_slack_message(message, screenshot_path=None):
             }
         ]
 
-        response = client.chat_postMessage(channel=channel_id, blocks=blocks)
+        response = _call("chat_postMessage", channel=channel_id, blocks=blocks)
 
         # Check if the message was sent successfully
-        if response["ok"]:
+        sent = bool(response["ok"])
+        if sent:
             logging.info("Message sent to Slack successfully.")
         else:
             logging.info("Failed to send message to Slack.")
@@ -72,7 +220,8 @@ def send_slack_message(message, screenshot_path=None):
         # Upload the screenshot if provided
         if screenshot_path:
             logging.info(f"Start uploading screenshot: {screenshot_path}")
-            response = client.files_upload(
+            response = _call(
+                "files_upload",
                 channels=channel_id,
                 file=screenshot_path,
                 title="Here is a screenshot when the item is available",
@@ -86,20 +235,49 @@ def send_slack_message(message, screenshot_path=None):
 
     except SlackApiError as e:
         logging.error(f"Error sending message to Slack: {e}")
+    return sent
+
+
+@routed
+def send_alert_digest(blocks: list, text: str, urgent: bool = False):
+    """
+    Post the alerts collected during one run as a single message
+    Args:
+        blocks: Block Kit blocks rendered by AlertDigest
+        text: Fallback text
+        urgent: Follow up with one @channel ping
+    """
+    try:
+        user_id = get_owner_id()
+        blocks = blocks[:1] + [
+            {"type": "section", "text": {"type": "mrkdwn", "text": f"<@{user_id}>"}}
+        ] + blocks[1:]
+        response = _call("chat_postMessage", channel=channel_id, blocks=blocks, text=text)
+        if not response["ok"]:
+            logging.error("Failed to send alert digest")
+            return False
+        if urgent:
+            _call(
+                "chat_postMessage",
+                channel=channel_id,
+                text=f"<!channel> {text}, see the digest above",
+            )
+        logging.info(f"Alert digest sent: {text}")
+        return True
+    except SlackApiError as e:
+        logging.error(f"Error sending alert digest: {e.response['error']}")
+        return False
+    except Exception as e:
+        logging.error(f"Unexpected error sending alert digest: {str(e)}")
+        return False
 
 
 def get_last_alert_date(scraper_name: str):
     """
-    Read the last alert sent by a scraper from storage/last_alert.json
+    Read the last alert sent by a scraper from the state store
     :return:
     """
-    file_path = "storage/last_alert.json"
-    if os.path.getsize(file_path) == 0:
-        return None
-
-    with open(file_path, "r") as f:
-        last_alert_data = json.load(f)
-    last_date = last_alert_data.get(scraper_name, None)
+    last_date = get_store().get_last_alert_date(scraper_name)
     if not last_date:
         return None
     return datetime.datetime.strptime(last_date, "%Y-%m-%d").date()
@@ -112,22 +290,7 @@ def update_last_alert_date(scraper_name: str, new_date: datetime.date):
     :param scraper_name:
     :return:
     """
-    date_str = new_date.strftime("%Y-%m-%d")
-    file_path = "storage/last_alert.json"
-    # empty file
-    if os.path.getsize(file_path) == 0:
-        last_alert_data = {scraper_name: date_str}
-        with open("storage/last_alert.json", "w") as f:
-            json.dump(last_alert_data, f)
-    else:
-        # read exiting content
-        with open("storage/last_alert.json", "r") as f:
-            last_alert_data = json.load(f)
-        # update with new data
-        last_alert_data.update({scraper_name: date_str})
-        # write new content
-        with open("storage/last_alert.json", "w") as f:
-            json.dump(last_alert_data, f)
+    get_store().set_last_alert_date(scraper_name, new_date.strftime("%Y-%m-%d"))
 
 
 def send_email_with_attachment(
@@ -140,53 +303,26 @@ def send_email_with_attachment(
     attachment_path,
 ):
     """
-    Sends an email with an attachment to multiple recipients.
+    Sends an email with an attachment to multiple recipients over the
+    sender's pooled SMTP connection (see service/mailer.py).
 
     Parameters:
     - sender_email (str): Sender's email address.
     - sender_name (str): Sender's display name.
     - sender_password (str): Sender's email password.
-    - recipients (list): List of recipient email addresses.
+    - recipients (list | str): Recipient addresses, a list or comma separated.
     - subject (str): Email subject.
     - body (str): Email body content.
     - attachment_path (str): Path to the attachment file.
-    - smtp_server (str): SMTP server address.
-    - smtp_port (int): SMTP server port.
+
+    Returns:
+    - dict: {"ok", "sent", "refused", "error", "elapsed_ms"}
     """
-    # Create email message
-    msg = MIMEMultipart()
-    msg["From"] = sender_name + " <" + sender_email + ">"
-    msg["To"] = recipients
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain"))
-
-    # Attach the file
-    try:
-        with open(attachment_path, "rb") as attachment:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(attachment.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename= {attachment_path.split('/')[-1]}",
-            )
-            msg.attach(part)
-    except FileNotFoundError:
-        print(f"Attachment file not found: {attachment_path}")
-        return
-
-    # Send the email
-    smtp_server = os.environ.get("SMTP_SERVER", "")
-    smtp_port = os.environ.get("SMTP_PORT", 465)
-    try:
-        with smtplib.SMTP_SSL(smtp_server, smtp_port) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipients, msg.as_string())
-        print("Email sent successfully!")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    mailer = get_mailer(sender_email, sender_name, sender_password)
+    return mailer.send(recipients, subject, body, attachment_path)
 
 
+@routed
 def send_urgent_workshop_alert(workshop_details, registration_url=None):
     """
     Send an urgent, high-visibility alert for time-sensitive workshop openings
@@ -270,7 +406,8 @@ def send_urgent_workshop_alert(workshop_details, registration_url=None):
         ]
 
         # Send the message with the special formatting
-        response = client.chat_postMessage(
+        response = _call(
+            "chat_postMessage",
             channel=channel_id,
             blocks=blocks,
             text=f"URGENT: {title} workshop is open for registration!",
@@ -281,14 +418,15 @@ def send_urgent_workshop_alert(workshop_details, registration_url=None):
         if response["ok"]:
             try:
                 # Pin the message to the channel
-                client.pins_add(channel=channel_id, timestamp=response["ts"])
+                _call("pins_add", channel=channel_id, timestamp=response["ts"])
                 logging.info("Urgent workshop alert pinned to channel")
             except SlackApiError as e:
                 logging.error(f"Error pinning urgent message: {e}")
 
             # Send a follow-up @channel message to trigger notifications for everyone
             try:
-                client.chat_postMessage(
+                _call(
+                    "chat_postMessage",
                     channel=channel_id,
                     text=f"<!channel> A new workshop '{title}' is available for registration!",
                 )
@@ -305,6 +443,7 @@ def send_urgent_workshop_alert(workshop_details, registration_url=None):
         return False
 
 
+@routed
 def send_api_error_alert(service_name, error_message, details=None):
     """
     Send an error alert about API failures to Slack
@@ -347,7 +486,8 @@ def send_api_error_alert(service_name, error_message, details=None):
         )
 
         # Send the message to Slack
-        client.chat_postMessage(
+        _call(
+            "chat_postMessage",
             channel=channel_id,
             blocks=blocks,
             text=f"API ERROR - {service_name}: {error_message}",  # Fallback text
@@ -362,6 +502,7 @@ def send_api_error_alert(service_name, error_message, details=None):
         return False
 
 
+@routed
 def send_ircc_status_card(
     config_label: str,
     estimated_time: str,
@@ -439,7 +580,8 @@ def send_ircc_status_card(
             },
         ]
 
-        response = client.chat_postMessage(
+        response = _call(
+            "chat_postMessage",
             channel=channel_id,
             blocks=blocks,
             text=f"IRCC update — {config_label}: {people_ahead}, {total_waiting} (updated {last_updated})",
@@ -460,7 +602,7 @@ def send_ircc_status_card(
 def get_registered_workshops(scraper_name: str):
     """
     Read the list of workshops that have been successfully registered for
-    from storage/registered_workshops.json
+    from the state store
 
     Args:
         scraper_name: Name of the scraper (e.g., "home_depo")
@@ -469,25 +611,7 @@ def get_registered_workshops(scraper_name: str):
         dict: Dictionary mapping workshop_event_ids to registration details
               Returns empty dict if no registrations found
     """
-    file_path = "storage/registered_workshops.json"
-
-    # Create storage directory if it doesn't exist
-    os.makedirs("storage", exist_ok=True)
-
-    # Create empty file if it doesn't exist
-    if not os.path.exists(file_path):
-        with open(file_path, "w") as f:
-            json.dump({}, f)
-        return {}
-
-    # Handle empty file
-    if os.path.getsize(file_path) == 0:
-        return {}
-
-    with open(file_path, "r") as f:
-        all_registrations = json.load(f)
-
-    return all_registrations.get(scraper_name, {})
+    return get_store().get_registrations(scraper_name)
 
 
 def is_workshop_registered(scraper_name: str, workshop_event_id: str):
@@ -501,14 +625,10 @@ def is_workshop_registered(scraper_name: str, workshop_event_id: str):
     Returns:
         bool: True if workshop is already registered, False otherwise
     """
-    registered_workshops = get_registered_workshops(scraper_name)
-    workshop_info = registered_workshops.get(workshop_event_id)
-    
+    workshop_info = get_store().get_registration(scraper_name, workshop_event_id)
     if not workshop_info:
         return False
-        
-    # specific check for boolean, defaulting to True for backward compatibility
-    return workshop_info.get("is_registered", True)
+    return workshop_info["is_registered"]
 
 
 def save_registered_workshop(
@@ -532,44 +652,17 @@ def save_registered_workshop(
         registration_date: When the registration was made (defaults to now)
         is_registered: Boolean flag indicating if the workshop is fully registered
     """
-    if registration_date is None:
-        registration_date = datetime.datetime.now()
-
-    registration_info = {
-        "workshop_id": workshop_id,
-        "workshop_event_id": workshop_event_id,
-        "title": title,
-        "event_date": event_date,
-        "registration_date": registration_date.strftime("%Y-%m-%d %H:%M:%S"),
-        "is_registered": is_registered,
-    }
-
-    file_path = "storage/registered_workshops.json"
-
-    # Create storage directory if it doesn't exist
-    os.makedirs("storage", exist_ok=True)
-
-    # Load existing data or start fresh
-    all_registrations = {}
-    if os.path.exists(file_path):
-        try:
-            if os.path.getsize(file_path) > 0:
-                with open(file_path, "r") as f:
-                    all_registrations = json.load(f)
-        except json.JSONDecodeError:
-            pass  # Start fresh if file is corrupted
-
-    # Initialize scraper's registrations if not present
-    if scraper_name not in all_registrations:
-        all_registrations[scraper_name] = {}
-
-    # Save the registration
-    # If it already exists, we are updating it (e.g. from discovered to registered)
-    all_registrations[scraper_name][workshop_event_id] = registration_info
+    info = registration_info(
+        workshop_event_id,
+        workshop_id,
+        title,
+        event_date,
+        registration_date=registration_date,
+        is_registered=is_registered,
+    )
 
-    # Write updated data
-    with open(file_path, "w") as f:
-        json.dump(all_registrations, f, indent=2)
+    # If it already exists, we are updating it (e.g. from discovered to registered)
+    get_store().save_registration(scraper_name, info)
 
     status = "registered" if is_registered else "discovered"
     logging.info(f"Saved {status} workshop {workshop_event_id} ({title})")
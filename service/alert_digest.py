@@ -0,0 +1,182 @@
+"""
+Per-run alert digest.
+
+With several sessions open at once a Home Depot pass posts 4-6 Slack
+messages per workshop. In digest mode the alerts raised during one run are
+collected instead and posted as a single Block Kit message when the run ends,
+followed by one ``@channel`` ping when any of them was urgent:
+
+    async with AlertDispatcher(digest=AlertDigest.for_scraper("home_depo")):
+        dispatch(send_slack_message, msg)   # collected, not posted
+
+``DIGEST_RULES`` holds the rules of each scraper, merged over
+``DIGEST_RULES["default"]``; digest mode is on for home_depo, off for the
+others unless they are listed in ALERT_DIGEST (comma separated).
+ALERT_DIGEST=0 turns it off everywhere.
+"""
+
+import os
+
+DIGEST_RULES = {
+    "default": {
+        "enabled": False,
+        # senders whose alerts are collected, anything else is sent as usual
+        "coalesce": ["send_slack_message", "send_urgent_workshop_alert"],
+        # senders that make the digest urgent
+        "urgent": ["send_urgent_workshop_alert"],
+        # items rendered before the rest is summarised as "...and N more"
+        "max_items": 20,
+    },
+    "home_depo": {
+        "enabled": True,
+        "coalesce": [
+            "send_slack_message",
+            "send_urgent_workshop_alert",
+            "send_api_error_alert",
+        ],
+    },
+}
+
+# section order in the digest message
+SECTIONS = [
+    ("urgent", "*Open for registration*"),
+    ("message", "*Updates*"),
+    ("error", "*Errors*"),
+]
+
+
+def get_rules(scraper_name: str) -> dict:
+    """Return the rules of a scraper merged over the default rules."""
+    rules = dict(DIGEST_RULES["default"])
+    rules.update(DIGEST_RULES.get(scraper_name, {}))
+    enabled_by_env = os.environ.get("ALERT_DIGEST", "")
+    if enabled_by_env.strip() == "0":
+        rules["enabled"] = False
+    elif scraper_name in [name.strip() for name in enabled_by_env.split(",")]:
+        rules["enabled"] = True
+    return rules
+
+
+def describe(name: str, args: tuple, kwargs: dict) -> tuple:
+    """
+    Plain mrkdwn summary of one alert, for digests and non-Slack notifiers
+    :param name: the sender the alert was meant for
+    :param args: the sender's arguments
+    :return: (kind, text), kind is "urgent", "error" or "message"
+    """
+    if name == "send_urgent_workshop_alert":
+        details = args[0] if args else kwargs.get("workshop_details", {})
+        url = args[1] if len(args) > 1 else kwargs.get("registration_url")
+        title = details.get("title", "Unknown Workshop")
+        return "urgent", (
+            f"*{f'<{url}|{title}>' if url else title}* on {details.get('date', '?')}, "
+            f"`{details.get('event_code', '?')}`, {details.get('seats_left', '?')} seat(s) left"
+        )
+    if name == "send_api_error_alert":
+        service_name, error_message = (list(args) + [None, None])[:2]
+        return "error", f"*{service_name}*: {error_message}"
+    if name == "send_alert_digest":
+        blocks = args[0] if args else kwargs.get("blocks", [])
+        lines = [block["text"]["text"] for block in blocks if isinstance(block.get("text"), dict)]
+        return "message", "\n".join(lines)
+    if name == "send_ircc_status_card":
+        config_label, estimated_time, people_ahead, total_waiting, last_updated = (
+            list(args) + [None] * 5
+        )[:5]
+        return "message", (
+            f"IRCC update, {config_label}: {estimated_time}, {people_ahead}, "
+            f"{total_waiting} waiting (updated {last_updated})"
+        )
+    text = args[0] if args else kwargs.get("message", "")
+    return "message", str(text)
+
+
+def _sender_name(func) -> str:
+    return getattr(func, "__name__", "")
+
+
+class AlertDigest:
+    """Collects the alerts of one run and renders them as one message."""
+
+    def __init__(self, scraper_name: str, rules: dict = None) -> None:
+        self.scraper_name = scraper_name
+        self.rules = rules or get_rules(scraper_name)
+        self.items = []
+
+    @classmethod
+    def for_scraper(cls, scraper_name: str):
+        """The digest of a scraper, or None when its rules leave digest mode off."""
+        rules = get_rules(scraper_name)
+        return cls(scraper_name, rules) if rules["enabled"] else None
+
+    def accepts(self, func, *args, **kwargs) -> bool:
+        name = _sender_name(func)
+        if name not in self.rules["coalesce"]:
+            return False
+        # screenshots cannot be folded into a text digest
+        if name == "send_slack_message":
+            return not (len(args) > 1 or kwargs.get("screenshot_path"))
+        return True
+
+    def add(self, func, *args, **kwargs) -> None:
+        """
+        Record one alert intent
+        :param func: the sender the alert was meant for
+        :param args: the sender's arguments
+        """
+        name = _sender_name(func)
+        urgent = name in self.rules["urgent"]
+        kind, text = describe(name, args, kwargs)
+        if urgent and kind == "message":
+            kind = "urgent"
+
+        if any(item["text"] == text for item in self.items):
+            return
+        self.items.append({"kind": kind, "text": text, "urgent": urgent})
+
+    @property
+    def urgent(self) -> bool:
+        return any(item["urgent"] for item in self.items)
+
+    def render(self) -> list:
+        """
+        Build the Block Kit blocks of the digest
+        :return: list of blocks, empty when nothing was collected
+        """
+        if not self.items:
+            return []
+        blocks = [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": f"{self.scraper_name}: {len(self.items)} alert(s) this run",
+                    "emoji": True,
+                },
+            }
+        ]
+        budget = self.rules["max_items"]
+        for kind, heading in SECTIONS:
+            items = [item for item in self.items if item["kind"] == kind]
+            shown = items[: max(budget, 0)]
+            budget -= len(shown)
+            if not shown:
+                continue
+            lines = "\n".join(f"• {item['text']}" for item in shown)
+            # a section's text is limited to 3000 characters
+            blocks.append(
+                {"type": "section", "text": {"type": "mrkdwn", "text": f"{heading}\n{lines}"[:3000]}}
+            )
+        hidden = len(self.items) - self.rules["max_items"]
+        if hidden > 0:
+            blocks.append(
+                {
+                    "type": "context",
+                    "elements": [{"type": "mrkdwn", "text": f"...and {hidden} more"}],
+                }
+            )
+        return blocks
+
+    def summary(self) -> str:
+        """Plain-text fallback of the digest."""
+        return f"{self.scraper_name}: {len(self.items)} alert(s) this run"
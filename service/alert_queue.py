@@ -0,0 +1,237 @@
+"""
+Non-blocking alert dispatch for the async scrapers.
+
+The Slack senders in ``service.alert`` are synchronous: every call blocks for
+an HTTPS round trip (three for an urgent alert). Inside a running
+``AlertDispatcher`` they are queued instead and a background task sends them,
+in order, on a worker thread, so scraping and registration never wait on
+Slack:
+
+    async with AlertDispatcher():
+        dispatch(send_slack_message, msg)   # returns immediately
+    # leaving the block drains the queue (at most drain_timeout seconds)
+
+Outside a dispatcher ``dispatch`` stores the alert in the process-wide outbox
+(see service/outbox.py), whose worker thread sends it, so the caller does not
+wait either; with ALERT_OUTBOX=0 the sender is called directly. With a
+``digest`` (see service/alert_digest.py) the alerts it accepts are collected
+instead and posted as one message when the dispatcher closes. With an
+``outbox`` every alert, digested ones included, is stored on disk as soon as
+it is raised, a failed delivery
+is queued again a few times before the dispatcher closes and then stays there
+for a later run, and alerts left over by earlier runs are sent when the
+dispatcher starts.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+ALERT_QUEUE_SIZE = int(os.environ.get("ALERT_QUEUE_SIZE", 100))
+ALERT_DRAIN_TIMEOUT = float(os.environ.get("ALERT_DRAIN_TIMEOUT", 30))
+
+_active = None
+
+
+class AlertDispatcher:
+    """Bounded queue of pending alerts plus the task that sends them."""
+
+    def __init__(
+        self,
+        maxsize: int = ALERT_QUEUE_SIZE,
+        drain_timeout: float = ALERT_DRAIN_TIMEOUT,
+        digest=None,
+        outbox=None,
+        retries: int = None,
+        retry_delay: float = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.drain_timeout = drain_timeout
+        self.digest = digest
+        self.outbox = outbox
+        if outbox is not None:
+            from service.outbox import RUN_RETRIES, RUN_RETRY_SECONDS
+
+            retries = RUN_RETRIES if retries is None else retries
+            retry_delay = RUN_RETRY_SECONDS if retry_delay is None else retry_delay
+        self.retries = retries or 0
+        self.retry_delay = retry_delay or 0
+        self.attempts = {}
+        self.retrying = set()
+        # outbox rows of the alerts collected into the digest
+        self.held = []
+        self.queue = None
+        self.worker = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_wait_ms = 0
+
+    async def start(self) -> None:
+        global _active
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.worker = asyncio.ensure_future(self._send_forever())
+        _active = self
+        if self.outbox is not None:
+            leftovers = self.outbox.pending_ids()
+            if leftovers:
+                logging.info(f"Replaying {len(leftovers)} alert(s) left in the outbox")
+            for row_id in leftovers:
+                self._put(self.outbox.deliver, (row_id,), {}, persisted=True)
+
+    def _put(self, func, args: tuple, kwargs: dict, persisted: bool = False) -> bool:
+        try:
+            self.queue.put_nowait((time.monotonic(), func, args, kwargs, persisted))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            where = "left in the outbox" if persisted else "dropped"
+            logging.error(f"Alert queue full, {getattr(func, '__name__', func)} {where}")
+            return False
+
+    def submit(self, func, *args, **kwargs) -> bool:
+        """
+        Queue one alert without waiting for it to be sent
+        :param func: a synchronous sender from service.alert
+        :return: False when the queue is full and the alert was dropped
+        """
+        if self.outbox is not None:
+            from service.outbox import resolve_sender
+
+            name = getattr(func, "__name__", "")
+            row_id = self.outbox.enqueue(name, args, kwargs) if resolve_sender(name) is func else None
+            if row_id is not None:
+                return self._put(self.outbox.deliver, (row_id,), {}, persisted=True)
+        return self._put(func, args, kwargs)
+
+    def collect(self, func, *args, **kwargs) -> None:
+        """
+        Add one alert to the digest. With an outbox it is also stored there
+        right away, so a run that dies before the digest is posted does not
+        lose it.
+        """
+        if self.outbox is not None:
+            from service.outbox import resolve_sender
+
+            name = getattr(func, "__name__", "")
+            if resolve_sender(name) is func:
+                row_id = self.outbox.enqueue(name, args, kwargs, held=True)
+                if row_id is not None:
+                    self.held.append(row_id)
+        self.digest.add(func, *args, **kwargs)
+
+    async def _send_forever(self) -> None:
+        while True:
+            queued_at, func, args, kwargs, persisted = await self.queue.get()
+            self.max_wait_ms = max(self.max_wait_ms, int((time.monotonic() - queued_at) * 1000))
+            try:
+                await asyncio.to_thread(func, *args, **kwargs)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Sending alert {getattr(func, '__name__', func)} failed: {e}")
+                if persisted:
+                    self._retry_later(args[0])
+            finally:
+                self.queue.task_done()
+
+    def _retry_later(self, row_id: int) -> None:
+        attempt = self.attempts.get(row_id, 0)
+        if attempt >= self.retries:
+            return
+        self.attempts[row_id] = attempt + 1
+        retry = asyncio.ensure_future(self._retry(row_id, self.retry_delay * 2**attempt))
+        self.retrying.add(retry)
+        retry.add_done_callback(self.retrying.discard)
+
+    async def _retry(self, row_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._put(self.outbox.deliver, (row_id,), {}, persisted=True)
+
+    async def _drain(self) -> None:
+        while True:
+            await self.queue.join()
+            if not self.retrying:
+                return
+            await asyncio.wait(set(self.retrying))
+
+    async def close(self, timeout: float = None) -> None:
+        """
+        Wait for the queued alerts, then stop the sender
+        :param timeout: seconds to wait, drain_timeout by default
+        :return:
+        """
+        global _active
+        if _active is self:
+            _active = None
+        if self.worker is None:
+            return
+        if self.digest is not None and self.digest.items:
+            from service.alert import send_alert_digest
+
+            args = (self.digest.render(), self.digest.summary())
+            kwargs = {"urgent": self.digest.urgent}
+            row_id = None
+            if self.outbox is not None:
+                row_id = self.outbox.fold(self.held, "send_alert_digest", args, kwargs)
+            if row_id is not None:
+                self._put(self.outbox.deliver, (row_id,), {}, persisted=True)
+            else:
+                self.submit(send_alert_digest, *args, **kwargs)
+        timeout = self.drain_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.error(
+                f"Gave up on {self.queue.qsize() + len(self.retrying)} queued alert(s) "
+                f"after {timeout}s"
+            )
+        for retry in list(self.retrying):
+            retry.cancel()
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.worker = None
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": (self.queue.qsize() if self.queue else 0) + len(self.retrying),
+            "max_wait_ms": self.max_wait_ms,
+            "digested": len(self.digest.items) if self.digest else 0,
+        }
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def dispatch(func, *args, **kwargs):
+    """
+    Queue the alert on the running dispatcher, or in the outbox for its
+    worker thread when there is none; without an outbox the sender is called
+    right away
+    """
+    if _active is not None:
+        if _active.digest is not None and _active.digest.accepts(func, *args, **kwargs):
+            _active.collect(func, *args, **kwargs)
+        else:
+            _active.submit(func, *args, **kwargs)
+        return None
+    if getattr(func, "__module__", None) == "service.alert":
+        from service.outbox import get_outbox, resolve_sender
+
+        outbox = get_outbox()
+        name = getattr(func, "__name__", "")
+        if outbox is not None and resolve_sender(name) is func:
+            if outbox.send(name, args, kwargs) is not None:
+                return None
+    return func(*args, **kwargs)
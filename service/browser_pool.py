@@ -0,0 +1,445 @@
+"""
+Warm Chromium pool shared by the browser scrapers.
+
+Launching Chromium is the most expensive part of a scraper run on the
+Raspberry Pi runners. ``BrowserPool`` keeps one or more Chromium processes
+alive and hands every scraper an isolated incognito context with a single
+page. Browsers are recycled after ``max_uses`` leases or when the resident
+memory of the browser process tree goes above ``max_rss_mb``.
+
+With BROWSER_KEEP_WARM=1 the browsers outlive the process and the websocket
+endpoint of each one is written to ``state_file``, so the next cron-started
+process reconnects to it instead of launching again. Otherwise they are
+closed when the pool shuts down.
+
+Usage:
+    pool = get_pool(launch_options)
+    lease = await pool.acquire()
+    await lease.page.goto(url)
+    ...
+    await pool.release(lease)
+    await shutdown_pools()
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+DEFAULT_STATE_FILE = "storage/browser_pool.json"
+DEFAULT_MAX_USES = int(os.environ.get("BROWSER_POOL_MAX_USES", 50))
+DEFAULT_MAX_RSS_MB = int(os.environ.get("BROWSER_POOL_MAX_RSS_MB", 700))
+# leave Chromium running between cron runs, for a resident runner like the Pi
+DEFAULT_KEEP_WARM = os.environ.get("BROWSER_KEEP_WARM", "0") == "1"
+
+
+def options_key(options: dict) -> str:
+    """Stable short hash of a launch options dict, used to key warm browsers."""
+    raw = json.dumps(options or {}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_tree_rss_mb(pid):
+    """
+    Resident memory in MB of ``pid`` plus all of its descendants.
+    Chromium spreads a page over several renderer processes, so the main
+    process alone under-reports badly. Returns None where /proc is missing.
+    """
+    if not pid or not os.path.isdir("/proc"):
+        return None
+
+    children = {}
+    rss_pages = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            with open(f"/proc/{entry}/statm", "r") as f:
+                statm = f.read().split()
+        except OSError:
+            continue
+        # comm may contain spaces, the fields after the closing paren are fixed
+        fields = stat[stat.rfind(")") + 2:].split()
+        ppid = int(fields[1])
+        children.setdefault(ppid, []).append(int(entry))
+        rss_pages[int(entry)] = int(statm[1])
+
+    if pid not in rss_pages:
+        return None
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class Lease:
+    """An isolated browser context and page borrowed from a pool."""
+
+    def __init__(self, slot, context, page) -> None:
+        self.slot = slot
+        self.context = context
+        self.page = page
+
+    @property
+    def browser(self):
+        return self.slot.browser
+
+
+class _Slot:
+    def __init__(self, browser, pid=None, ws_endpoint=None, uses=0) -> None:
+        self.browser = browser
+        self.pid = pid
+        self.ws_endpoint = ws_endpoint
+        self.uses = uses
+        self.active = 0
+
+
+class BrowserPool:
+    """
+    Pool of warm pyppeteer Chromium processes.
+
+    :param launch_options: options passed to ``pyppeteer.launch``
+    :param size: maximum number of browser processes kept alive
+    :param max_uses: recycle a browser after this many leases
+    :param max_rss_mb: recycle a browser once its process tree uses more memory
+    :param state_file: where warm browser endpoints are persisted, None to disable
+    :param keep_warm: leave browsers running when the pool shuts down
+    """
+
+    def __init__(
+        self,
+        launch_options: dict,
+        size: int = 1,
+        max_uses: int = DEFAULT_MAX_USES,
+        max_rss_mb: int = DEFAULT_MAX_RSS_MB,
+        state_file: str = DEFAULT_STATE_FILE,
+        keep_warm: bool = DEFAULT_KEEP_WARM,
+    ) -> None:
+        self.options = dict(launch_options or {})
+        self.key = options_key(self.options)
+        if keep_warm:
+            # the browser must outlive this process to be reused by the next run
+            self.options.update(
+                {
+                    "autoClose": False,
+                    "handleSIGINT": False,
+                    "handleSIGTERM": False,
+                    "handleSIGHUP": False,
+                }
+            )
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.state_file = state_file
+        self.keep_warm = keep_warm
+
+        self._slots = []
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recycles = 0
+        self.launch_ms = []
+
+    # -- backend hooks ----------------------------------------------------
+
+    async def _launch(self):
+        """Start a new browser, return (browser, pid, ws_endpoint)."""
+        from pyppeteer import launch
+
+        browser = await launch(options=self.options)
+        process = browser.process
+        return browser, process.pid if process else None, browser.wsEndpoint
+
+    async def _connect(self, ws_endpoint: str):
+        from pyppeteer import connect
+
+        options = {"browserWSEndpoint": ws_endpoint}
+        if self.options.get("defaultViewport"):
+            options["defaultViewport"] = self.options["defaultViewport"]
+        return await connect(options)
+
+    async def _new_context(self, browser):
+        context = await browser.createIncognitoBrowserContext()
+        page = await context.newPage()
+        return context, page
+
+    async def _close_browser(self, browser) -> None:
+        await browser.close()
+
+    async def _disconnect(self, browser) -> None:
+        await browser.disconnect()
+
+    # -- public API ---------------------------------------------------------
+
+    async def acquire(self) -> Lease:
+        """Borrow an isolated incognito context and page from a warm browser."""
+        async with self._lock:
+            slot = await self._checkout()
+            slot.active += 1
+        try:
+            context, page = await self._new_context(slot.browser)
+        except Exception:
+            # the browser died under us; drop it so the next acquire relaunches
+            slot.active -= 1
+            await self._retire(slot, close=False)
+            raise
+        return Lease(slot, context, page)
+
+    async def release(self, lease: Lease) -> None:
+        """Close the lease's context and recycle its browser when it is worn out."""
+        slot = lease.slot
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logging.warning(f"Could not close browser context: {e}")
+        async with self._lock:
+            slot.active -= 1
+            slot.uses += 1
+            if slot.active == 0:
+                reason = self._recycle_reason(slot)
+                if reason:
+                    logging.info(f"Recycling browser pid={slot.pid}: {reason}")
+                    self.recycles += 1
+                    await self._retire(slot, close=True)
+            self._save_state()
+
+    async def shutdown(self) -> None:
+        """Detach from (keep_warm) or close every browser in the pool."""
+        async with self._lock:
+            for slot in list(self._slots):
+                try:
+                    if self.keep_warm:
+                        await self._disconnect(slot.browser)
+                    else:
+                        await self._close_browser(slot.browser)
+                except Exception as e:
+                    logging.warning(f"Could not shut down browser pid={slot.pid}: {e}")
+            if not self.keep_warm:
+                self._slots = []
+            # warm browsers stay in the state file for the next process
+            self._save_state()
+            self._slots = []
+        logging.info(f"Browser pool stats: {self.stats()}")
+
+    def stats(self) -> dict:
+        launches = len(self.launch_ms)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "launches": launches,
+            "recycles": self.recycles,
+            "avg_launch_ms": int(sum(self.launch_ms) / launches) if launches else 0,
+            "max_launch_ms": int(max(self.launch_ms)) if launches else 0,
+        }
+
+    # -- internals ------------------------------------------------------------
+
+    async def _checkout(self) -> _Slot:
+        self._slots = [s for s in self._slots if self._is_usable(s)]
+        idle = [s for s in self._slots if s.active == 0]
+        if idle or len(self._slots) >= self.size:
+            candidates = idle or self._slots
+            self.hits += 1
+            return min(candidates, key=lambda s: s.active)
+
+        slot = await self._reconnect()
+        if slot:
+            self.hits += 1
+        else:
+            self.misses += 1
+            started = time.perf_counter()
+            browser, pid, ws_endpoint = await self._launch()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.launch_ms.append(elapsed_ms)
+            logging.info(f"Launched browser pid={pid} in {elapsed_ms:.0f} ms")
+            slot = _Slot(browser, pid, ws_endpoint)
+        self._slots.append(slot)
+        self._save_state()
+        return slot
+
+    async def _reconnect(self):
+        """Attach to a browser left warm by a previous process, if any is alive."""
+        in_use = {s.ws_endpoint for s in self._slots}
+        for entry in self._load_state().get(self.key, []):
+            ws_endpoint = entry.get("ws_endpoint")
+            if not ws_endpoint or ws_endpoint in in_use or not pid_alive(entry.get("pid")):
+                continue
+            try:
+                browser = await self._connect(ws_endpoint)
+            except Exception as e:
+                logging.info(f"Warm browser at {ws_endpoint} is gone: {e}")
+                continue
+            logging.info(f"Reusing warm browser pid={entry.get('pid')}")
+            return _Slot(browser, entry.get("pid"), ws_endpoint, entry.get("uses", 0))
+        return None
+
+    def _is_usable(self, slot: _Slot) -> bool:
+        connected = getattr(slot.browser, "isConnected", None)
+        if callable(connected) and not connected():
+            return False
+        return slot.pid is None or pid_alive(slot.pid)
+
+    def _recycle_reason(self, slot: _Slot):
+        if self.max_uses and slot.uses >= self.max_uses:
+            return f"{slot.uses} uses >= {self.max_uses}"
+        if self.max_rss_mb:
+            rss = process_tree_rss_mb(slot.pid)
+            if rss is not None and rss >= self.max_rss_mb:
+                return f"{rss:.0f} MB >= {self.max_rss_mb} MB"
+        return None
+
+    async def _retire(self, slot: _Slot, close: bool) -> None:
+        if slot in self._slots:
+            self._slots.remove(slot)
+        if close:
+            try:
+                await self._close_browser(slot.browser)
+            except Exception as e:
+                logging.warning(f"Could not close browser pid={slot.pid}: {e}")
+        self._save_state()
+
+    def _load_state(self) -> dict:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self) -> None:
+        if not self.state_file:
+            return
+        state = self._load_state()
+        state[self.key] = [
+            {"ws_endpoint": s.ws_endpoint, "pid": s.pid, "uses": s.uses}
+            for s in self._slots
+            if s.ws_endpoint
+        ]
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logging.warning(f"Could not save browser pool state: {e}")
+
+
+class PlaywrightPool(BrowserPool):
+    """
+    Playwright flavour of the pool for scrapers written against
+    ``playwright.async_api``. A Playwright-launched browser dies with its
+    driver, so reuse is in-process only unless ``cdp_endpoint`` points at a
+    warm Chromium (see ``warm_endpoint``), which is then attached over CDP.
+    """
+
+    def __init__(
+        self,
+        playwright,
+        launch_kwargs: dict = None,
+        context_kwargs: dict = None,
+        cdp_endpoint: str = None,
+        **kwargs,
+    ) -> None:
+        kwargs.setdefault("state_file", None)
+        super().__init__(launch_kwargs or {}, keep_warm=False, **kwargs)
+        self.playwright = playwright
+        self.launch_kwargs = launch_kwargs or {}
+        self.context_kwargs = context_kwargs or {}
+        self.cdp_endpoint = cdp_endpoint
+
+    async def _launch(self):
+        return await self.playwright.chromium.launch(**self.launch_kwargs), None, None
+
+    async def _reconnect(self):
+        if not self.cdp_endpoint:
+            return None
+        try:
+            browser = await self.playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+        except Exception as e:
+            logging.info(f"Could not attach to warm browser at {self.cdp_endpoint}: {e}")
+            return None
+        logging.info(f"Attached to warm browser at {self.cdp_endpoint}")
+        return _Slot(browser, None, self.cdp_endpoint)
+
+    async def _new_context(self, browser):
+        context = await browser.new_context(**self.context_kwargs)
+        page = await context.new_page()
+        return context, page
+
+    async def _retire(self, slot: _Slot, close: bool) -> None:
+        # never close a browser we merely attached to, it belongs to someone else
+        await super()._retire(slot, close and slot.ws_endpoint is None)
+
+    async def shutdown(self) -> None:
+        async with self._lock:
+            for slot in list(self._slots):
+                if slot.ws_endpoint is None:
+                    try:
+                        await self._close_browser(slot.browser)
+                    except Exception as e:
+                        logging.warning(f"Could not close browser: {e}")
+            self._slots = []
+        logging.info(f"Browser pool stats: {self.stats()}")
+
+    def _is_usable(self, slot: _Slot) -> bool:
+        connected = getattr(slot.browser, "is_connected", None)
+        return not callable(connected) or connected()
+
+
+def warm_endpoint(launch_options: dict, state_file: str = DEFAULT_STATE_FILE):
+    """
+    Websocket endpoint of a live warm browser launched with ``launch_options``
+    (same options_key), or None. A browser launched with other options would
+    lack this scraper's arguments or carry another scraper's proxy.
+    """
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    for entry in state.get(options_key(launch_options), []):
+        if entry.get("ws_endpoint") and pid_alive(entry.get("pid")):
+            return entry["ws_endpoint"]
+    return None
+
+
+_pools = {}
+
+
+def get_pool(launch_options: dict, **kwargs) -> BrowserPool:
+    """Return the process-wide pool for ``launch_options``, creating it on first use."""
+    key = options_key(launch_options)
+    if key not in _pools:
+        _pools[key] = BrowserPool(launch_options, **kwargs)
+    return _pools[key]
+
+
+async def shutdown_pools() -> None:
+    """Shut down every pool created through ``get_pool``."""
+    for pool in list(_pools.values()):
+        await pool.shutdown()
+    _pools.clear()
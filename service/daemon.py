@@ -0,0 +1,158 @@
+"""
+In-process polling loop for scrapers that run as a resident service.
+
+Instead of cron starting a fresh interpreter for every poll (re-importing
+everything and re-opening every connection), a ``PollingDaemon`` calls the
+scraper's poll coroutine on a schedule inside one long-lived process:
+
+    daemon = PollingDaemon("home_depo", poll_once, interval=600)
+    asyncio.run(daemon.run())
+
+``interval`` is a number of seconds or a callable ``interval(now) -> seconds``
+for schedules that change during the week. SIGTERM/SIGINT stop the loop
+between polls (a running poll is allowed to finish) and then ``on_shutdown``
+runs. After every poll a heartbeat JSON file is rewritten; monitoring can
+check it with:
+
+    python service/daemon.py storage/home_depo.heartbeat.json 4000
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+
+class PollingDaemon:
+    """Runs ``poll`` every ``interval`` seconds until stopped."""
+
+    def __init__(
+        self,
+        name: str,
+        poll,
+        interval=600,
+        heartbeat_file: str = None,
+        on_shutdown=None,
+    ) -> None:
+        self.name = name
+        self.poll = poll
+        self.interval = interval
+        self.heartbeat_file = heartbeat_file or f"storage/{name}.heartbeat.json"
+        self.on_shutdown = on_shutdown
+        self.started_at = time.time()
+        self.polls = 0
+        self.failures = 0
+        self.last_poll = None
+        self._stop = None
+
+    def next_interval(self) -> float:
+        if callable(self.interval):
+            return self.interval(datetime.now().astimezone())
+        return self.interval
+
+    def stop(self, *args) -> None:
+        logging.info(f"{self.name} daemon stopping")
+        if self._stop is not None:
+            self._stop.set()
+
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # not on the main thread, or not supported on this platform
+                logging.debug(f"Cannot handle {sig.name} here, use stop() instead")
+
+    def write_heartbeat(self, next_poll_at: float = None, stopped: bool = False) -> None:
+        heartbeat = {
+            "name": self.name,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "polls": self.polls,
+            "failures": self.failures,
+            "last_poll": self.last_poll,
+            "next_poll_at": next_poll_at,
+            "stopped": stopped,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.heartbeat_file) or ".", exist_ok=True)
+            tmp_path = f"{self.heartbeat_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(heartbeat, f, indent=2)
+            os.replace(tmp_path, self.heartbeat_file)
+        except OSError as e:
+            logging.warning(f"Could not write heartbeat: {e}")
+
+    async def poll_once(self) -> None:
+        started = time.time()
+        status, error = "success", None
+        try:
+            await self.poll()
+        except Exception as e:
+            status, error = "fail", str(e)
+            self.failures += 1
+            logging.error(f"{self.name} poll failed: {e}", exc_info=True)
+        self.polls += 1
+        self.last_poll = {
+            "started_at": started,
+            "duration_ms": int((time.time() - started) * 1000),
+            "status": status,
+            "error": error,
+        }
+
+    async def run(self, max_polls: int = None) -> None:
+        """
+        Poll until SIGTERM/SIGINT (or ``max_polls`` polls), then shut down
+        :param max_polls: stop after this many polls, for tests and one-off runs
+        :return:
+        """
+        self._stop = asyncio.Event()
+        self._install_signal_handlers()
+        logging.info(f"{self.name} daemon started (pid {os.getpid()})")
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                await self.poll_once()
+                if max_polls is not None and self.polls >= max_polls:
+                    break
+                delay = max(0.0, self.next_interval() - (time.monotonic() - started))
+                self.write_heartbeat(next_poll_at=time.time() + delay)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.on_shutdown is not None:
+                try:
+                    await self.on_shutdown()
+                except Exception as e:
+                    logging.warning(f"{self.name} shutdown hook failed: {e}")
+            self.write_heartbeat(stopped=True)
+            logging.info(f"{self.name} daemon stopped after {self.polls} poll(s)")
+
+
+def heartbeat_age(path: str):
+    """Seconds since the heartbeat was written, None when missing or stopped."""
+    try:
+        with open(path, "r") as f:
+            heartbeat = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if heartbeat.get("stopped"):
+        return None
+    return time.time() - heartbeat.get("updated_at", 0)
+
+
+if __name__ == "__main__":
+    # exit non-zero when the daemon's heartbeat is missing or older than max_age
+    path = sys.argv[1]
+    max_age = float(sys.argv[2]) if len(sys.argv) > 2 else 1800
+    age = heartbeat_age(path)
+    print(f"heartbeat age: {age if age is None else int(age)}s")
+    sys.exit(0 if age is not None and age <= max_age else 1)
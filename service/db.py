@@ -0,0 +1,285 @@
+"""
+Shared Postgres access for the scrapers.
+
+One lazily created, thread-safe connection pool per process replaces the
+per-call ``psycopg2.connect`` each scraper used to do (a new TLS handshake to
+Neon every time). The hot statements are registered by name:
+
+    db.execute("scraper_is_active", ("canada_ircc",), fetch="one")
+    with db.transaction() as tx:
+        tx.execute_values("insert_runs", rows, template)
+        tx.execute("update_last_run", (...))
+
+Inside an event loop the same pool is used from a worker thread:
+
+    await db.execute_async("scraper_is_active", ("home_depo",), fetch="one")
+    await db.transaction_async(lambda tx: tx.execute("update_last_run", (...)))
+
+``query_stats()`` reports calls, errors and p50/p95/max latency per statement.
+
+With DB_PREPARE=1 they run as server-side prepared statements, prepared once
+per pooled connection. This is off by default and is ignored for Neon's
+"-pooler" hosts: a transaction-mode pooler hands every transaction a
+different server connection, which does not know the statement.
+"""
+
+import asyncio
+import atexit
+import collections
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 4))
+DB_PREPARE = os.environ.get("DB_PREPARE", "0") == "1"
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", 10))
+# statements slower than this are logged
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", 500))
+# latency samples kept per statement for the percentiles
+STATS_WINDOW = 500
+
+# name -> SQL with %s placeholders
+STATEMENTS = {
+    "scraper_is_active": "SELECT is_active FROM scrapers WHERE id = %s",
+    # multi-row, see Transaction.execute_values
+    "insert_runs": """
+        INSERT INTO scraper_runs (scraper_id, started_at, duration_ms, status, message, stages)
+        VALUES %s
+    """,
+    "update_last_run": """
+        UPDATE scrapers SET
+            last_run_at = to_timestamp(%s),
+            last_run_duration_ms = %s,
+            last_run_status = %s,
+            last_run_message = %s
+        WHERE id = %s
+    """,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats = collections.defaultdict(
+    lambda: {"calls": 0, "errors": 0, "samples": collections.deque(maxlen=STATS_WINDOW)}
+)
+_stats_lock = threading.Lock()
+
+
+def register_statement(name: str, sql: str) -> None:
+    """Add a named statement, e.g. one only a single scraper uses."""
+    STATEMENTS[name] = sql
+
+
+def dsn(url: str = None) -> str:
+    """POSTGRES_URL with sslmode=require unless it sets a mode already."""
+    url = url if url is not None else os.environ.get("POSTGRES_URL", "")
+    if "sslmode" not in url:
+        url += ("&" if "?" in url else "?") + "sslmode=require"
+    return url
+
+
+def use_prepared(url: str = None) -> bool:
+    """Whether DB_PREPARE is set and POSTGRES_URL is not a pooler host."""
+    if not DB_PREPARE:
+        return False
+    from urllib.parse import urlparse
+
+    host = urlparse(dsn(url)).hostname or ""
+    return "-pooler" not in host
+
+
+def _prepare_sql(name: str, sql: str) -> tuple:
+    """
+    PREPARE statement for a %s-style query
+    :return: (PREPARE ..., EXECUTE ... with %s placeholders)
+    """
+    count = 0
+
+    def number(_):
+        nonlocal count
+        count += 1
+        return f"${count}"
+
+    prepared = re.sub(r"%s", number, sql)
+    execute = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * count)})" if count else "")
+    return f"PREPARE {name} AS {prepared}", execute
+
+
+def get_pool():
+    """The process-wide connection pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+
+            _pool = ThreadedConnectionPool(
+                DB_POOL_MIN, DB_POOL_MAX, dsn(), connect_timeout=DB_CONNECT_TIMEOUT
+            )
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+def _record(name: str, elapsed_ms: float, failed: bool) -> None:
+    with _stats_lock:
+        stats = _stats[name]
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["samples"].append(elapsed_ms)
+    if elapsed_ms > DB_SLOW_QUERY_MS:
+        logging.warning(f"Slow query {name}: {elapsed_ms:.0f}ms")
+
+
+def query_stats() -> dict:
+    """Per statement: calls, errors, p50/p95/max latency in ms."""
+    with _stats_lock:
+        snapshot = {
+            name: (stats["calls"], stats["errors"], sorted(stats["samples"]))
+            for name, stats in _stats.items()
+        }
+    return {
+        name: {
+            "calls": calls,
+            "errors": errors,
+            "p50_ms": round(samples[len(samples) // 2], 1) if samples else None,
+            "p95_ms": round(samples[int(len(samples) * 0.95)], 1) if samples else None,
+            "max_ms": round(samples[-1], 1) if samples else None,
+        }
+        for name, (calls, errors, samples) in snapshot.items()
+    }
+
+
+class Transaction:
+    """Statements run on one pooled connection, committed together."""
+
+    # connection -> names prepared on it; pooled connections outlive transactions
+    prepared = weakref.WeakKeyDictionary()
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.use_prepared = use_prepared()
+
+    def execute(self, name: str, params: tuple = (), fetch: str = None):
+        """
+        Run a registered statement
+        :param name: key of STATEMENTS
+        :param fetch: None, "one" or "all"
+        :return: None, one row (None when there is none) or all rows
+        """
+        sql = STATEMENTS[name]
+        started = time.perf_counter()
+        failed = True
+        try:
+            if self.use_prepared:
+                prepare, execute = _prepare_sql(name, sql)
+                names = self.prepared.setdefault(self.conn, set())
+                if name not in names:
+                    self.cursor.execute(prepare)
+                    names.add(name)
+                self.cursor.execute(execute, params)
+            else:
+                self.cursor.execute(sql, params)
+            result = None
+            if fetch == "one":
+                result = self.cursor.fetchone()
+            elif fetch == "all":
+                result = self.cursor.fetchall()
+            failed = False
+            return result
+        finally:
+            _record(name, (time.perf_counter() - started) * 1000, failed)
+
+    def execute_values(self, name: str, rows: list, template: str = None) -> None:
+        """
+        Run a registered "... VALUES %s" statement for many rows in one round
+        trip. Not prepared: the statement text changes with the row count.
+        :param template: SQL of one row, e.g. "(%s, to_timestamp(%s))"
+        """
+        from psycopg2.extras import execute_values
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            execute_values(self.cursor, STATEMENTS[name], rows, template, page_size=len(rows) or 1)
+            failed = False
+        finally:
+            _record(name, (time.perf_counter() - started) * 1000, failed)
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    A pooled connection for several statements, committed at the end and
+    rolled back on error. A connection that broke is dropped from the pool.
+    """
+    import psycopg2
+
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield Transaction(conn)
+        conn.commit()
+    except Exception as e:
+        broken = conn.closed or isinstance(
+            e, (psycopg2.OperationalError, psycopg2.InterfaceError)
+        )
+        if not broken:
+            conn.rollback()
+            _deallocate(conn)
+        raise
+    finally:
+        pool.putconn(conn, close=bool(broken))
+
+
+def _deallocate(conn) -> None:
+    # a rollback does not undo PREPARE, so whether the failed statement got
+    # prepared is unknown: drop them all, they are prepared again on use
+    Transaction.prepared.pop(conn, None)
+    if not use_prepared():
+        return
+    try:
+        conn.cursor().execute("DEALLOCATE ALL")
+        conn.commit()
+    except Exception as e:
+        logging.warning(f"Could not deallocate prepared statements: {e}")
+
+
+def execute(name: str, params: tuple = (), fetch: str = None):
+    """Run one registered statement in its own transaction, see Transaction.execute."""
+    with transaction() as tx:
+        return tx.execute(name, params, fetch)
+
+
+async def execute_async(name: str, params: tuple = (), fetch: str = None):
+    """execute() on a worker thread, for use inside an event loop."""
+    return await asyncio.to_thread(execute, name, params, fetch)
+
+
+def _run_in_transaction(func, *args):
+    with transaction() as tx:
+        return func(tx, *args)
+
+
+async def transaction_async(func, *args):
+    """
+    Call func(tx, *args) inside transaction() on a worker thread, so an event
+    loop is never blocked on the pool or the database
+    :param func: plain function taking a Transaction
+    :return: what func returns
+    """
+    return await asyncio.to_thread(_run_in_transaction, func, *args)
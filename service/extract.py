@@ -0,0 +1,103 @@
+"""
+Single round-trip DOM extraction for the browser scrapers.
+
+Walking elements with ``querySelector`` -> ``getProperty`` -> ``jsonValue``
+costs three browser round trips per field per element. The helpers below
+ship a declarative record schema to the page and run the whole extraction in
+one ``page.evaluate`` call instead.
+
+A schema maps output keys to field specs:
+
+    {
+        "title": "h3",                                # textContent of first match
+        "link": {"selector": "a", "attr": "href"},    # any element property
+        "label": {"attr": "id"},                      # property of the record element
+    }
+
+Missing elements come back as None. Works with both pyppeteer and Playwright
+pages, since both accept ``page.evaluate(function, arg)``.
+"""
+
+EXTRACT_RECORDS_JS = """
+({selector, schema, limit}) => {
+    const read = (root, spec) => {
+        const el = spec.selector ? root.querySelector(spec.selector) : root;
+        if (!el) {
+            return null;
+        }
+        const value = el[spec.attr];
+        return value === undefined ? null : value;
+    };
+    let roots = Array.from(document.querySelectorAll(selector));
+    if (limit) {
+        roots = roots.slice(0, limit);
+    }
+    return roots.map((root) => {
+        const record = {};
+        for (const [key, spec] of Object.entries(schema)) {
+            record[key] = read(root, spec);
+        }
+        return record;
+    });
+}
+"""
+
+
+def normalize_schema(schema: dict) -> dict:
+    """
+    Expand the shorthand field specs into {"selector": ..., "attr": ...} dicts
+    :param schema: mapping of output key to a selector string, a
+        (selector, attr) pair or a dict with "selector" and/or "attr"
+    :return:
+    """
+    normalized = {}
+    for key, spec in schema.items():
+        if spec is None or isinstance(spec, str):
+            spec = {"selector": spec}
+        elif isinstance(spec, (list, tuple)):
+            spec = {"selector": spec[0], "attr": spec[1]}
+        normalized[key] = {
+            "selector": spec.get("selector") or "",
+            "attr": spec.get("attr", "textContent"),
+        }
+    return normalized
+
+
+async def extract_records(page, selector: str, schema: dict, limit: int = None) -> list:
+    """
+    Extract one dict per element matching ``selector`` in a single round trip
+    :param page: pyppeteer or Playwright page
+    :param selector: CSS selector of the record elements
+    :param schema: field specs, see module docstring
+    :param limit: only extract the first ``limit`` elements
+    :return: list of dicts keyed like ``schema``
+    """
+    arg = {"selector": selector, "schema": normalize_schema(schema), "limit": limit}
+    return await page.evaluate(EXTRACT_RECORDS_JS, arg)
+
+
+async def extract_values(
+    page, selector: str, attr: str = "textContent", limit: int = None
+) -> list:
+    """
+    Read ``attr`` from every element matching ``selector`` in a single round trip
+    :param page:
+    :param selector:
+    :param attr:
+    :param limit:
+    :return:
+    """
+    records = await extract_records(page, selector, {"value": {"attr": attr}}, limit)
+    return [record["value"] for record in records]
+
+
+async def extract_value(page, selector: str, attr: str = "textContent"):
+    """
+    Read ``attr`` from the first element matching ``selector``, None when absent
+    :param page:
+    :param selector:
+    :param attr:
+    :return:
+    """
+    values = await extract_values(page, selector, attr, limit=1)
+    return values[0] if values else None
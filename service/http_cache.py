@@ -0,0 +1,155 @@
+"""
+Conditional-GET cache for polled JSON endpoints.
+
+Keeps the validators (ETag / Last-Modified) and the last body of every URL on
+disk. Callers send ``request_headers(url)`` with the next poll and ask
+``unchanged(url, status, body)`` before doing any work with the response:
+
+    headers = cache.request_headers(url)
+    response = ...GET url with headers...
+    if cache.unchanged(url, response.status, body):
+        return                              # 304, or same body as last time
+    ...parse / filter / alert...
+    cache.store(url, response.headers, body)
+
+When a server sends no validators the cache falls back to comparing a hash of
+the body. ``store`` is meant to run only after the response was fully handled,
+so a crash halfway through never marks a response as seen.
+
+Hits and misses are counted per endpoint (scheme, host and path) in the index
+file and can be printed with ``python service/http_cache.py``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "storage/http_cache")
+
+
+def body_hash(body) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+def endpoint(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def _header(headers, name: str):
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class ConditionalCache:
+    """Validators, bodies and hit/miss counters of polled URLs, kept on disk."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_file, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {"entries": {}, "stats": {}}
+        index.setdefault("entries", {})
+        index.setdefault("stats", {})
+        return index
+
+    def _save_index(self) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.index_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._index, f, indent=2)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logging.warning(f"Could not write HTTP cache index: {e}")
+
+    def _body_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".body")
+
+    def _count(self, url: str, outcome: str) -> None:
+        stats = self._index["stats"].setdefault(
+            endpoint(url), {"hits": 0, "misses": 0, "not_modified": 0}
+        )
+        stats[outcome] += 1
+        if outcome == "not_modified":
+            stats["hits"] += 1
+        self._save_index()
+
+    def request_headers(self, url: str) -> dict:
+        """Conditional headers for the next GET of ``url``."""
+        entry = self._index["entries"].get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def unchanged(self, url: str, status: int, body=None) -> bool:
+        """
+        True when the response carries nothing new: a 304, or a 200 whose body
+        hashes the same as the stored one. Counts the hit or miss.
+        :param url:
+        :param status: HTTP status of the response
+        :param body: response body, str or bytes (ignored for a 304)
+        :return:
+        """
+        entry = self._index["entries"].get(url)
+        if status == 304 and entry:
+            self._count(url, "not_modified")
+            return True
+        if status == 200 and entry and body is not None and body_hash(body) == entry.get("hash"):
+            self._count(url, "hits")
+            return True
+        self._count(url, "misses")
+        return False
+
+    def store(self, url: str, headers, body) -> None:
+        """Remember the validators and body of a fully handled 200 response."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            mode = "w" if isinstance(body, str) else "wb"
+            with open(self._body_path(url), mode) as f:
+                f.write(body)
+        except OSError as e:
+            logging.warning(f"Could not cache body of {url}: {e}")
+            return
+        self._index["entries"][url] = {
+            "etag": _header(headers, "etag"),
+            "last_modified": _header(headers, "last-modified"),
+            "hash": body_hash(body),
+            "stored_at": int(time.time()),
+        }
+        self._save_index()
+
+    def body(self, url: str):
+        """The last stored body of ``url`` as text, or None."""
+        try:
+            with open(self._body_path(url), "r") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def stats(self) -> dict:
+        """Per endpoint: hits (304s and same-body 200s), not_modified and misses."""
+        return {key: dict(value) for key, value in self._index["stats"].items()}
+
+
+if __name__ == "__main__":
+    cache = ConditionalCache(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE_DIR)
+    json.dump(cache.stats(), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,172 @@
+"""
+Shared async HTTP client.
+
+One ``HttpClient`` per process keeps a pool of keep-alive connections (curl's
+connection cache), negotiates HTTP/2 where the server offers it and caches DNS
+lookups, so the time-critical requests - a registration POST right after the
+listing shows an opening - skip the TCP/TLS handshake:
+
+    client = get_http_client()
+    response = await client.get(url, headers=headers)
+    response.status_code, response.headers, response.text, response.json()
+
+Requests to the same host are spaced out to ``rate_per_host`` per second, so
+fanning out over many stores stays polite. Every request is timed; ``stats()``
+returns count, errors and p50/p95/max latency per host. Transport failures are
+raised as ``HttpClientError``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 15))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 10))
+# requests started per second and host, 0 disables the limit
+RATE_PER_HOST = float(os.environ.get("HTTP_RATE_PER_HOST", 4))
+DNS_CACHE_SECONDS = 600
+LATENCY_SAMPLES = 500
+
+
+class HttpClientError(Exception):
+    """The request could not be completed (DNS, connect, TLS, timeout...)."""
+
+
+class HttpResponse:
+    """A fully read response with the parts of the requests API we use."""
+
+    def __init__(self, url: str, status_code: int, headers: dict, text: str, elapsed_ms: int) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP/2 client with per-host latency metrics."""
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        max_connections: int = MAX_CONNECTIONS,
+        headers: dict = None,
+        rate_per_host: float = RATE_PER_HOST,
+    ) -> None:
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.headers = headers or {}
+        self.rate_per_host = rate_per_host
+        self._next_slot = {}
+        self._session = None
+        self._loop = None
+        self._latencies = {}
+        self._errors = {}
+
+    def _get_session(self):
+        # curl's multi handle is bound to the loop it was created on
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._loop is not loop:
+            from curl_cffi import CurlHttpVersion, CurlOpt
+            from curl_cffi.requests import AsyncSession
+
+            self._session = AsyncSession(
+                max_clients=self.max_connections,
+                headers=self.headers,
+                timeout=(self.connect_timeout, self.timeout),
+                http_version=CurlHttpVersion.V2TLS,
+                curl_options={CurlOpt.DNS_CACHE_TIMEOUT: DNS_CACHE_SECONDS},
+            )
+            self._loop = loop
+        return self._session
+
+    async def _throttle(self, host: str) -> None:
+        if not self.rate_per_host:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, 0))
+        self._next_slot[host] = slot + 1 / self.rate_per_host
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _record(self, host: str, elapsed_ms: int, error: bool = False) -> None:
+        self._latencies.setdefault(host, deque(maxlen=LATENCY_SAMPLES)).append(elapsed_ms)
+        if error:
+            self._errors[host] = self._errors.get(host, 0) + 1
+
+    async def request(self, method: str, url: str, **kwargs) -> HttpResponse:
+        """
+        Send a request over the pooled connections
+        :param method: HTTP method
+        :param url:
+        :param kwargs: headers, json, data, params, timeout, ...
+        :return: HttpResponse with the body already read
+        """
+        host = urlsplit(url).netloc
+        await self._throttle(host)
+        started = time.monotonic()
+        try:
+            response = await self._get_session().request(method, url, **kwargs)
+        except Exception as e:
+            elapsed_ms = int((time.monotonic() - started) * 1000)
+            self._record(host, elapsed_ms, error=True)
+            logging.info(f"{method} {url} failed after {elapsed_ms}ms: {e}")
+            raise HttpClientError(str(e)) from e
+
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        self._record(host, elapsed_ms)
+        logging.info(f"{method} {url} -> {response.status_code} in {elapsed_ms}ms")
+        return HttpResponse(
+            url, response.status_code, dict(response.headers), response.text, elapsed_ms
+        )
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Per host: requests, errors, p50/p95/max latency in ms."""
+        stats = {}
+        for host, samples in self._latencies.items():
+            ordered = sorted(samples)
+            stats[host] = {
+                "count": len(ordered),
+                "errors": self._errors.get(host, 0),
+                "p50": ordered[int(0.50 * (len(ordered) - 1))],
+                "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                "max": ordered[-1],
+            }
+        return stats
+
+    async def close(self) -> None:
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+_client = None
+
+
+def get_http_client() -> HttpClient:
+    """The process-wide client, so every caller shares one connection pool."""
+    global _client
+    if _client is None:
+        _client = HttpClient()
+    return _client
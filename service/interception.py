@@ -0,0 +1,177 @@
+"""
+Request blocking for the browser scrapers.
+
+The scrapers only read the DOM or a couple of JSON responses, yet a normal
+page load pulls in images, fonts, video, analytics and ad scripts. A
+``RequestBlocker`` intercepts every request of a page and aborts the ones its
+profile does not need before they reach the network.
+
+A profile is a dict of:
+
+    block_types   resource types to abort ("image", "font", "media", ...)
+    block_urls    URL substrings to abort whatever their type
+    allow_urls    URL substrings that are never aborted (wins over the above)
+
+``PROFILES`` holds one profile per scraper, merged over ``PROFILES["default"]``.
+The blocker counts what it aborted and estimates the bytes saved from the
+average size of the responses it let through (falling back to typical sizes
+per resource type).
+"""
+
+import asyncio
+import logging
+
+TRACKER_URLS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.",
+    "facebook.net",
+    "connect.facebook",
+    "hotjar.com",
+    "bat.bing.com",
+    "adobedtm.com",
+    "demdex.net",
+    "omtrdc.net",
+    "scorecardresearch.com",
+    "newrelic.com",
+    "nr-data.net",
+    "quantserve.com",
+    "criteo.",
+    "taboola.com",
+    "outbrain.com",
+]
+
+PROFILES = {
+    "default": {
+        "block_types": ["image", "media", "font", "texttrack", "eventsource", "manifest"],
+        "block_urls": TRACKER_URLS,
+        "allow_urls": [],
+    },
+    "home_depo": {
+        "block_urls": TRACKER_URLS + ["/content/dam/", "bazaarvoice.com"],
+    },
+    "library_event": {
+        "block_types": ["image", "media", "font", "texttrack", "eventsource", "manifest", "stylesheet"],
+    },
+    "stonebridge_event": {
+        "block_types": ["image", "media", "font", "texttrack", "eventsource", "manifest", "stylesheet"],
+    },
+    "canada_ircc": {
+        # the processing-times widget needs its scripts and JSON, nothing else
+        "allow_urls": ["data-ptime-non-country-en.json", "flpt-en.json"],
+    },
+}
+
+# rough transfer sizes used until a real response of that type has been seen
+TYPICAL_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 35_000,
+    "stylesheet": 25_000,
+    "script": 60_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+
+
+def get_profile(name: str) -> dict:
+    """Return the named profile merged over the default profile."""
+    profile = dict(PROFILES["default"])
+    profile.update(PROFILES.get(name, {}))
+    return profile
+
+
+def _resource_type(request) -> str:
+    value = getattr(request, "resource_type", None) or getattr(request, "resourceType", "")
+    return value() if callable(value) else value
+
+
+class RequestBlocker:
+    """Aborts the requests of a page that its profile does not need."""
+
+    def __init__(self, profile="default") -> None:
+        self.name = profile if isinstance(profile, str) else "custom"
+        self.profile = get_profile(profile) if isinstance(profile, str) else profile
+        self.block_types = set(self.profile.get("block_types", []))
+        self.block_urls = list(self.profile.get("block_urls", []))
+        self.allow_urls = list(self.profile.get("allow_urls", []))
+
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self._seen_bytes = {}
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type == "document":
+            return False
+        if any(pattern in url for pattern in self.allow_urls):
+            return False
+        if resource_type in self.block_types:
+            return True
+        return any(pattern in url for pattern in self.block_urls)
+
+    async def attach(self, page) -> None:
+        """Start intercepting requests of a pyppeteer or Playwright page."""
+        if hasattr(page, "setRequestInterception"):
+            await page.setRequestInterception(True)
+            page.on("request", lambda request: asyncio.ensure_future(self._on_pyppeteer(request)))
+        else:
+            await page.route("**/*", self._on_playwright_route)
+        page.on("response", self._on_response)
+
+    async def _on_pyppeteer(self, request) -> None:
+        try:
+            if self._decide(request):
+                await request.abort()
+            else:
+                await request.continue_()
+        except Exception as e:
+            # the request may already be handled when the page navigates away
+            logging.debug(f"Could not intercept {request.url}: {e}")
+
+    async def _on_playwright_route(self, route) -> None:
+        try:
+            if self._decide(route.request):
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception as e:
+            logging.debug(f"Could not intercept {route.request.url}: {e}")
+
+    def _decide(self, request) -> bool:
+        resource_type = _resource_type(request)
+        if self.should_block(request.url, resource_type):
+            self.blocked += 1
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            return True
+        self.allowed += 1
+        return False
+
+    def _on_response(self, response) -> None:
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except (AttributeError, TypeError, ValueError):
+            return
+        if size:
+            resource_type = _resource_type(response.request)
+            total, count = self._seen_bytes.get(resource_type, (0, 0))
+            self._seen_bytes[resource_type] = (total + size, count + 1)
+
+    def estimated_bytes_saved(self) -> int:
+        saved = 0
+        for resource_type, count in self.blocked_by_type.items():
+            total, seen = self._seen_bytes.get(resource_type, (0, 0))
+            average = total / seen if seen else TYPICAL_BYTES.get(resource_type, 10_000)
+            saved += int(average * count)
+        return saved
+
+    def stats(self) -> dict:
+        return {
+            "profile": self.name,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "estimated_bytes_saved": self.estimated_bytes_saved(),
+        }
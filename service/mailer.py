@@ -0,0 +1,210 @@
+"""
+Pooled SMTP mailer.
+
+A ``Mailer`` keeps one authenticated SMTP_SSL connection open across sends
+(checked with NOOP and re-opened when the server dropped it) and streams the
+attachment into the DATA command in base64 chunks, so a large screenshot is
+never held in memory in full:
+
+    mailer = get_mailer(sender_email, "Costco Scraper", sender_password)
+    result = mailer.send(recipients, subject, body, attachment_path)
+    result = await mailer.send_async(...)   # same, off the event loop
+
+Recipients are split into batches of ``batch_size`` (one message per batch).
+Every send returns a result dict instead of printing:
+``{"ok", "sent", "refused", "error", "elapsed_ms"}``.
+"""
+
+import asyncio
+import atexit
+import base64
+import logging
+import os
+import re
+import smtplib
+import threading
+import time
+import uuid
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+
+BATCH_SIZE = int(os.environ.get("SMTP_BATCH_SIZE", 50))
+# 57 raw bytes make one 76 character base64 line
+CHUNK_SIZE = 57 * 1024
+
+
+def split_recipients(recipients) -> list:
+    """Accept a list or a comma separated string of addresses."""
+    if isinstance(recipients, str):
+        recipients = recipients.split(",")
+    return [address.strip() for address in recipients if address and address.strip()]
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    # a line starting with "." would end the DATA command early
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+class Mailer:
+    """One SMTP_SSL connection reused for every message of a run."""
+
+    def __init__(
+        self,
+        sender_email: str,
+        sender_name: str,
+        sender_password: str,
+        smtp_server: str = None,
+        smtp_port: int = None,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        self.sender_email = sender_email
+        self.sender_name = sender_name
+        self.sender_password = sender_password
+        self.smtp_server = smtp_server or os.environ.get("SMTP_SERVER", "")
+        self.smtp_port = int(smtp_port or os.environ.get("SMTP_PORT", 465))
+        self.batch_size = batch_size
+        self.server = None
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        if self.server is not None:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except smtplib.SMTPException:
+                pass
+            self.server = None
+        server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
+        server.login(self.sender_email, self.sender_password)
+        self.server = server
+        return server
+
+    def _head(self, to: list, subject: str, body: str, boundary: str) -> bytes:
+        """Headers and text part of the message, without the closing boundary."""
+        msg = MIMEMultipart(boundary=boundary)
+        msg["From"] = f"{self.sender_name} <{self.sender_email}>"
+        msg["To"] = ", ".join(to)
+        msg["Subject"] = subject
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid()
+        msg.attach(MIMEText(body, "plain"))
+        head = msg.as_bytes(policy=SMTP)
+        return head[: head.rindex(f"--{boundary}--".encode())]
+
+    def _stream_data(self, server, head: bytes, attachment_path: str, boundary: str) -> None:
+        code, response = server.docmd("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, response)
+        server.send(_dot_stuff(head))
+        if attachment_path:
+            filename = os.path.basename(attachment_path)
+            server.send(
+                (
+                    f"--{boundary}\r\n"
+                    "Content-Type: application/octet-stream\r\n"
+                    "MIME-Version: 1.0\r\n"
+                    "Content-Transfer-Encoding: base64\r\n"
+                    f'Content-Disposition: attachment; filename="{filename}"\r\n'
+                    "\r\n"
+                ).encode()
+            )
+            with open(attachment_path, "rb") as attachment:
+                while True:
+                    chunk = attachment.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    server.send(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+        server.send(f"--{boundary}--\r\n.\r\n".encode())
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+
+    def _send_batch(self, batch: list, subject: str, body: str, attachment_path: str) -> list:
+        """
+        Send one message to a batch of recipients
+        :return: the recipients the server refused
+        """
+        server = self._connection()
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(self.sender_email)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, response, self.sender_email)
+        refused = [address for address in batch if server.rcpt(address)[0] not in (250, 251)]
+        if len(refused) == len(batch):
+            server.rset()
+            return refused
+        boundary = f"=============={uuid.uuid4().hex}=="
+        head = self._head(batch, subject, body, boundary)
+        self._stream_data(server, head, attachment_path, boundary)
+        return refused
+
+    def send(self, recipients, subject: str, body: str, attachment_path: str = None) -> dict:
+        """
+        Send the message, one batch of recipients at a time
+        :param recipients: list or comma separated string of addresses
+        :param attachment_path: file to attach, optional
+        :return: {"ok", "sent", "refused", "error", "elapsed_ms"}
+        """
+        started = time.monotonic()
+        result = {"ok": False, "sent": [], "refused": [], "error": None, "elapsed_ms": 0}
+        recipients = split_recipients(recipients)
+        if attachment_path and not os.path.isfile(attachment_path):
+            result["error"] = f"Attachment file not found: {attachment_path}"
+        elif not recipients:
+            result["error"] = "No recipients"
+        else:
+            with self.lock:
+                for i in range(0, len(recipients), self.batch_size):
+                    batch = recipients[i : i + self.batch_size]
+                    try:
+                        try:
+                            refused = self._send_batch(batch, subject, body, attachment_path)
+                        except smtplib.SMTPServerDisconnected:
+                            # the kept-alive connection died mid-send, retry once on a new one
+                            self.server = None
+                            refused = self._send_batch(batch, subject, body, attachment_path)
+                    except (smtplib.SMTPException, OSError) as e:
+                        self.server = None
+                        result["refused"].extend(batch)
+                        result["error"] = str(e) or type(e).__name__
+                        continue
+                    result["refused"].extend(refused)
+                    result["sent"].extend(a for a in batch if a not in refused)
+            result["ok"] = bool(result["sent"]) and not result["refused"]
+        result["elapsed_ms"] = int((time.monotonic() - started) * 1000)
+        if result["ok"]:
+            logging.info(f"Email '{subject}' sent to {len(result['sent'])} recipient(s)")
+        else:
+            logging.error(f"Email '{subject}' failed: {result}")
+        return result
+
+    async def send_async(self, *args, **kwargs) -> dict:
+        return await asyncio.to_thread(self.send, *args, **kwargs)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.server is not None:
+                try:
+                    self.server.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self.server = None
+
+
+_mailers = {}
+
+
+def get_mailer(sender_email: str, sender_name: str, sender_password: str) -> Mailer:
+    """The process-wide mailer of a sender, so its connection is reused."""
+    key = (sender_email, sender_name)
+    if key not in _mailers:
+        _mailers[key] = Mailer(sender_email, sender_name, sender_password)
+    return _mailers[key]
+
+
+@atexit.register
+def close_mailers() -> None:
+    for mailer in _mailers.values():
+        mailer.close()
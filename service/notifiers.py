@@ -0,0 +1,299 @@
+"""
+Pluggable alert backends.
+
+The senders in ``service.alert`` (send_slack_message, send_urgent_workshop_alert,
+...) go through the notifier selected for the running scraper instead of
+always calling Slack:
+
+    slack     the Slack Web API (the default when SLACK_API_TOKEN is set)
+    email     one plain-text email per alert, through the pooled mailer
+    webhook   JSON POST to NOTIFY_WEBHOOK_URL
+    file      one JSON line per alert in NOTIFY_FILE (the default without Slack
+              credentials, so scrapers still run)
+
+The backend is chosen by ``configure_notifier(scraper_name)``, which every
+scraper calls when its run starts: ``NOTIFIER_<SCRAPER>`` (e.g.
+NOTIFIER_COSTCO=email), then ``NOTIFIER``, then ``NOTIFIER_RULES``. The choice
+holds for the context it was made in (a context variable), so scrapers
+imported or run in the same process keep their own backends.
+
+Slack is the default; without SLACK_API_TOKEN and CHANNEL_ID alerts are written
+to the file notifier, except in CI, where a scraper that would alert nobody
+fails instead.
+
+To load-test alert throughput and latency without Slack, run the local sink
+and point the webhook notifier at it:
+
+    python service/notifiers.py sink 8765
+    NOTIFIER=webhook NOTIFY_WEBHOOK_URL=http://127.0.0.1:8765/ python scraper/home_depo.py
+"""
+
+import abc
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+NOTIFY_FILE = os.environ.get("NOTIFY_FILE", "storage/notifications.jsonl")
+NOTIFY_WEBHOOK_URL = os.environ.get("NOTIFY_WEBHOOK_URL")
+NOTIFY_WEBHOOK_TIMEOUT = float(os.environ.get("NOTIFY_WEBHOOK_TIMEOUT", 10))
+SINK_PORT = 8765
+
+# backend per scraper, env vars take precedence
+NOTIFIER_RULES = {
+    "default": "slack",
+}
+
+
+def alert_payload(scraper_name: str, sender: str, args: tuple, kwargs: dict) -> dict:
+    """
+    Backend independent description of one alert
+    :param sender: name of the sender in service.alert
+    :return: JSON serialisable dict
+    """
+    from service.alert_digest import describe
+
+    kind, text = describe(sender, args, kwargs)
+    return {
+        "scraper": scraper_name,
+        "alert": sender,
+        "kind": kind,
+        "text": text,
+        "args": args,
+        "kwargs": kwargs,
+        "sent_at": time.time(),
+    }
+
+
+class NotifierConfigError(RuntimeError):
+    """The selected backend cannot deliver anything."""
+
+
+class Notifier(abc.ABC):
+    """Delivers the alerts of one scraper."""
+
+    name = None
+
+    def __init__(self, scraper_name: str = "default") -> None:
+        self.scraper_name = scraper_name
+
+    @abc.abstractmethod
+    def notify(self, sender: str, args: tuple = (), kwargs: dict = None):
+        """
+        Deliver one alert
+        :param sender: name of the sender in service.alert the alert was raised with
+        :param args: the sender's arguments
+        :return: whether it was delivered (the sender's own result for Slack)
+        """
+
+
+class SlackNotifier(Notifier):
+    name = "slack"
+
+    def notify(self, sender, args=(), kwargs=None):
+        import service.alert
+
+        func = getattr(service.alert, sender)
+        return getattr(func, "__wrapped__", func)(*args, **(kwargs or {}))
+
+
+class EmailNotifier(Notifier):
+    name = "email"
+
+    def __init__(self, scraper_name: str = "default", recipients=None) -> None:
+        super().__init__(scraper_name)
+        self.recipients = recipients or os.environ.get(
+            "NOTIFY_EMAIL_TO", os.environ.get("RECEIVER_EMAILS", "")
+        )
+
+    def notify(self, sender, args=(), kwargs=None):
+        from service.mailer import get_mailer
+
+        payload = alert_payload(self.scraper_name, sender, args, kwargs or {})
+        mailer = get_mailer(
+            os.environ.get("EMAIL_USER"),
+            f"{self.scraper_name} alerts",
+            os.environ.get("EMAIL_PASSWORD"),
+        )
+        subject = f"[{self.scraper_name}] {payload['kind']} alert"
+        return mailer.send(self.recipients, subject, payload["text"])["ok"]
+
+
+class WebhookNotifier(Notifier):
+    name = "webhook"
+
+    def __init__(self, scraper_name: str = "default", url: str = None) -> None:
+        super().__init__(scraper_name)
+        self.url = url or NOTIFY_WEBHOOK_URL
+
+    def notify(self, sender, args=(), kwargs=None):
+        import urllib.request
+
+        if not self.url:
+            logging.error("NOTIFY_WEBHOOK_URL is not set")
+            return False
+        payload = alert_payload(self.scraper_name, sender, args, kwargs or {})
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=NOTIFY_WEBHOOK_TIMEOUT) as response:
+                return 200 <= response.status < 300
+        except OSError as e:
+            logging.error(f"Error posting alert to {self.url}: {e}")
+            return False
+
+
+class FileNotifier(Notifier):
+    name = "file"
+
+    def __init__(self, scraper_name: str = "default", path: str = None) -> None:
+        super().__init__(scraper_name)
+        self.path = path or NOTIFY_FILE
+        self.lock = threading.Lock()
+
+    def notify(self, sender, args=(), kwargs=None):
+        payload = alert_payload(self.scraper_name, sender, args, kwargs or {})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(payload, default=str) + "\n")
+        return True
+
+
+NOTIFIERS = {
+    notifier.name: notifier
+    for notifier in (SlackNotifier, EmailNotifier, WebhookNotifier, FileNotifier)
+}
+
+
+def running_in_ci() -> bool:
+    return os.environ.get("CI") == "true" or os.environ.get("GITHUB_ACTIONS") == "true"
+
+
+def notifier_name(scraper_name: str) -> str:
+    env_name = f"NOTIFIER_{scraper_name.upper().replace('-', '_')}"
+    name = os.environ.get(env_name) or os.environ.get("NOTIFIER")
+    if not name:
+        name = NOTIFIER_RULES.get(scraper_name, NOTIFIER_RULES["default"])
+    if name == "slack" and not (
+        os.environ.get("SLACK_API_TOKEN") and os.environ.get("CHANNEL_ID")
+    ):
+        if running_in_ci():
+            logging.error("No Slack token or channel ID found, no alert can be sent")
+            raise NotifierConfigError("SLACK_API_TOKEN and CHANNEL_ID must be set in CI")
+        logging.error("No Slack token or channel ID found, writing alerts to a file")
+        name = "file"
+    if name not in NOTIFIERS:
+        logging.error(f"Unknown notifier {name}, using slack")
+        name = "slack"
+    return name
+
+
+_active = contextvars.ContextVar("notifier", default=None)
+_default = None
+
+
+def create_notifier(scraper_name: str) -> Notifier:
+    notifier = NOTIFIERS[notifier_name(scraper_name)](scraper_name)
+    logging.info(f"{scraper_name} alerts go to {notifier.name}")
+    return notifier
+
+
+def configure_notifier(scraper_name: str) -> Notifier:
+    """
+    Select the backend for the alerts raised in the current context, i.e. the
+    scraper run that calls it and the tasks and threads it starts
+    """
+    notifier = create_notifier(scraper_name)
+    _active.set(notifier)
+    return notifier
+
+
+def current_scraper():
+    """Name of the scraper configured in this context, None when there is none."""
+    notifier = _active.get()
+    return notifier.scraper_name if notifier is not None else None
+
+
+def get_notifier() -> Notifier:
+    """The configured notifier, the default rule's when none was configured."""
+    global _default
+    notifier = _active.get()
+    if notifier is not None:
+        return notifier
+    if _default is None:
+        _default = create_notifier("default")
+    return _default
+
+
+class AlertSink:
+    """
+    Local HTTP endpoint for the webhook notifier, recording what it receives
+    and the delivery latency of every alert
+    """
+
+    def __init__(self, port: int = SINK_PORT, host: str = "127.0.0.1") -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        sink = self
+        self.received = []
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                sink.record(json.loads(body or b"{}"))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/"
+        self.thread = None
+
+    def record(self, payload: dict) -> None:
+        latency_ms = int((time.time() - payload.get("sent_at", time.time())) * 1000)
+        with self.lock:
+            self.received.append({**payload, "latency_ms": latency_ms})
+
+    def stats(self) -> dict:
+        with self.lock:
+            latencies = sorted(item["latency_ms"] for item in self.received)
+        if not latencies:
+            return {"received": 0}
+        return {
+            "received": len(latencies),
+            "p50_ms": latencies[len(latencies) // 2],
+            "p95_ms": latencies[int(len(latencies) * 0.95)],
+            "max_ms": latencies[-1],
+        }
+
+    def start(self) -> "AlertSink":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:2] != ["sink"]:
+        print("usage: python service/notifiers.py sink [port]")
+        sys.exit(2)
+    sink = AlertSink(int(sys.argv[2]) if len(sys.argv) > 2 else SINK_PORT)
+    print(f"Alert sink listening on {sink.url}, Ctrl+C to stop")
+    try:
+        sink.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"sink: {sink.stats()}")
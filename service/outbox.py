@@ -0,0 +1,428 @@
+"""
+Durable alert outbox.
+
+Alerts sent through ``dispatch`` (see service/alert_queue.py), with or
+without a running dispatcher, are first written to a local SQLite database
+(WAL mode, so an insert costs well under a millisecond) and delivered in the
+background: by the dispatcher's task, or outside one by an ``OutboxWorker``
+thread, so the scrape never waits on a sender. A row is claimed before it is
+sent, so two processes sharing the outbox never deliver it twice. A delivery
+that raises or returns False is retried a few times within the run; after
+that it stays in the outbox and is retried with exponential backoff, by the
+next run or by hand:
+
+    python service/outbox.py           # pending / delivered / dead counts
+    python service/outbox.py replay    # deliver everything still pending now
+
+Rows hold the name of the sender in ``service.alert``, its JSON encoded
+arguments and the scraper that raised it, so an alert raised by one run can
+be delivered by a later one (or by another scraper's process) through the
+notifier of the scraper it belongs to.
+"""
+
+import atexit
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+OUTBOX_PATH = os.environ.get("ALERT_OUTBOX_PATH", "storage/alert_outbox.db")
+OUTBOX_ENABLED = os.environ.get("ALERT_OUTBOX", "1") != "0"
+MAX_ATTEMPTS = 8
+# quick retries within the run before an alert is left to a later run
+RUN_RETRIES = int(os.environ.get("ALERT_RUN_RETRIES", 2))
+RUN_RETRY_SECONDS = float(os.environ.get("ALERT_RUN_RETRY_SECONDS", 2))
+# seconds the worker may keep a finishing process alive to deliver what is queued
+DRAIN_TIMEOUT = float(os.environ.get("ALERT_DRAIN_TIMEOUT", 30))
+# a claimed row whose sender never finished (the process died), or a held
+# digest item whose digest was never sent, is sent again after this
+CLAIM_TIMEOUT_SECONDS = 600
+BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+# delivered rows are kept this long for inspection
+KEEP_DELIVERED_SECONDS = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    scraper TEXT,
+    sender TEXT NOT NULL,
+    args TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    delivered_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_attempt_at);
+"""
+
+
+class OutboxDeliveryError(Exception):
+    """The sender failed; the alert stays in the outbox for a retry."""
+
+
+def resolve_sender(name: str):
+    """The sender of that name in service.alert, None when there is none."""
+    import service.alert
+
+    sender = getattr(service.alert, name, None) if name else None
+    return sender if callable(sender) else None
+
+
+def _send_as(scraper, sender, args: list, kwargs: dict):
+    # alerts go through the notifier of the scraper that raised them
+    if scraper:
+        from service.notifiers import configure_notifier
+
+        configure_notifier(scraper)
+    return sender(*args, **kwargs)
+
+
+class Outbox:
+    """SQLite-backed queue of alerts waiting to be delivered."""
+
+    def __init__(
+        self, path: str = OUTBOX_PATH, retries: int = None, retry_delay: float = None
+    ) -> None:
+        """
+        :param retries: quick retries of a failed row by the worker, RUN_RETRIES by default
+        :param retry_delay: seconds before the first of them, RUN_RETRY_SECONDS by default
+        """
+        self.path = path
+        self.retries = RUN_RETRIES if retries is None else retries
+        self.retry_delay = RUN_RETRY_SECONDS if retry_delay is None else retry_delay
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self._worker = None
+        # shared with the dispatcher's worker threads, guarded by self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")]
+        if "scraper" not in columns:
+            # outboxes created before rows recorded their scraper
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN scraper TEXT")
+        self.conn.execute(
+            "DELETE FROM outbox WHERE status = 'delivered' AND delivered_at < ?",
+            (time.time() - KEEP_DELIVERED_SECONDS,),
+        )
+
+    def enqueue(
+        self,
+        sender: str,
+        args: tuple = (),
+        kwargs: dict = None,
+        scraper: str = None,
+        held: bool = False,
+    ):
+        """
+        Store one alert
+        :param sender: name of the sender in service.alert
+        :param scraper: scraper the alert belongs to, the one configured in
+            this context by default
+        :param held: collected into a digest: not sent unless the run ends
+            without folding it into the digest (see fold)
+        :return: row id, None when the arguments cannot be stored
+        """
+        if scraper is None:
+            from service.notifiers import current_scraper
+
+            scraper = current_scraper()
+        try:
+            encoded = (json.dumps(list(args)), json.dumps(kwargs or {}))
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Alert for {sender} cannot be stored in the outbox: {e}")
+            return None
+        now = time.time()
+        status, due = ("held", now + CLAIM_TIMEOUT_SECONDS) if held else ("pending", now)
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO outbox "
+                "(created_at, scraper, sender, args, kwargs, status, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (now, scraper, sender, *encoded, status, due),
+            )
+        return cursor.lastrowid
+
+    def fold(self, held_ids: list, sender: str, args: tuple = (), kwargs: dict = None):
+        """
+        Replace held digest items by the digest itself, in one transaction
+        :param held_ids: rows stored with held=True
+        :param sender: name of the sender of the digest in service.alert
+        :return: row id of the digest, None when it cannot be stored (the
+            held rows are then sent one by one later)
+        """
+        try:
+            encoded = (json.dumps(list(args)), json.dumps(kwargs or {}))
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Digest for {sender} cannot be stored in the outbox: {e}")
+            return None
+        from service.notifiers import current_scraper
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO outbox "
+                    "(created_at, scraper, sender, args, kwargs, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (now, current_scraper(), sender, *encoded, now),
+                )
+                # delivered as part of the digest
+                self.conn.executemany(
+                    "UPDATE outbox SET status = 'delivered', delivered_at = ? "
+                    "WHERE id = ? AND status = 'held'",
+                    [(now, row_id) for row_id in held_ids],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor.lastrowid
+
+    def pending_ids(self, due_only: bool = True) -> list:
+        query = "SELECT id FROM outbox WHERE status = 'pending'"
+        params = ()
+        if due_only:
+            query += " AND next_attempt_at <= ?"
+            params = (time.time(),)
+        with self.lock:
+            # claims and digest items left behind by a process that died
+            self.conn.execute(
+                "UPDATE outbox SET status = 'pending' "
+                "WHERE status IN ('sending', 'held') AND next_attempt_at <= ?",
+                (time.time(),),
+            )
+            return [row[0] for row in self.conn.execute(query + " ORDER BY id", params)]
+
+    def claim(self, row_id: int):
+        """
+        Mark a pending row as being sent
+        :return: (scraper, sender, args, kwargs, attempts), None when the row is not
+            pending, e.g. another process claimed it first
+        """
+        # SELECT then UPDATE in one write transaction rather than
+        # UPDATE ... RETURNING, which needs SQLite 3.35 (Bullseye has 3.34)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT scraper, sender, args, kwargs, attempts FROM outbox "
+                    "WHERE id = ? AND status = 'pending'",
+                    (row_id,),
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                        (time.time() + CLAIM_TIMEOUT_SECONDS, row_id),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return tuple(row) if row else None
+
+    def deliver(self, row_id: int):
+        """
+        Claim the row and call the stored sender; on failure schedule a retry
+        and raise OutboxDeliveryError
+        :return: True when delivered, None when the row was not pending
+        """
+        row = self.claim(row_id)
+        if row is None:
+            return None
+        scraper, name, args, kwargs, attempts = row
+        sender = resolve_sender(name)
+        try:
+            if sender is None:
+                raise OutboxDeliveryError(f"Unknown sender {name}")
+            # a copied context, so the caller's notifier is left alone
+            result = contextvars.copy_context().run(
+                _send_as, scraper, sender, json.loads(args), json.loads(kwargs)
+            )
+            if result is False:
+                raise OutboxDeliveryError(f"{name} reported a failure")
+        except Exception as e:
+            self._failed(row_id, attempts + 1, str(e) or type(e).__name__)
+            if isinstance(e, OutboxDeliveryError):
+                raise
+            raise OutboxDeliveryError(str(e)) from e
+        with self.lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'delivered', attempts = ?, delivered_at = ? "
+                "WHERE id = ?",
+                (attempts + 1, time.time(), row_id),
+            )
+        return True
+
+    def _failed(self, row_id: int, attempts: int, error: str) -> None:
+        status = "dead" if attempts >= MAX_ATTEMPTS else "pending"
+        delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        with self.lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                "last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, error[:500], row_id),
+            )
+        logging.warning(f"Alert {row_id} not delivered (attempt {attempts}, {status}): {error}")
+
+    def send(self, sender: str, args: tuple = (), kwargs: dict = None):
+        """
+        Store one alert and hand it to the background worker, without
+        waiting for it to be delivered
+        :param sender: name of the sender in service.alert
+        :return: row id, None when it could not be stored
+        """
+        row_id = self.enqueue(sender, args, kwargs)
+        if row_id is not None:
+            self.worker().submit(row_id)
+        return row_id
+
+    def worker(self) -> "OutboxWorker":
+        """The worker delivering this outbox's rows, started on first use."""
+        with self.lock:
+            if self._worker is None:
+                self._worker = OutboxWorker(self, self.retries, self.retry_delay)
+        return self._worker
+
+    def replay(self, due_only: bool = False) -> dict:
+        """
+        Deliver what earlier runs left behind
+        :param due_only: skip rows still backing off
+        :return: {"delivered": n, "failed": n}
+        """
+        result = {"delivered": 0, "failed": 0}
+        for row_id in self.pending_ids(due_only=due_only):
+            try:
+                self.deliver(row_id)
+                result["delivered"] += 1
+            except OutboxDeliveryError:
+                result["failed"] += 1
+        return result
+
+    def stats(self) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+            counts = dict(rows.fetchall())
+        return {status: counts.get(status, 0) for status in ("pending", "delivered", "dead")}
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class OutboxWorker:
+    """
+    Delivers the rows of an outbox on a daemon thread. It first picks up the
+    rows earlier runs left behind, retries a failed row a few times with a
+    doubling delay, and at exit gets up to DRAIN_TIMEOUT seconds to finish;
+    anything left is sent by a later run.
+    """
+
+    def __init__(self, outbox: Outbox, retries: int = 0, retry_delay: float = 0) -> None:
+        self.outbox = outbox
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cond = threading.Condition()
+        # (due, seq, row_id, attempt), seq keeps rows due together in order
+        self.due = []
+        self.seq = itertools.count()
+        # ids in self.due or being sent
+        self.rows = set()
+        self.busy = 0
+        self.thread = None
+
+    def submit(self, row_id: int, delay: float = 0) -> None:
+        with self.cond:
+            self._push(time.monotonic() + delay, row_id, 0)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+                self.thread.start()
+                atexit.register(self.drain)
+
+    def _push(self, due: float, row_id: int, attempt: int) -> None:
+        # called with self.cond held; a row already queued or being sent is skipped
+        if row_id in self.rows:
+            return
+        self.rows.add(row_id)
+        heapq.heappush(self.due, (due, next(self.seq), row_id, attempt))
+        self.cond.notify_all()
+
+    def _run(self) -> None:
+        # leftovers of earlier runs go first
+        leftovers = self.outbox.pending_ids()
+        with self.cond:
+            for row_id in leftovers:
+                self._push(0, row_id, 0)
+        while True:
+            with self.cond:
+                while not self.due or self.due[0][0] > time.monotonic():
+                    self.cond.wait(self.due[0][0] - time.monotonic() if self.due else None)
+                _, _, row_id, attempt = heapq.heappop(self.due)
+                self.busy += 1
+            retry = False
+            try:
+                self.outbox.deliver(row_id)
+            except OutboxDeliveryError:
+                retry = attempt < self.retries
+            except Exception as e:
+                logging.error(f"Outbox worker could not deliver alert {row_id}: {e}")
+            finally:
+                with self.cond:
+                    self.busy -= 1
+                    self.rows.discard(row_id)
+                    if retry:
+                        delay = self.retry_delay * 2**attempt
+                        self._push(time.monotonic() + delay, row_id, attempt + 1)
+                    self.cond.notify_all()
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """
+        Wait for the queued rows and their retries
+        :return: False when some were still waiting after timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.due or self.busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.error(
+                        f"Left {len(self.due) + self.busy} alert(s) in the outbox after {timeout}s"
+                    )
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+
+_outbox = None
+
+
+def get_outbox():
+    """The process-wide outbox, None when ALERT_OUTBOX=0."""
+    global _outbox
+    if not OUTBOX_ENABLED:
+        return None
+    if _outbox is None:
+        _outbox = Outbox()
+    return _outbox
+
+
+if __name__ == "__main__":
+    current = os.path.dirname(os.path.realpath(__file__))
+    sys.path.append(os.path.dirname(current))
+    logging.basicConfig(level=logging.INFO)
+    outbox = Outbox()
+    if sys.argv[1:2] == ["replay"]:
+        print(f"replayed: {outbox.replay()}")
+    print(f"outbox: {outbox.stats()}")
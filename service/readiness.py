@@ -0,0 +1,240 @@
+"""
+Event-driven page readiness for the browser scrapers.
+
+Instead of sleeping for a fixed number of milliseconds, a scraper attaches a
+``PageReadiness`` to its page *before* navigating and then waits for the
+conditions it actually cares about:
+
+    selector          an element matching the CSS selector is present (or visible)
+    network_idle_ms   no more than ``max_inflight`` requests for that long
+    response_match    a response whose URL contains the string / matches the
+                      regex / satisfies the callable has been received
+
+``wait`` resolves as soon as all (or, with ``mode="any"``, the first) of the
+conditions hold, and never later than ``deadline_ms``. How long every
+condition took is appended to ``READINESS_TIMINGS_FILE`` so the deadlines can
+be tightened from real data:
+
+    python service/readiness.py        # p50/p95 per label and condition
+
+Works with pyppeteer and Playwright pages, which emit the same request and
+response events.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+READINESS_TIMINGS_FILE = os.environ.get(
+    "READINESS_TIMINGS_FILE", "storage/readiness_timings.jsonl"
+)
+POLL_INTERVAL = 0.05
+
+
+class PageReadiness:
+    """Tracks network activity of ``page`` and waits for readiness conditions."""
+
+    def __init__(self, page) -> None:
+        self.page = page
+        self.inflight = 0
+        self.last_activity = time.monotonic()
+        self.responses = []
+        self._handlers = {
+            "request": self._on_request,
+            "requestfinished": self._on_request_done,
+            "requestfailed": self._on_request_done,
+            "response": self._on_response,
+        }
+        for event, handler in self._handlers.items():
+            page.on(event, handler)
+
+    def detach(self) -> None:
+        for event, handler in self._handlers.items():
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
+
+    def _on_request(self, *args) -> None:
+        self.inflight += 1
+        self.last_activity = time.monotonic()
+
+    def _on_request_done(self, *args) -> None:
+        self.inflight = max(0, self.inflight - 1)
+        self.last_activity = time.monotonic()
+
+    def _on_response(self, response) -> None:
+        self.responses.append(response)
+
+    # -- conditions -----------------------------------------------------------
+
+    async def _selector_present(self, selector: str, visible: bool, timeout_ms: int) -> None:
+        if hasattr(self.page, "waitForSelector"):
+            await self.page.waitForSelector(
+                selector, {"visible": visible, "timeout": timeout_ms}
+            )
+        else:
+            await self.page.wait_for_selector(
+                selector, state="visible" if visible else "attached", timeout=timeout_ms
+            )
+
+    async def _network_idle(self, idle_ms: int, max_inflight: int) -> None:
+        idle = idle_ms / 1000
+        while True:
+            now = time.monotonic()
+            if self.inflight <= max_inflight and now - self.last_activity >= idle:
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _response_seen(self, match) -> None:
+        checked = 0
+        while True:
+            for response in self.responses[checked:]:
+                if _matches(match, response):
+                    return
+            checked = len(self.responses)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    # -- public API -----------------------------------------------------------
+
+    async def wait(
+        self,
+        selector: str = None,
+        visible: bool = False,
+        network_idle_ms: int = None,
+        max_inflight: int = 0,
+        response_match=None,
+        mode: str = "all",
+        deadline_ms: int = 30000,
+        label: str = None,
+    ) -> dict:
+        """
+        Wait for the given conditions, never longer than ``deadline_ms``
+        :param selector: CSS selector that must be present
+        :param visible: require the selector to be visible, not just attached
+        :param network_idle_ms: how long the network must stay quiet
+        :param max_inflight: requests allowed in flight while "quiet"
+        :param response_match: URL substring, compiled regex or callable(response)
+        :param mode: "all" to wait for every condition, "any" for the first one
+        :param deadline_ms: hard upper bound for the whole wait
+        :param label: name the timings are recorded under
+        :return: report dict with ready, timed_out, elapsed_ms and per-condition ms
+        """
+        started = time.monotonic()
+        conditions = {}
+        if selector:
+            conditions["selector"] = self._selector_present(selector, visible, deadline_ms)
+        if network_idle_ms is not None:
+            conditions["network_idle"] = self._network_idle(network_idle_ms, max_inflight)
+        if response_match is not None:
+            conditions["response"] = self._response_seen(response_match)
+
+        timings = {name: None for name in conditions}
+
+        async def timed(name, coro):
+            await coro
+            timings[name] = int((time.monotonic() - started) * 1000)
+
+        tasks = [asyncio.ensure_future(timed(n, c)) for n, c in conditions.items()]
+        if tasks:
+            return_when = (
+                asyncio.FIRST_COMPLETED if mode == "any" else asyncio.ALL_COMPLETED
+            )
+            done, pending = await asyncio.wait(
+                tasks, timeout=deadline_ms / 1000, return_when=return_when
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                if task.exception():
+                    logging.info(f"Readiness condition failed: {task.exception()}")
+
+        satisfied = [t for t in timings.values() if t is not None]
+        ready = bool(satisfied) if mode == "any" else len(satisfied) == len(timings)
+        report = {
+            "label": label,
+            "ready": ready,
+            "timed_out": not ready,
+            "elapsed_ms": int((time.monotonic() - started) * 1000),
+            "deadline_ms": deadline_ms,
+            "mode": mode,
+            "conditions": timings,
+        }
+        level = logging.info if ready else logging.warning
+        level(f"Page readiness {label or ''}: {report}")
+        record_timings(report)
+        return report
+
+
+def _matches(match, response) -> bool:
+    if callable(match):
+        return bool(match(response))
+    url = getattr(response, "url", "")
+    if isinstance(match, re.Pattern):
+        return bool(match.search(url))
+    return match in url
+
+
+def record_timings(report: dict, path: str = None) -> None:
+    """Append a readiness report to the timings file, ignoring I/O errors."""
+    path = path or READINESS_TIMINGS_FILE
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(dict(report, at=int(time.time()))) + "\n")
+    except OSError as e:
+        logging.warning(f"Could not record readiness timings: {e}")
+
+
+def _percentile(values: list, pct: float) -> int:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_timings(path: str = None) -> dict:
+    """
+    Per label and condition: sample count, p50, p95 and max in ms, plus the
+    number of waits that hit their deadline.
+    """
+    path = path or READINESS_TIMINGS_FILE
+    samples = {}
+    timeouts = {}
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                report = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            label = report.get("label") or "unlabelled"
+            timeouts[label] = timeouts.get(label, 0) + int(report.get("timed_out", False))
+            for name, ms in report.get("conditions", {}).items():
+                if ms is not None:
+                    samples.setdefault(label, {}).setdefault(name, []).append(ms)
+
+    summary = {}
+    for label in set(samples) | set(timeouts):
+        summary[label] = {"timeouts": timeouts.get(label, 0)}
+        for name, values in samples.get(label, {}).items():
+            summary[label][name] = {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "max": max(values),
+            }
+    return summary
+
+
+if __name__ == "__main__":
+    json.dump(summarize_timings(sys.argv[1] if len(sys.argv) > 1 else None), sys.stdout, indent=2)
+    print()
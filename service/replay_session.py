@@ -0,0 +1,153 @@
+"""
+Browser-harvested HTTP sessions.
+
+Some endpoints (the IRCC processing-time feeds behind canada.ca's CDN) reject
+cold HTTP clients but happily serve a client that looks like the browser that
+loaded the page. A ``HarvestedSession`` keeps what a real browser sent - the
+feed URLs, request headers and cookies - on disk with an expiry, so later runs
+can replay the requests with curl-cffi (which impersonates Chrome's TLS and
+HTTP/2 fingerprint) instead of driving a whole browser:
+
+    session = HarvestedSession.load(path)
+    data = await session.replay() if session else None
+    if data is None:
+        ...                    # browser fallback, then HarvestedSession(...).save(path)
+
+``replay`` returns None whenever the server rejects the replay (non-200 status,
+a challenge page instead of JSON, network errors) so callers can fall back.
+"""
+
+import json
+import logging
+import os
+import time
+
+DEFAULT_TTL = int(os.environ.get("REPLAY_SESSION_TTL", 6 * 3600))
+REPLAY_TIMEOUT = 10
+IMPERSONATE = "chrome"
+
+# headers the HTTP client must compute itself
+SKIP_HEADERS = {"host", "cookie", "content-length", "connection", "accept-encoding"}
+
+
+def clean_headers(headers: dict) -> dict:
+    """Drop HTTP/2 pseudo headers and the ones tied to a single connection."""
+    return {
+        k: v
+        for k, v in headers.items()
+        if not k.startswith(":") and k.lower() not in SKIP_HEADERS
+    }
+
+
+class HarvestedSession:
+    """Feed URLs, headers and cookies captured from a browser, with an expiry."""
+
+    def __init__(
+        self, urls: dict, headers: dict, cookies: dict, expires_at: float = None
+    ) -> None:
+        self.urls = urls
+        self.headers = clean_headers(headers)
+        self.cookies = cookies
+        self.expires_at = expires_at or time.time() + DEFAULT_TTL
+
+    @classmethod
+    def from_browser(cls, urls: dict, headers: dict, cookies: list, ttl: int = DEFAULT_TTL):
+        """
+        Build a session from Playwright's ``context.cookies()`` list. The expiry
+        is the TTL, or the first cookie expiry when that comes sooner.
+        :param urls: key -> URL of each feed
+        :param headers: request headers the browser sent for the feeds
+        :param cookies: list of cookie dicts with name, value and expires
+        :param ttl: seconds the session is trusted for
+        :return:
+        """
+        expires_at = time.time() + ttl
+        for cookie in cookies:
+            expires = cookie.get("expires") or -1
+            if expires > 0:
+                expires_at = min(expires_at, expires)
+        return cls(
+            urls,
+            headers,
+            {cookie["name"]: cookie["value"] for cookie in cookies},
+            expires_at,
+        )
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    @classmethod
+    def load(cls, path: str):
+        """Return the cached session, or None when missing, unreadable or expired."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            session = cls(data["urls"], data["headers"], data["cookies"], data["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if session.expired:
+            logging.info(f"Harvested session in {path} has expired")
+            return None
+        return session
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "urls": self.urls,
+                    "headers": self.headers,
+                    "cookies": self.cookies,
+                    "expires_at": self.expires_at,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def invalidate(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def replay(self, timeout: int = REPLAY_TIMEOUT, cache=None):
+        """
+        Fetch every feed with the harvested headers and cookies
+        :param timeout: per-request timeout in seconds
+        :param cache: optional ConditionalCache; a 304 reuses the cached body
+        :return: key -> parsed JSON, or None when any request was rejected
+        """
+        from curl_cffi.requests import AsyncSession
+
+        results = {}
+        try:
+            async with AsyncSession(impersonate=IMPERSONATE) as client:
+                for key, url in self.urls.items():
+                    headers = dict(self.headers)
+                    cached_body = cache.body(url) if cache else None
+                    if cached_body is not None:
+                        headers.update(cache.request_headers(url))
+                    response = await client.get(
+                        url, headers=headers, cookies=self.cookies, timeout=timeout
+                    )
+                    if response.status_code == 304 and cached_body is not None:
+                        cache.unchanged(url, 304)
+                        results[key] = json.loads(cached_body)
+                        continue
+                    if response.status_code != 200:
+                        logging.info(f"Replay of {url} rejected: HTTP {response.status_code}")
+                        return None
+                    try:
+                        results[key] = response.json()
+                    except ValueError:
+                        logging.info(f"Replay of {url} did not return JSON")
+                        return None
+                    if cache and not cache.unchanged(url, 200, response.text):
+                        cache.store(url, response.headers, response.text)
+        except Exception as e:
+            logging.info(f"Replay failed: {e}")
+            return None
+        return results
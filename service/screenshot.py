@@ -0,0 +1,145 @@
+"""
+Screenshot pipeline for alerts.
+
+A full 1920x1200 PNG is several MB, slow to upload from a Pi and mostly
+irrelevant. ``ScreenshotPipeline`` captures only the element that matters
+(falling back to the viewport), downscales it and re-encodes it to JPEG or
+WebP at the highest quality that fits ``target_bytes``, then hands it to
+the alert dispatcher (or outbox) on a background thread:
+
+    pipeline = ScreenshotPipeline()
+    path = pipeline.capture_selenium(driver, "#product-page", "storage/shot")
+    upload = pipeline.upload_in_background(message, path)
+    ...
+    upload.join(timeout=30)
+    log.info(pipeline.timings)
+
+``await pipeline.capture_pyppeteer(page, selector, path)`` does the same for
+pyppeteer pages. ``timings`` records capture, encode and upload times in ms
+and the raw versus encoded size.
+"""
+
+import contextvars
+import io
+import logging
+import os
+import threading
+import time
+
+SCREENSHOT_FORMAT = os.environ.get("SCREENSHOT_FORMAT", "JPEG").upper()
+SCREENSHOT_TARGET_BYTES = int(os.environ.get("SCREENSHOT_TARGET_BYTES", 300 * 1024))
+SCREENSHOT_MAX_WIDTH = int(os.environ.get("SCREENSHOT_MAX_WIDTH", 1280))
+QUALITIES = [85, 75, 65, 55, 45]
+# never scale below this width while chasing the byte target
+MIN_WIDTH = 480
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+class ScreenshotPipeline:
+    """Capture, shrink and upload one screenshot, timing every step."""
+
+    def __init__(
+        self,
+        fmt: str = SCREENSHOT_FORMAT,
+        target_bytes: int = SCREENSHOT_TARGET_BYTES,
+        max_width: int = SCREENSHOT_MAX_WIDTH,
+    ) -> None:
+        self.format = fmt if fmt in EXTENSIONS else "JPEG"
+        self.target_bytes = target_bytes
+        self.max_width = max_width
+        self.timings = {}
+
+    def _elapsed(self, step: str, started: float) -> None:
+        self.timings[f"{step}_ms"] = int((time.monotonic() - started) * 1000)
+
+    def encode(self, png: bytes) -> bytes:
+        """
+        Downscale to max_width and re-encode at the best quality under target_bytes
+        :param png: raw screenshot
+        :return: encoded image, the lowest quality at MIN_WIDTH when nothing fits
+        """
+        from PIL import Image
+
+        started = time.monotonic()
+        image = Image.open(io.BytesIO(png)).convert("RGB")
+        if image.width > self.max_width:
+            image = image.resize(
+                (self.max_width, round(image.height * self.max_width / image.width)),
+                Image.LANCZOS,
+            )
+        while True:
+            for quality in QUALITIES:
+                buffer = io.BytesIO()
+                image.save(buffer, self.format, quality=quality, optimize=True)
+                data = buffer.getvalue()
+                if len(data) <= self.target_bytes:
+                    break
+            # still too big at the lowest quality: trade resolution instead
+            if len(data) <= self.target_bytes or image.width * 0.75 < MIN_WIDTH:
+                break
+            image = image.resize(
+                (round(image.width * 0.75), round(image.height * 0.75)), Image.LANCZOS
+            )
+        self._elapsed("encode", started)
+        self.timings.update({"raw_bytes": len(png), "bytes": len(data), "width": image.width})
+        return data
+
+    def _write(self, png: bytes, path: str) -> str:
+        data = self.encode(png)
+        path = os.path.splitext(path)[0] + EXTENSIONS[self.format]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def capture_selenium(self, driver, selector: str, path: str) -> str:
+        """
+        Screenshot one element of a selenium page (the viewport when it is missing)
+        :param driver: selenium WebDriver
+        :param selector: CSS selector of the region to keep, None for the viewport
+        :param path: where to save it, the extension follows the format
+        :return: path of the saved image
+        """
+        started = time.monotonic()
+        png = None
+        if selector:
+            try:
+                png = driver.find_element("css selector", selector).screenshot_as_png
+            except Exception as e:
+                logging.info(f"Cannot clip to {selector}, taking the viewport: {e}")
+        if png is None:
+            png = driver.get_screenshot_as_png()
+        self._elapsed("capture", started)
+        return self._write(png, path)
+
+    async def capture_pyppeteer(self, page, selector: str, path: str) -> str:
+        """Same as capture_selenium for a pyppeteer page."""
+        started = time.monotonic()
+        element = await page.querySelector(selector) if selector else None
+        if element is not None:
+            png = await element.screenshot({"type": "png"})
+        else:
+            png = await page.screenshot({"type": "png"})
+        self._elapsed("capture", started)
+        return self._write(png, path)
+
+    def upload_in_background(self, message: str, path: str) -> threading.Thread:
+        """
+        Post the message with the screenshot to Slack without blocking the caller
+        :return: the upload thread, join it before the process exits
+        """
+        from service.alert import send_slack_message
+        from service.alert_queue import dispatch
+
+        def upload():
+            started = time.monotonic()
+            dispatch(send_slack_message, message, screenshot_path=path)
+            self._elapsed("upload", started)
+            logging.info(f"Screenshot pipeline: {self.timings}")
+
+        # a plain thread starts with an empty context: run it in a copy of the
+        # caller's so the alert keeps the notifier the scraper configured
+        ctx = contextvars.copy_context()
+        thread = threading.Thread(target=ctx.run, args=(upload,), name="screenshot-upload")
+        thread.start()
+        return thread
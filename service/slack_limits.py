@@ -0,0 +1,157 @@
+"""
+Client-side Slack rate limiting.
+
+Slack limits every Web API method per workspace by tier and answers bursts
+with HTTP 429 ``ratelimited`` plus a ``Retry-After`` header. ``SlackRateLimiter``
+keeps one token bucket per method sized to its tier, so a burst of alerts is
+spread out instead of rejected, and retries a rate-limited call after
+``Retry-After`` (plus jitter) instead of dropping it:
+
+    limiter.call("chat_postMessage", lambda: client.chat_postMessage(...))
+
+The calls block the calling thread while they wait, which is the alert
+dispatcher's worker thread during a scraper run. ``stats()`` reports the
+number of callers waiting and the delays.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+# (requests per second, burst) per method; Tier 2 is 20+/min, Tier 3 50+/min,
+# chat.postMessage allows about one message per second per channel
+METHOD_LIMITS = {
+    "chat_postMessage": (1.0, 5),
+    "files_upload": (20 / 60, 3),
+    "pins_add": (20 / 60, 3),
+    "users_list": (20 / 60, 3),
+}
+DEFAULT_LIMIT = (50 / 60, 5)
+MAX_RETRIES = int(os.environ.get("SLACK_MAX_RETRIES", 5))
+# used when a 429 comes without Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+MAX_JITTER = 1.0
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token
+        :return: seconds to wait before the token may be used
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def retry_after(error):
+    """
+    Seconds Slack asked us to wait, None when the error is not a rate limit
+    :param error: exception raised by the Slack client
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    status = getattr(response, "status_code", None)
+    try:
+        code = response.get("error")
+    except Exception:
+        code = None
+    if status != 429 and code != "ratelimited":
+        return None
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class SlackRateLimiter:
+    """Token bucket per Slack method plus Retry-After aware retries."""
+
+    def __init__(self, limits: dict = None, max_retries: int = MAX_RETRIES, sleep=time.sleep) -> None:
+        self.limits = limits if limits is not None else METHOD_LIMITS
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.metrics = {
+            "calls": 0,
+            "throttled": 0,
+            "retries": 0,
+            "failed": 0,
+            "total_delay_ms": 0,
+            "max_delay_ms": 0,
+            "max_waiting": 0,
+        }
+
+    def _bucket(self, method: str) -> TokenBucket:
+        with self.lock:
+            if method not in self.buckets:
+                self.buckets[method] = TokenBucket(*self.limits.get(method, DEFAULT_LIMIT))
+            return self.buckets[method]
+
+    def _wait(self, seconds: float) -> None:
+        with self.lock:
+            self.waiting += 1
+            self.metrics["max_waiting"] = max(self.metrics["max_waiting"], self.waiting)
+        try:
+            self.sleep(seconds)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+    def call(self, method: str, request):
+        """
+        Run one Slack API call within the method's limit
+        :param method: WebClient method name, e.g. chat_postMessage
+        :param request: callable making the call
+        :return: the call's response
+        """
+        waited = 0.0
+        self.metrics["calls"] += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                delay = self._bucket(method).reserve()
+                if delay > 0:
+                    self.metrics["throttled"] += 1
+                    self._wait(delay)
+                    waited += delay
+                try:
+                    return request()
+                except Exception as e:
+                    wait = retry_after(e)
+                    if wait is None or attempt == self.max_retries:
+                        self.metrics["failed"] += 1
+                        raise
+                    wait += random.uniform(0, MAX_JITTER)
+                    self.metrics["retries"] += 1
+                    logging.warning(
+                        f"Slack {method} rate limited, retrying in {wait:.1f}s "
+                        f"({attempt + 1}/{self.max_retries})"
+                    )
+                    self._wait(wait)
+                    waited += wait
+        finally:
+            delay_ms = int(waited * 1000)
+            self.metrics["total_delay_ms"] += delay_ms
+            self.metrics["max_delay_ms"] = max(self.metrics["max_delay_ms"], delay_ms)
+
+    def stats(self) -> dict:
+        return {**self.metrics, "waiting": self.waiting}
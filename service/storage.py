@@ -0,0 +1,328 @@
+"""
+Scraper state store.
+
+The last alert date of every scraper and the workshops it discovered or
+registered for live in one SQLite database (WAL mode) instead of
+storage/last_alert.json and storage/registered_workshops.json. Lookups hit a
+primary key, a save is one atomic upsert, and scrapers running at the same
+time no longer overwrite each other's writes:
+
+    store = get_store()
+    store.save_registration("home_depo", {"workshop_event_id": "WS00029", ...})
+    store.get_registration("home_depo", "WS00029")
+
+A scraper run reads its registrations once with ``store.snapshot(scraper)``
+and writes its discoveries back in a single transaction when it ends.
+
+The JSON files are imported the first time the database is opened next to
+them; they are left in place but no longer read or written.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "storage/state.db")
+LEGACY_LAST_ALERT_FILE = "last_alert.json"
+LEGACY_REGISTRATIONS_FILE = "registered_workshops.json"
+# seconds a writer waits for another process holding the write lock
+BUSY_TIMEOUT = 10
+
+REGISTRATION_FIELDS = (
+    "workshop_id",
+    "workshop_event_id",
+    "title",
+    "event_date",
+    "registration_date",
+    "is_registered",
+)
+
+INSERT_REGISTRATION = (
+    f"INTO registrations (scraper, {', '.join(REGISTRATION_FIELDS)}) "
+    f"VALUES (?{', ?' * len(REGISTRATION_FIELDS)})"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS last_alert (
+    scraper TEXT PRIMARY KEY,
+    alert_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS registrations (
+    scraper TEXT NOT NULL,
+    workshop_event_id TEXT NOT NULL,
+    workshop_id TEXT,
+    title TEXT,
+    event_date TEXT,
+    registration_date TEXT,
+    is_registered INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (scraper, workshop_event_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at REAL NOT NULL
+);
+"""
+
+
+def _read_json(path: str) -> dict:
+    try:
+        if os.path.getsize(path) == 0:
+            return {}
+        with open(path, "r") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Skipping {path} during migration: {e}")
+        return {}
+
+
+class StateStore:
+    """SQLite-backed last alert dates and workshop registrations."""
+
+    def __init__(self, path: str = STATE_DB_PATH, legacy_dir: str = None) -> None:
+        self.path = path
+        self.legacy_dir = legacy_dir if legacy_dir is not None else os.path.dirname(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate_json()
+
+    def _migrate_json(self) -> None:
+        """Import the JSON files once; rows already in the database win."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = self.conn.execute(
+                    "SELECT 1 FROM migrations WHERE name = 'json'"
+                ).fetchone()
+                if done is None:
+                    alerts, registrations = self._import_json()
+                    self.conn.execute(
+                        "INSERT INTO migrations (name, applied_at) VALUES ('json', ?)",
+                        (time.time(),),
+                    )
+                    if alerts or registrations:
+                        logging.info(
+                            f"Migrated {alerts} alert date(s) and {registrations} "
+                            f"registration(s) from JSON to {self.path}"
+                        )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _import_json(self) -> tuple:
+        alerts = registrations = 0
+        path = os.path.join(self.legacy_dir, LEGACY_LAST_ALERT_FILE)
+        if os.path.exists(path):
+            for scraper, alert_date in _read_json(path).items():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO last_alert (scraper, alert_date) VALUES (?, ?)",
+                    (scraper, alert_date),
+                )
+                alerts += 1
+        path = os.path.join(self.legacy_dir, LEGACY_REGISTRATIONS_FILE)
+        if os.path.exists(path):
+            for scraper, workshops in _read_json(path).items():
+                for event_id, info in (workshops or {}).items():
+                    row = self._registration_row(scraper, {**info, "workshop_event_id": event_id})
+                    self.conn.execute(f"INSERT OR IGNORE {INSERT_REGISTRATION}", row)
+                    registrations += 1
+        return alerts, registrations
+
+    @staticmethod
+    def _registration_row(scraper: str, info: dict) -> tuple:
+        # entries written before the flag existed were full registrations
+        is_registered = info.get("is_registered")
+        return (
+            scraper,
+            *(info.get(field) for field in REGISTRATION_FIELDS[:-1]),
+            1 if is_registered is None else int(bool(is_registered)),
+        )
+
+    @staticmethod
+    def _registration_dict(row) -> dict:
+        info = {field: row[field] for field in REGISTRATION_FIELDS}
+        info["is_registered"] = bool(info["is_registered"])
+        return info
+
+    def get_last_alert_date(self, scraper: str):
+        """
+        :return: the last alert date as YYYY-MM-DD, None when there is none
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT alert_date FROM last_alert WHERE scraper = ?", (scraper,)
+            ).fetchone()
+        return row["alert_date"] if row else None
+
+    def set_last_alert_date(self, scraper: str, alert_date: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO last_alert (scraper, alert_date) VALUES (?, ?) "
+                "ON CONFLICT (scraper) DO UPDATE SET alert_date = excluded.alert_date",
+                (scraper, alert_date),
+            )
+
+    def get_registrations(self, scraper: str) -> dict:
+        """
+        :return: workshop_event_id -> registration details
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM registrations WHERE scraper = ?", (scraper,)
+            ).fetchall()
+        return {row["workshop_event_id"]: self._registration_dict(row) for row in rows}
+
+    def get_registration(self, scraper: str, workshop_event_id: str):
+        """
+        :return: registration details, None when the workshop is unknown
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM registrations WHERE scraper = ? AND workshop_event_id = ?",
+                (scraper, workshop_event_id),
+            ).fetchone()
+        return self._registration_dict(row) if row else None
+
+    def save_registration(self, scraper: str, info: dict) -> None:
+        """
+        Insert or update one registration
+        :param info: registration details, keyed by REGISTRATION_FIELDS
+        """
+        self.save_registrations(scraper, [info])
+
+    def save_registrations(self, scraper: str, infos: list) -> None:
+        """
+        Save several registrations in one transaction. A registration
+        overwrites what is stored; a workshop that was only discovered is
+        inserted when it is unknown, so it never undoes a registration another
+        process made in the meantime.
+        """
+        updates = ", ".join(
+            f"{field} = excluded.{field}"
+            for field in REGISTRATION_FIELDS
+            if field != "workshop_event_id"
+        )
+        rows = [self._registration_row(scraper, info) for info in infos]
+        registered = [row for row in rows if row[-1]]
+        discovered = [row for row in rows if not row[-1]]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    f"INSERT {INSERT_REGISTRATION} "
+                    f"ON CONFLICT (scraper, workshop_event_id) DO UPDATE SET {updates}",
+                    registered,
+                )
+                self.conn.executemany(
+                    f"INSERT {INSERT_REGISTRATION} "
+                    "ON CONFLICT (scraper, workshop_event_id) DO NOTHING",
+                    discovered,
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def snapshot(self, scraper: str) -> "RegistrationSnapshot":
+        return RegistrationSnapshot(self, scraper)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class RegistrationSnapshot:
+    """
+    The registrations of one scraper, read once per run. Lookups are served
+    from memory; newly discovered workshops are collected and written in one
+    transaction by flush() (or when the with block ends), while a completed
+    registration is written straight away, so a crash mid-run can only lose
+    discoveries, never a registration that was made.
+    """
+
+    def __init__(self, store: StateStore, scraper: str) -> None:
+        self.store = store
+        self.scraper = scraper
+        self.registrations = store.get_registrations(scraper)
+        self.pending = {}
+
+    def __contains__(self, workshop_event_id: str) -> bool:
+        return workshop_event_id in self.registrations
+
+    def is_registered(self, workshop_event_id: str) -> bool:
+        info = self.registrations.get(workshop_event_id)
+        return bool(info and info["is_registered"])
+
+    def save(self, info: dict) -> None:
+        """
+        Record a discovered or registered workshop
+        :param info: registration details, see registration_info
+        """
+        event_id = info["workshop_event_id"]
+        self.registrations[event_id] = info
+        if info["is_registered"]:
+            self.pending.pop(event_id, None)
+            self.store.save_registration(self.scraper, info)
+        else:
+            self.pending[event_id] = info
+
+    def flush(self) -> int:
+        """
+        Write the collected discoveries
+        :return: number of rows written
+        """
+        pending = list(self.pending.values())
+        if pending:
+            self.store.save_registrations(self.scraper, pending)
+        self.pending.clear()
+        return len(pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+
+def registration_info(
+    workshop_event_id: str,
+    workshop_id: str,
+    title: str,
+    event_date: str,
+    registration_date: datetime.datetime = None,
+    is_registered: bool = True,
+) -> dict:
+    """Registration details as stored, registration_date defaults to now."""
+    if registration_date is None:
+        registration_date = datetime.datetime.now()
+    return {
+        "workshop_id": workshop_id,
+        "workshop_event_id": workshop_event_id,
+        "title": title,
+        "event_date": event_date,
+        "registration_date": registration_date.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_registered": is_registered,
+    }
+
+
+_store = None
+
+
+def get_store() -> StateStore:
+    """The process-wide state store."""
+    global _store
+    if _store is None:
+        _store = StateStore()
+    return _store
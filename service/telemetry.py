@@ -0,0 +1,320 @@
+"""
+Buffered run telemetry.
+
+Scrapers no longer write scraper_runs and scrapers.last_run_* at the end of
+every run. A run and its stage timings are appended to an in-memory buffer,
+which a background thread writes to Postgres in bulk: one multi-row INSERT
+plus one UPDATE per scraper, every TELEMETRY_FLUSH_SECONDS, as soon as
+TELEMETRY_BATCH_SIZE runs are waiting, and when the process exits:
+
+    run = get_telemetry().start_run("home_depo")
+    with stage("fetch"):
+        ...
+    run.finish("success", "completed")
+
+Recording a run never does I/O and never raises. A flush that fails keeps the
+runs for the next one; whatever is still unwritten at exit is spooled to
+TELEMETRY_SPOOL and picked up by the next process. A writer claims the spool
+by renaming it to a file of its own (under a lock, so two processes never
+take the same runs) and deletes that file only once its runs are committed or
+spooled again; a claim left by a process that died is taken over.
+"""
+
+import contextlib
+import contextvars
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows, spool access is not locked
+    fcntl = None
+
+from service import db
+
+TELEMETRY_FLUSH_SECONDS = float(os.environ.get("TELEMETRY_FLUSH_SECONDS", 60))
+TELEMETRY_BATCH_SIZE = int(os.environ.get("TELEMETRY_BATCH_SIZE", 100))
+TELEMETRY_SPOOL = os.environ.get("TELEMETRY_SPOOL", "storage/telemetry_spool.jsonl")
+# oldest runs are dropped beyond this while the database is unreachable
+MAX_BUFFERED = 10000
+MAX_MESSAGE = 500
+
+# one row of db.STATEMENTS["insert_runs"]
+RUN_TEMPLATE = "(%s, to_timestamp(%s), %s, %s, %s, %s::jsonb)"
+
+_current_run = contextvars.ContextVar("telemetry_run", default=None)
+
+
+class RunRecord:
+    """One scraper run in progress, see TelemetryWriter.start_run."""
+
+    def __init__(self, writer: "TelemetryWriter", scraper: str, started_at: float = None) -> None:
+        self.writer = writer
+        self.scraper = scraper
+        self.started_at = started_at if started_at is not None else time.time()
+        # stage name -> ms, summed when a stage runs more than once
+        self.stages = {}
+        self.finished = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stages[name] = round(self.stages.get(name, 0) + elapsed, 1)
+
+    def finish(self, status: str, message: str = "") -> None:
+        """Hand the run to the writer; a second call is ignored."""
+        if self.finished:
+            return
+        self.finished = True
+        if _current_run.get() is self:
+            _current_run.set(None)
+        self.writer.record(self.scraper, self.started_at, status, message, self.stages)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Time a stage of the current run, nothing when no run was started."""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    with run.stage(name):
+        yield
+
+
+class TelemetryWriter:
+    """Buffers finished runs and writes them to Postgres in bulk."""
+
+    def __init__(
+        self,
+        flush_seconds: float = TELEMETRY_FLUSH_SECONDS,
+        batch_size: int = TELEMETRY_BATCH_SIZE,
+        spool_path: str = TELEMETRY_SPOOL,
+    ) -> None:
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.spool_path = spool_path
+        self.lock = threading.Lock()
+        # serialises flushes of the timer thread and close()
+        self.flush_lock = threading.Lock()
+        self.buffer = []
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = None
+        self.counts = {"recorded": 0, "written": 0, "dropped": 0, "failed_flushes": 0}
+        # spool files whose runs sit in the buffer until they are committed
+        self.claimed = []
+        self.buffer.extend(self._read_spool())
+
+    def start_run(self, scraper: str, started_at: float = None) -> RunRecord:
+        """A new run, also the one stage() times in this context."""
+        run = RunRecord(self, scraper, started_at)
+        _current_run.set(run)
+        return run
+
+    def record(
+        self,
+        scraper: str,
+        started_at: float,
+        status: str,
+        message: str = "",
+        stages: dict = None,
+    ) -> None:
+        """Buffer one finished run."""
+        try:
+            entry = {
+                "scraper": scraper,
+                "started_at": started_at,
+                "duration_ms": int((time.time() - started_at) * 1000),
+                "status": status,
+                "message": str(message)[:MAX_MESSAGE],
+                "stages": dict(stages or {}),
+            }
+            with self.lock:
+                self.buffer.append(entry)
+                self.counts["recorded"] += 1
+                self._trim()
+                full = len(self.buffer) >= self.batch_size
+            self._ensure_thread()
+            if full:
+                self.wake.set()
+        except Exception as e:
+            logging.warning(f"Could not record run telemetry: {e}")
+
+    def _trim(self) -> None:
+        overflow = len(self.buffer) - MAX_BUFFERED
+        if overflow > 0:
+            del self.buffer[:overflow]
+            self.counts["dropped"] += overflow
+
+    def _ensure_thread(self) -> None:
+        if self.thread is None and not self.closed:
+            self.thread = threading.Thread(target=self._loop, name="telemetry", daemon=True)
+            self.thread.start()
+
+    def _loop(self) -> None:
+        while not self.closed:
+            self.wake.wait(self.flush_seconds)
+            self.wake.clear()
+            if not self.closed:
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        Write everything buffered, keeping it for the next flush on failure
+        :return: number of runs written
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch, self.buffer = self.buffer, []
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception as e:
+                logging.warning(f"Could not write {len(batch)} run(s) of telemetry: {e}")
+                with self.lock:
+                    self.buffer[:0] = batch
+                    self.counts["failed_flushes"] += 1
+                    self._trim()
+                return 0
+            with self.lock:
+                self.counts["written"] += len(batch)
+            # the spooled runs lead the buffer, so they were in this batch
+            self._release_claims()
+            return len(batch)
+
+    @staticmethod
+    def _write(batch: list) -> None:
+        latest = {}
+        for entry in batch:
+            if entry["started_at"] >= latest.get(entry["scraper"], entry)["started_at"]:
+                latest[entry["scraper"]] = entry
+        rows = [
+            (
+                entry["scraper"],
+                entry["started_at"],
+                entry["duration_ms"],
+                entry["status"],
+                entry["message"],
+                json.dumps(entry["stages"]),
+            )
+            for entry in batch
+        ]
+        with db.transaction() as tx:
+            tx.execute_values("insert_runs", rows, RUN_TEMPLATE)
+            for scraper, entry in latest.items():
+                tx.execute(
+                    "update_last_run",
+                    (entry["started_at"], entry["duration_ms"], entry["status"],
+                     entry["message"], scraper),
+                )
+
+    @contextlib.contextmanager
+    def _spool_lock(self):
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(f"{self.spool_path}.lock", "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _claim_paths(self) -> list:
+        """The spool plus the claims of processes that are gone."""
+        paths = [self.spool_path] if os.path.exists(self.spool_path) else []
+        for path in sorted(glob.glob(f"{glob.escape(self.spool_path)}.*.claimed")):
+            pid = path[len(self.spool_path) + 1:].split(".")[0]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                paths.append(path)
+        return paths
+
+    def _read_spool(self) -> list:
+        entries = []
+        try:
+            with self._spool_lock():
+                for path in self._claim_paths():
+                    fd, claim = tempfile.mkstemp(
+                        prefix=f"{os.path.basename(self.spool_path)}.{os.getpid()}.",
+                        suffix=".claimed",
+                        dir=os.path.dirname(self.spool_path) or ".",
+                    )
+                    os.close(fd)
+                    os.replace(path, claim)
+                    self.claimed.append(claim)
+                    with open(claim, "r") as f:
+                        entries.extend(json.loads(line) for line in f if line.strip())
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read telemetry spool {self.spool_path}: {e}")
+        return entries
+
+    def _release_claims(self) -> None:
+        with self.lock:
+            claimed, self.claimed = self.claimed, []
+        for path in claimed:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Could not remove telemetry spool {path}: {e}")
+
+    def _write_spool(self, entries: list) -> None:
+        try:
+            with self._spool_lock(), open(self.spool_path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logging.warning(f"Could not spool {len(entries)} run(s) of telemetry: {e}")
+            return
+        # the claimed runs are spooled again with the rest
+        self._release_claims()
+
+    def close(self) -> None:
+        """Stop the timer, flush and spool whatever could not be written."""
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.flush()
+        with self.lock:
+            leftover, self.buffer = self.buffer, []
+        if leftover:
+            self._write_spool(leftover)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.counts, "buffered": len(self.buffer)}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> TelemetryWriter:
+    """The process-wide writer, flushed when the process exits."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            import atexit
+
+            _telemetry = TelemetryWriter()
+            atexit.register(_telemetry.close)
+        return _telemetry
@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# keep the SQLite stores, spools and caches the tests create out of storage/
+_tmp = tempfile.mkdtemp(prefix="scraper-tests-")
+atexit.register(shutil.rmtree, _tmp, ignore_errors=True)
+os.environ.update(
+    {
+        "STATE_DB_PATH": os.path.join(_tmp, "state.db"),
+        "ALERT_OUTBOX_PATH": os.path.join(_tmp, "alert_outbox.db"),
+        "TELEMETRY_SPOOL": os.path.join(_tmp, "telemetry_spool.jsonl"),
+        "NOTIFY_FILE": os.path.join(_tmp, "notifications.jsonl"),
+        "HTTP_CACHE_DIR": os.path.join(_tmp, "http_cache"),
+        "SLACK_USER_CACHE_FILE": os.path.join(_tmp, "slack_users.json"),
+    }
+)
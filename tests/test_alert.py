@@ -2,14 +2,17 @@ import datetime
 import json
 import os
 import sys
+import tempfile
 import unittest
 from datetime import date
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import patch
 
 # Add parent directory to path to import service.alert
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from service.alert import (
     get_owner_id,
+    get_user_cache_stats,
+    send_alert_digest,
     send_slack_message,
     get_last_alert_date,
     update_last_alert_date,
@@ -18,6 +21,9 @@ from service.alert import (
     is_workshop_registered,
     save_registered_workshop,
 )
+from service.mailer import Mailer
+from service.slack_limits import SlackRateLimiter
+from service.storage import StateStore
 
 
 class TestSlackMessage(unittest.TestCase):
@@ -81,6 +87,23 @@ class TestSlackMessage(unittest.TestCase):
         # Check logging of failure
         mock_logging.info.assert_any_call("Failed to send message to Slack.")
 
+    @patch("service.alert.client.chat_postMessage")
+    @patch("service.alert.get_owner_id")
+    def test_send_alert_digest_pings_channel_once_when_urgent(
+        self, mock_get_owner, mock_post_message
+    ):
+        mock_get_owner.return_value = "U12345678"
+        mock_post_message.return_value = {"ok": True}
+        header = {"type": "header", "text": {"type": "plain_text", "text": "digest"}}
+
+        self.assertTrue(send_alert_digest([header], "home_depo: 2 alert(s)", urgent=True))
+
+        self.assertEqual(mock_post_message.call_count, 2)
+        blocks = mock_post_message.call_args_list[0].kwargs["blocks"]
+        self.assertEqual(blocks[0], header)
+        self.assertIn("<@U12345678>", blocks[1]["text"]["text"])
+        self.assertIn("<!channel>", mock_post_message.call_args_list[1].kwargs["text"])
+
     @patch("service.alert.client")
     @patch("service.alert.logging")
     def test_get_owner_id(self, mock_logging, mock_client):
@@ -95,148 +118,193 @@ class TestSlackMessage(unittest.TestCase):
         mock_client.users_list.return_value = mock_response
 
         # Call the function
-        result = get_owner_id()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("service.alert.USER_CACHE_FILE", os.path.join(tmpdir, "users.json")):
+                result = get_owner_id()
 
         # Assertions
         self.assertEqual(result, "U456")
         mock_client.users_list.assert_called_once()
 
 
-class TestAlertDate(unittest.TestCase):
+@patch("service.alert.client")
+class TestOwnerCache(unittest.TestCase):
     def setUp(self):
-        # Create test directory and file
-        os.makedirs("storage", exist_ok=True)
-        self.test_file = "storage/last_alert.json"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch(
+            "service.alert.USER_CACHE_FILE", os.path.join(self.tmpdir.name, "users.json")
+        )
+        self.cache_patch.start()
+        # users.list is a Tier 2 method, do not actually wait between pages
+        self.limiter_patch = patch(
+            "service.alert.rate_limiter", SlackRateLimiter(sleep=lambda seconds: None)
+        )
+        self.limiter_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.limiter_patch.stop()
+        self.tmpdir.cleanup()
+
+    def test_cache_hit_does_not_rewrite_the_file(self, mock_client):
+        mock_client.users_list.return_value = {
+            "members": [{"real_name": "Owner", "id": "U1", "is_owner": True}]
+        }
+
+        with patch("service.alert._write_user_cache") as mock_write:
+            for _ in range(5):
+                self.assertEqual(get_owner_id(), "U1")
+        mock_write.assert_called_once()
+        self.assertEqual(get_user_cache_stats()["hits"], 4)
+
+    def test_owner_is_served_from_cache_until_ttl(self, mock_client):
+        mock_client.users_list.return_value = {
+            "members": [{"real_name": "Owner", "id": "U1", "is_owner": True}]
+        }
+
+        self.assertEqual(get_owner_id(), "U1")
+        self.assertEqual(get_owner_id(), "U1")
+        self.assertEqual(mock_client.users_list.call_count, 1)
+        self.assertEqual(
+            get_user_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        )
 
-        # Clear or create the test file
-        with open(self.test_file, "w") as f:
-            json.dump({}, f)
+        with patch("service.alert.USER_CACHE_TTL", 0):
+            get_owner_id()
+        self.assertEqual(mock_client.users_list.call_count, 2)
+
+    def test_missing_owner_is_cached_until_ttl(self, mock_client):
+        mock_client.users_list.return_value = {
+            "members": [{"real_name": "Member", "id": "U1", "is_owner": False}]
+        }
+
+        self.assertIsNone(get_owner_id())
+        self.assertIsNone(get_owner_id())
+        self.assertEqual(mock_client.users_list.call_count, 1)
+
+        with patch("service.alert.USER_CACHE_TTL", 0):
+            get_owner_id()
+        self.assertEqual(mock_client.users_list.call_count, 2)
+
+    def test_stats_are_not_written_to_the_file(self, mock_client):
+        mock_client.users_list.return_value = {
+            "members": [{"real_name": "Owner", "id": "U1", "is_owner": True}]
+        }
+        with open(os.path.join(self.tmpdir.name, "users.json"), "w") as f:
+            json.dump({"stats": {"hits": 7, "misses": 3}}, f)
+
+        get_owner_id()
+        get_owner_id()
+
+        self.assertEqual(get_user_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+        with open(os.path.join(self.tmpdir.name, "users.json")) as f:
+            self.assertNotIn("stats", json.load(f))
+
+    def test_refresh_follows_pagination(self, mock_client):
+        mock_client.users_list.side_effect = [
+            {
+                "members": [{"real_name": "A", "id": "U1"}],
+                "response_metadata": {"next_cursor": "page2"},
+            },
+            {
+                "members": [{"real_name": "B", "id": "U2", "is_owner": True}],
+                "response_metadata": {"next_cursor": ""},
+            },
+        ]
+
+        self.assertEqual(get_owner_id(), "U2")
+        self.assertEqual(mock_client.users_list.call_args.kwargs["cursor"], "page2")
+
+
+class StoreTestCase(unittest.TestCase):
+    """Points service.alert at a fresh state store in a temp dir."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = StateStore(os.path.join(self.tmpdir.name, "state.db"))
+        patcher = patch("service.alert.get_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def tearDown(self):
-        # Remove test file if it exists
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
+        self.store.close()
+        self.tmpdir.cleanup()
 
-    def test_get_last_alert_date_empty_file(self):
-        # Create empty file
-        with open(self.test_file, "w") as f:
-            f.write("")
 
-        # Get date from empty file
+class TestAlertDate(StoreTestCase):
+    def test_get_last_alert_date_empty_store(self):
         result = get_last_alert_date("test_scraper")
         self.assertIsNone(result)
 
     def test_get_last_alert_date_missing_scraper(self):
-        # Set up file with other scrapers
-        with open(self.test_file, "w") as f:
-            json.dump({"other_scraper": "2025-06-15"}, f)
+        self.store.set_last_alert_date("other_scraper", "2025-06-15")
 
         # Get date for non-existent scraper
         result = get_last_alert_date("test_scraper")
         self.assertIsNone(result)
 
     def test_get_last_alert_date_existing_scraper(self):
-        # Create file with test scraper
-        with open(self.test_file, "w") as f:
-            json.dump({"test_scraper": "2025-06-15"}, f)
+        self.store.set_last_alert_date("test_scraper", "2025-06-15")
 
-        # Get date for test scraper
         result = get_last_alert_date("test_scraper")
         self.assertEqual(result, date(2025, 6, 15))
 
     def test_update_last_alert_date_new_scraper(self):
-        # Create empty JSON file
-        with open(self.test_file, "w") as f:
-            json.dump({}, f)
-
-        # Update date for new scraper
-        test_date = date(2025, 6, 16)
-        update_last_alert_date("test_scraper", test_date)
+        # Used to crash when storage/last_alert.json did not exist
+        update_last_alert_date("test_scraper", date(2025, 6, 16))
 
-        # Verify file was updated
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("test_scraper", data)
-            self.assertEqual(data["test_scraper"], "2025-06-16")
+        self.assertEqual(self.store.get_last_alert_date("test_scraper"), "2025-06-16")
 
     def test_update_last_alert_date_existing_scraper(self):
-        # Create file with test scraper
-        with open(self.test_file, "w") as f:
-            json.dump({"test_scraper": "2025-06-15", "other_scraper": "2025-06-10"}, f)
+        self.store.set_last_alert_date("test_scraper", "2025-06-15")
+        self.store.set_last_alert_date("other_scraper", "2025-06-10")
 
         # Update date for existing scraper
-        test_date = date(2025, 6, 16)
-        update_last_alert_date("test_scraper", test_date)
+        update_last_alert_date("test_scraper", date(2025, 6, 16))
 
-        # Verify file was updated
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("test_scraper", data)
-            self.assertEqual(data["test_scraper"], "2025-06-16")
-            # Make sure other scraper wasn't modified
-            self.assertEqual(data["other_scraper"], "2025-06-10")
-
-    def test_update_last_alert_date_empty_file(self):
-        # Create empty file (not JSON)
-        with open(self.test_file, "w") as f:
-            f.write("")
-
-        # Update date for new scraper
-        test_date = date(2025, 6, 16)
-        update_last_alert_date("test_scraper", test_date)
-
-        # Verify file was created with proper JSON
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("test_scraper", data)
-            self.assertEqual(data["test_scraper"], "2025-06-16")
+        self.assertEqual(get_last_alert_date("test_scraper"), date(2025, 6, 16))
+        # Make sure other scraper wasn't modified
+        self.assertEqual(get_last_alert_date("other_scraper"), date(2025, 6, 10))
 
 
 class TestEmailService(unittest.TestCase):
-    @patch("service.alert.smtplib.SMTP_SSL")
-    @patch("builtins.open", new_callable=mock_open, read_data=b"test file content")
-    @patch("service.alert.os.environ.get")
-    @patch("builtins.print")
-    def test_send_email_with_attachment_success(
-        self, mock_print, mock_env_get, mock_file, mock_smtp_ssl
-    ):
-        # Setup environment variables
-        mock_env_get.side_effect = lambda key, default=None: {
-            "SMTP_SERVER": "smtp.example.com",
-            "SMTP_PORT": 465,
-        }.get(key, default)
-
-        # Setup SMTP mock
-        mock_server = MagicMock()
-        mock_smtp_ssl.return_value.__enter__.return_value = mock_server
-
-        # Call the function
-        send_email_with_attachment(
-            "sender@example.com",
-            "Sender Name",
-            "password123",
-            "recipient@example.com",
-            "Test Subject",
-            "Test Body",
-            "path/to/attachment.txt",
+    @patch("service.mailer.smtplib.SMTP_SSL")
+    @patch("service.alert.get_mailer")
+    def test_send_email_with_attachment_success(self, mock_get_mailer, mock_smtp_ssl):
+        mock_get_mailer.side_effect = lambda *args: Mailer(
+            *args, smtp_server="smtp.example.com", smtp_port=465
         )
+        mock_server = mock_smtp_ssl.return_value
+        mock_server.mail.return_value = (250, b"OK")
+        mock_server.rcpt.return_value = (250, b"OK")
+        mock_server.docmd.return_value = (354, b"Go ahead")
+        mock_server.getreply.return_value = (250, b"Queued")
+
+        with tempfile.NamedTemporaryFile(suffix=".txt") as attachment:
+            attachment.write(b"test file content")
+            attachment.flush()
+
+            # Call the function
+            result = send_email_with_attachment(
+                "sender@example.com",
+                "Sender Name",
+                "password123",
+                "recipient@example.com",
+                "Test Subject",
+                "Test Body",
+                attachment.name,
+            )
 
         # Assertions
+        mock_smtp_ssl.assert_called_once_with("smtp.example.com", 465)
         mock_server.login.assert_called_once_with("sender@example.com", "password123")
-        mock_server.sendmail.assert_called_once()
-        mock_print.assert_called_with("Email sent successfully!")
-
-    @patch("service.alert.smtplib.SMTP_SSL")
-    @patch("builtins.open")
-    @patch("builtins.print")
-    def test_send_email_attachment_not_found(
-        self, mock_print, mock_open, mock_smtp_ssl
-    ):
-        # Mock the file not found error
-        mock_open.side_effect = FileNotFoundError()
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["sent"], ["recipient@example.com"])
 
+    @patch("service.mailer.smtplib.SMTP_SSL")
+    def test_send_email_attachment_not_found(self, mock_smtp_ssl):
         # Call the function
-        send_email_with_attachment(
+        result = send_email_with_attachment(
             "sender@example.com",
             "Sender Name",
             "password123",
@@ -247,164 +315,79 @@ class TestEmailService(unittest.TestCase):
         )
 
         # Assertions
-        mock_print.assert_called_with("Attachment file not found: nonexistent/file.txt")
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["error"], "Attachment file not found: nonexistent/file.txt")
         mock_smtp_ssl.assert_not_called()
 
 
-class TestRegistrationTracking(unittest.TestCase):
-    def setUp(self):
-        # Create test directory and file
-        os.makedirs("storage", exist_ok=True)
-        self.test_file = "storage/registered_workshops.json"
-
-        # Clear or create the test file
-        with open(self.test_file, "w") as f:
-            json.dump({}, f)
-
-    def tearDown(self):
-        # Remove test file if it exists
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
-
-    def test_get_registered_workshops_empty_file(self):
-        # Create empty file
-        with open(self.test_file, "w") as f:
-            f.write("")
+class TestRegistrationTracking(StoreTestCase):
+    def save(self, scraper_name, workshop_event_id, title, **kwargs):
+        save_registered_workshop(
+            scraper_name=scraper_name,
+            workshop_event_id=workshop_event_id,
+            workshop_id=kwargs.pop("workshop_id", "KWBE0001"),
+            title=title,
+            event_date=kwargs.pop("event_date", "2025-11-08"),
+            **kwargs,
+        )
 
-        # Get registrations from empty file
+    def test_get_registered_workshops_empty_store(self):
         result = get_registered_workshops("home_depo")
         self.assertEqual(result, {})
 
     def test_get_registered_workshops_missing_scraper(self):
-        # Set up file with other scrapers
-        with open(self.test_file, "w") as f:
-            json.dump({"other_scraper": {"WS00001": {"title": "Other Workshop"}}}, f)
+        self.save("other_scraper", "WS00001", "Other Workshop")
 
         # Get registrations for non-existent scraper
         result = get_registered_workshops("home_depo")
         self.assertEqual(result, {})
 
     def test_get_registered_workshops_existing_scraper(self):
-        # Create file with test scraper
-        test_data = {
-            "home_depo": {
-                "WS00029": {
-                    "workshop_id": "KWBE0001",
-                    "workshop_event_id": "WS00029",
-                    "title": "Build an Excavator",
-                    "event_date": "2025-11-08",
-                    "registration_date": "2025-10-13 10:30:00",
-                }
-            }
-        }
-        with open(self.test_file, "w") as f:
-            json.dump(test_data, f)
+        self.save(
+            "home_depo",
+            "WS00029",
+            "Build an Excavator",
+            registration_date=datetime.datetime(2025, 10, 13, 10, 30, 0),
+        )
 
-        # Get registrations for test scraper
         result = get_registered_workshops("home_depo")
         self.assertIn("WS00029", result)
         self.assertEqual(result["WS00029"]["title"], "Build an Excavator")
+        self.assertEqual(result["WS00029"]["registration_date"], "2025-10-13 10:30:00")
 
     def test_is_workshop_registered_true(self):
-        # Create file with registered workshop
-        test_data = {
-            "home_depo": {
-                "WS00029": {"workshop_id": "KWBE0001", "title": "Build an Excavator"}
-            }
-        }
-        with open(self.test_file, "w") as f:
-            json.dump(test_data, f)
+        self.save("home_depo", "WS00029", "Build an Excavator")
 
-        # Check if workshop is registered
         result = is_workshop_registered("home_depo", "WS00029")
         self.assertTrue(result)
 
     def test_is_workshop_registered_false(self):
-        # Create file with different workshop
-        test_data = {
-            "home_depo": {
-                "WS00028": {"workshop_id": "KWBE0000", "title": "Different Workshop"}
-            }
-        }
-        with open(self.test_file, "w") as f:
-            json.dump(test_data, f)
-
-        # Check if workshop is registered
-        result = is_workshop_registered("home_depo", "WS00029")
-        self.assertFalse(result)
-
-    def test_save_registered_workshop_new_scraper(self):
-        # Create empty JSON file
-        with open(self.test_file, "w") as f:
-            json.dump({}, f)
+        self.save("home_depo", "WS00028", "Different Workshop", workshop_id="KWBE0000")
+        # discovered, not registered
+        self.save("home_depo", "WS00030", "Build a Birdhouse", is_registered=False)
 
-        # Save registration for new scraper
-        save_registered_workshop(
-            scraper_name="home_depo",
-            workshop_event_id="WS00029",
-            workshop_id="KWBE0001",
-            title="Build an Excavator",
-            event_date="2025-11-08",
-            registration_date=datetime.datetime(2025, 10, 13, 10, 30, 0),
-        )
-
-        # Verify file was updated
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("home_depo", data)
-            self.assertIn("WS00029", data["home_depo"])
-            self.assertEqual(
-                data["home_depo"]["WS00029"]["title"], "Build an Excavator"
-            )
-            self.assertEqual(data["home_depo"]["WS00029"]["workshop_id"], "KWBE0001")
+        self.assertFalse(is_workshop_registered("home_depo", "WS00029"))
+        self.assertFalse(is_workshop_registered("home_depo", "WS00030"))
 
     def test_save_registered_workshop_existing_scraper(self):
-        # Create file with existing registration
-        test_data = {
-            "home_depo": {
-                "WS00028": {"workshop_id": "KWBE0000", "title": "Old Workshop"}
-            }
-        }
-        with open(self.test_file, "w") as f:
-            json.dump(test_data, f)
+        self.save("home_depo", "WS00028", "Old Workshop", workshop_id="KWBE0000")
 
         # Save new registration
-        save_registered_workshop(
-            scraper_name="home_depo",
-            workshop_event_id="WS00029",
-            workshop_id="KWBE0001",
-            title="Build an Excavator",
-            event_date="2025-11-08",
-        )
+        self.save("home_depo", "WS00029", "Build an Excavator")
 
-        # Verify file was updated
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("WS00029", data["home_depo"])
-            self.assertIn("WS00028", data["home_depo"])  # Old registration still there
-            self.assertEqual(
-                data["home_depo"]["WS00029"]["title"], "Build an Excavator"
-            )
-
-    def test_save_registered_workshop_empty_file(self):
-        # Create empty file (not JSON)
-        with open(self.test_file, "w") as f:
-            f.write("")
+        data = get_registered_workshops("home_depo")
+        self.assertIn("WS00029", data)
+        self.assertIn("WS00028", data)  # Old registration still there
+        self.assertEqual(data["WS00029"]["title"], "Build an Excavator")
 
-        # Save registration
-        save_registered_workshop(
-            scraper_name="home_depo",
-            workshop_event_id="WS00029",
-            workshop_id="KWBE0001",
-            title="Build an Excavator",
-            event_date="2025-11-08",
-        )
+    def test_save_registered_workshop_updates_discovered(self):
+        self.save("home_depo", "WS00029", "Build an Excavator", is_registered=False)
+        self.save("home_depo", "WS00029", "Build an Excavator", workshop_id="KWBE0002")
 
-        # Verify file was created with proper JSON
-        with open(self.test_file, "r") as f:
-            data = json.load(f)
-            self.assertIn("home_depo", data)
-            self.assertIn("WS00029", data["home_depo"])
+        data = get_registered_workshops("home_depo")
+        self.assertEqual(len(data), 1)
+        self.assertTrue(data["WS00029"]["is_registered"])
+        self.assertEqual(data["WS00029"]["workshop_id"], "KWBE0002")
 
 
 if __name__ == "__main__":
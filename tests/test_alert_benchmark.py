@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+sys.path.append(os.path.join(parent, "scripts"))
+
+from alert_benchmark import FakeSlack, percentiles
+
+
+class TestAlertBenchmark(unittest.TestCase):
+    def test_percentiles(self):
+        p = percentiles([float(ms) for ms in range(1, 101)])
+        self.assertAlmostEqual(p["p50"], 50.5)
+        self.assertAlmostEqual(p["p99"], 99.01)
+        self.assertEqual(percentiles([7.0]), {"p50": 7.0, "p95": 7.0, "p99": 7.0})
+
+    def test_fake_slack_answers_and_rate_limits(self):
+        fake = FakeSlack(latency_ms=0, jitter_ms=0).start()
+        try:
+            with urllib.request.urlopen(fake.url + "chat.postMessage", data=b"{}") as response:
+                body = json.loads(response.read())
+            self.assertTrue(body["ok"])
+            self.assertIn("ts", body)
+
+            fake.error_rate = 1.0
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                urllib.request.urlopen(fake.url + "pins.add", data=b"{}")
+            self.assertEqual(cm.exception.code, 429)
+            self.assertEqual(cm.exception.headers["Retry-After"], "0")
+            cm.exception.close()
+        finally:
+            fake.stop()
+        self.assertEqual(fake.requests, {"chat.postMessage": 1, "pins.add": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from service.alert import (
+    send_api_error_alert,
+    send_slack_message,
+    send_urgent_workshop_alert,
+)
+from service.alert_digest import AlertDigest, get_rules
+from service.alert_queue import AlertDispatcher, dispatch
+
+WORKSHOP = {"title": "Build a Birdhouse", "date": "2025-06-01", "event_code": "WS00029", "seats_left": 3}
+
+
+class TestAlertDigest(unittest.TestCase):
+    def test_digest_mode_is_on_for_home_depo_and_off_unless_enabled(self):
+        with patch.dict(os.environ, {"ALERT_DIGEST": ""}):
+            self.assertIsNotNone(AlertDigest.for_scraper("home_depo"))
+            self.assertIsNone(AlertDigest.for_scraper("library_event"))
+        with patch.dict(os.environ, {"ALERT_DIGEST": "0"}):
+            self.assertIsNone(AlertDigest.for_scraper("home_depo"))
+        with patch.dict(os.environ, {"ALERT_DIGEST": "library_event, home_depo"}):
+            self.assertIsNotNone(AlertDigest.for_scraper("library_event"))
+            self.assertIn("send_api_error_alert", get_rules("home_depo")["coalesce"])
+            self.assertNotIn("send_api_error_alert", get_rules("library_event")["coalesce"])
+
+    @patch("service.alert.send_alert_digest")
+    def test_run_alerts_are_posted_as_one_message(self, mock_digest):
+        digest = AlertDigest("home_depo", dict(get_rules("home_depo"), enabled=True))
+
+        async def scenario():
+            async with AlertDispatcher(digest=digest):
+                for _ in range(2):  # both sessions of the same event
+                    dispatch(send_slack_message, "Build a Birdhouse is open")
+                    dispatch(send_urgent_workshop_alert, WORKSHOP, "https://example.com/ws")
+                dispatch(send_api_error_alert, "Home Depot API", "Unexpected error", "details")
+
+        asyncio.run(scenario())
+
+        mock_digest.assert_called_once()
+        blocks, text = mock_digest.call_args.args
+        self.assertTrue(mock_digest.call_args.kwargs["urgent"])
+        self.assertEqual(text, "home_depo: 3 alert(s) this run")
+        rendered = "\n".join(block["text"]["text"] for block in blocks[1:])
+        self.assertIn("<https://example.com/ws|Build a Birdhouse>", rendered)
+        self.assertLess(rendered.index("Open for registration"), rendered.index("Errors"))
+
+    def test_screenshots_and_other_senders_are_not_coalesced(self):
+        digest = AlertDigest("library_event", dict(get_rules("library_event"), enabled=True))
+
+        self.assertFalse(digest.accepts(send_slack_message, "msg", "shot.png"))
+        self.assertFalse(digest.accepts(send_api_error_alert, "svc", "error"))
+
+    def test_long_digest_is_truncated(self):
+        digest = AlertDigest("home_depo", dict(get_rules("home_depo"), max_items=2))
+        for i in range(5):
+            digest.add(send_slack_message, f"message {i}")
+
+        blocks = digest.render()
+
+        self.assertEqual(blocks[-1]["elements"][0]["text"], "...and 3 more")
+        self.assertFalse(digest.urgent)
+
+
+if __name__ == "__main__":
+    unittest.main()
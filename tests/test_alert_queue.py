@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.alert_queue import AlertDispatcher, dispatch
+
+
+class TestAlertDispatcher(unittest.TestCase):
+    def test_without_dispatcher_alert_is_sent_immediately(self):
+        sender = MagicMock(return_value=True)
+
+        self.assertTrue(dispatch(sender, "hello"))
+        sender.assert_called_once_with("hello")
+
+    def test_alerts_are_sent_in_order_without_blocking(self):
+        sent = []
+
+        def slow_sender(msg):
+            time.sleep(0.1)
+            sent.append(msg)
+
+        async def scenario():
+            async with AlertDispatcher() as alerts:
+                started = time.monotonic()
+                for msg in ("first", "second", "third"):
+                    dispatch(slow_sender, msg)
+                queued_in = time.monotonic() - started
+            return alerts, queued_in
+
+        alerts, queued_in = asyncio.run(scenario())
+
+        self.assertLess(queued_in, 0.05)
+        self.assertEqual(sent, ["first", "second", "third"])
+        self.assertEqual(alerts.stats()["sent"], 3)
+
+    def test_full_queue_drops_and_failed_sender_is_counted(self):
+        async def scenario():
+            async with AlertDispatcher(maxsize=1) as alerts:
+                dispatch(MagicMock(side_effect=RuntimeError("slack down")))
+                dispatch(MagicMock())
+            return alerts
+
+        stats = asyncio.run(scenario()).stats()
+
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["failed"], 1)
+
+    def test_drain_gives_up_after_timeout(self):
+        release = threading.Event()
+
+        async def scenario():
+            alerts = AlertDispatcher(drain_timeout=0.1)
+            await alerts.start()
+            dispatch(release.wait, 5)
+            dispatch(MagicMock())
+            started = time.monotonic()
+            await alerts.close()
+            waited = time.monotonic() - started
+            stats = alerts.stats()
+            release.set()
+            return stats, waited
+
+        stats, waited = asyncio.run(scenario())
+
+        self.assertLess(waited, 1)
+        self.assertEqual(stats["pending"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.browser_pool import BrowserPool, PlaywrightPool, options_key, warm_endpoint
+
+
+def _fake_browser(pid=4242, ws="ws://127.0.0.1:9222/devtools/browser/abc"):
+    browser = MagicMock()
+    browser.process.pid = pid
+    browser.wsEndpoint = ws
+    context = AsyncMock()
+    context.newPage.return_value = MagicMock(name="page")
+    browser.createIncognitoBrowserContext = AsyncMock(return_value=context)
+    browser.close = AsyncMock()
+    browser.disconnect = AsyncMock()
+    return browser
+
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.tmpdir, "browser_pool.json")
+        self.options = {"headless": True, "args": ["--no-sandbox"]}
+
+    def tearDown(self):
+        for name in os.listdir(self.tmpdir):
+            os.remove(os.path.join(self.tmpdir, name))
+        os.rmdir(self.tmpdir)
+
+    def _pool(self, **kwargs):
+        kwargs.setdefault("state_file", self.state_file)
+        kwargs.setdefault("max_rss_mb", None)
+        return BrowserPool(self.options, **kwargs)
+
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    @patch("pyppeteer.launch")
+    def test_second_acquire_reuses_warm_browser(self, mock_launch, _alive):
+        mock_launch.return_value = _fake_browser()
+        pool = self._pool()
+
+        async def scenario():
+            first = await pool.acquire()
+            await pool.release(first)
+            second = await pool.acquire()
+            await pool.release(second)
+
+        asyncio.run(scenario())
+
+        mock_launch.assert_called_once()
+        self.assertEqual(pool.stats()["misses"], 1)
+        self.assertEqual(pool.stats()["hits"], 1)
+        self.assertEqual(pool.stats()["launches"], 1)
+
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    @patch("pyppeteer.launch")
+    def test_each_lease_gets_its_own_incognito_context(self, mock_launch, _alive):
+        browser = _fake_browser()
+        mock_launch.return_value = browser
+        pool = self._pool()
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+            return lease
+
+        lease = asyncio.run(scenario())
+
+        browser.createIncognitoBrowserContext.assert_awaited_once()
+        lease.context.close.assert_awaited_once()
+
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    @patch("pyppeteer.launch")
+    def test_recycles_after_max_uses(self, mock_launch, _alive):
+        mock_launch.side_effect = [_fake_browser(pid=1), _fake_browser(pid=2)]
+        pool = self._pool(max_uses=2)
+
+        async def scenario():
+            for _ in range(3):
+                lease = await pool.acquire()
+                await pool.release(lease)
+
+        asyncio.run(scenario())
+
+        self.assertEqual(mock_launch.call_count, 2)
+        self.assertEqual(pool.stats()["recycles"], 1)
+
+    @patch("service.browser_pool.process_tree_rss_mb", return_value=900)
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    @patch("pyppeteer.launch")
+    def test_recycles_at_memory_ceiling(self, mock_launch, _alive, _rss):
+        first = _fake_browser(pid=1)
+        mock_launch.side_effect = [first, _fake_browser(pid=2)]
+        pool = self._pool(max_rss_mb=500)
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+
+        asyncio.run(scenario())
+
+        first.close.assert_awaited_once()
+        self.assertEqual(pool.stats()["recycles"], 1)
+
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    @patch("pyppeteer.connect")
+    @patch("pyppeteer.launch")
+    def test_reconnects_to_browser_left_warm_by_previous_run(
+        self, mock_launch, mock_connect, _alive
+    ):
+        ws = "ws://127.0.0.1:9222/devtools/browser/warm"
+        with open(self.state_file, "w") as f:
+            json.dump({options_key(self.options): [{"ws_endpoint": ws, "pid": 99, "uses": 3}]}, f)
+        mock_connect.return_value = _fake_browser(pid=99, ws=ws)
+        pool = self._pool(keep_warm=True)
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+            await pool.shutdown()
+
+        asyncio.run(scenario())
+
+        mock_launch.assert_not_called()
+        mock_connect.assert_awaited_once()
+        self.assertEqual(pool.stats()["hits"], 1)
+        self.assertEqual(pool.stats()["misses"], 0)
+        # the warm browser is left running with its use count carried over
+        mock_connect.return_value.close.assert_not_awaited()
+        with open(self.state_file) as f:
+            state = json.load(f)
+        self.assertEqual(state[options_key(self.options)][0]["uses"], 4)
+
+    @patch("service.browser_pool.pid_alive", return_value=False)
+    @patch("pyppeteer.connect")
+    @patch("pyppeteer.launch")
+    def test_dead_warm_browser_is_ignored(self, mock_launch, mock_connect, _alive):
+        with open(self.state_file, "w") as f:
+            json.dump({options_key(self.options): [{"ws_endpoint": "ws://x", "pid": 99}]}, f)
+        mock_launch.return_value = _fake_browser()
+        pool = self._pool()
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+
+        asyncio.run(scenario())
+
+        mock_connect.assert_not_called()
+        mock_launch.assert_called_once()
+
+    @patch("pyppeteer.launch")
+    def test_shutdown_without_keep_warm_closes_browsers(self, mock_launch):
+        browser = _fake_browser()
+        mock_launch.return_value = browser
+        pool = self._pool(keep_warm=False)
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+            await pool.shutdown()
+
+        with patch("service.browser_pool.pid_alive", return_value=True):
+            asyncio.run(scenario())
+
+        browser.close.assert_awaited_once()
+        with open(self.state_file) as f:
+            self.assertEqual(json.load(f)[options_key(self.options)], [])
+
+    @patch("service.browser_pool.pid_alive", return_value=True)
+    def test_warm_endpoint_only_matches_same_launch_options(self, _alive):
+        other = {"headless": True, "args": ["--proxy-server=http://proxy:8080"]}
+        with open(self.state_file, "w") as f:
+            json.dump({options_key(other): [{"ws_endpoint": "ws://other", "pid": 99}]}, f)
+
+        self.assertIsNone(warm_endpoint(self.options, self.state_file))
+        self.assertEqual(warm_endpoint(other, self.state_file), "ws://other")
+
+
+class TestPlaywrightPool(unittest.TestCase):
+    def _playwright(self):
+        playwright = MagicMock()
+        browser = MagicMock()
+        browser.is_connected.return_value = True
+        context = AsyncMock()
+        browser.new_context = AsyncMock(return_value=context)
+        browser.close = AsyncMock()
+        playwright.chromium.launch = AsyncMock(return_value=browser)
+        playwright.chromium.connect_over_cdp = AsyncMock(return_value=browser)
+        return playwright, browser
+
+    def test_launches_when_no_warm_endpoint(self):
+        playwright, browser = self._playwright()
+        pool = PlaywrightPool(playwright, {"headless": True}, {"viewport": {"width": 1, "height": 1}})
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+            await pool.shutdown()
+
+        asyncio.run(scenario())
+
+        playwright.chromium.launch.assert_awaited_once_with(headless=True)
+        browser.new_context.assert_awaited_once_with(viewport={"width": 1, "height": 1})
+        browser.close.assert_awaited_once()
+        self.assertEqual(pool.stats()["misses"], 1)
+
+    def test_attaches_to_warm_endpoint_without_closing_it(self):
+        playwright, browser = self._playwright()
+        pool = PlaywrightPool(playwright, cdp_endpoint="ws://warm")
+
+        async def scenario():
+            lease = await pool.acquire()
+            await pool.release(lease)
+            await pool.shutdown()
+
+        asyncio.run(scenario())
+
+        playwright.chromium.launch.assert_not_called()
+        playwright.chromium.connect_over_cdp.assert_awaited_once_with("ws://warm")
+        browser.close.assert_not_awaited()
+        self.assertEqual(pool.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -63,6 +63,49 @@ class TestHasChanged(unittest.TestCase):
         self.assertTrue(has_changed(SAMPLE_RESULT, cached))
 
 
+@patch("slack.WebClient")
+class TestHistory(unittest.TestCase):
+    """ircc_history rows written with the state upsert, and the series helper."""
+
+    def test_parsed_columns(self, _wc):
+        self.assertEqual(canada_ircc.parse_count(SAMPLE_RESULT["total_waiting"]), 14000)
+        self.assertEqual(canada_ircc.parse_count("About 400 people ahead of you"), 400)
+        self.assertIsNone(canada_ircc.parse_count("—"))
+        self.assertEqual(canada_ircc.parse_duration_days("6 months"), 182)
+        self.assertEqual(canada_ircc.parse_duration_days("203 days"), 203)
+        self.assertIsNone(canada_ircc.parse_duration_days(SAMPLE_RESULT["estimated_time"]))
+        self.assertEqual(canada_ircc.parse_date("May 12, 2026").isoformat(), "2026-05-12")
+        self.assertIsNone(canada_ircc.parse_date("—"))
+        self.assertEqual(canada_ircc.config_key(), "pnp-ee-2023/04")
+
+    @patch("scraper.canada_ircc.db.transaction")
+    def test_save_state_appends_history_in_same_transaction(self, mock_tx, _wc):
+        tx = mock_tx.return_value.__enter__.return_value
+        save_state(dict(SAMPLE_RESULT, estimated_time="6 months"))
+
+        mock_tx.assert_called_once()
+        (upsert, _), (append, params) = [c.args for c in tx.execute.call_args_list]
+        self.assertEqual((upsert, append), ("ircc_save_state", "ircc_append_history"))
+        self.assertEqual(params[0], "pnp-ee-2023/04")
+        self.assertEqual(params[1:3], ("6 months", 182))
+        self.assertEqual(params[4].isoformat(), "2026-05-12")
+        self.assertEqual((params[6], params[8]), (400, 14000))
+
+    @patch("scraper.canada_ircc.db.execute")
+    def test_load_history(self, mock_execute, _wc):
+        mock_execute.return_value = [
+            ("2026-05-12T15:00:00+00:00", "6 months", 182, "May 12, 2026", None,
+             "About 400 people ahead of you", 400, "About 14,000 people waiting", 14000),
+        ]
+        series = canada_ircc.load_history()
+
+        self.assertEqual(
+            mock_execute.call_args.args, ("ircc_history_series", ("pnp-ee-2023/04", None))
+        )
+        self.assertEqual(series[0]["people_ahead_count"], 400)
+        self.assertEqual(list(series[0]), list(canada_ircc.HISTORY_COLUMNS))
+
+
 @patch("slack.WebClient")
 class TestStateFileIO(unittest.TestCase):
     """Unit tests for load_state / save_state with a temp STATE_FILE."""
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from service.daemon import PollingDaemon, heartbeat_age
+
+
+class TestPollingDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.heartbeat = os.path.join(self.tmpdir, "hb.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_failed_poll_does_not_stop_the_loop(self):
+        poll = AsyncMock(side_effect=[RuntimeError("boom"), None, None])
+        shutdown = AsyncMock()
+        daemon = PollingDaemon(
+            "t", poll, interval=0, heartbeat_file=self.heartbeat, on_shutdown=shutdown
+        )
+
+        asyncio.run(daemon.run(max_polls=3))
+
+        self.assertEqual(poll.await_count, 3)
+        self.assertEqual(daemon.failures, 1)
+        shutdown.assert_awaited_once()
+        with open(self.heartbeat) as f:
+            heartbeat = json.load(f)
+        self.assertTrue(heartbeat["stopped"])
+        self.assertEqual(heartbeat["last_poll"]["status"], "success")
+
+    def test_stop_interrupts_the_wait(self):
+        daemon = PollingDaemon("t", AsyncMock(), interval=60, heartbeat_file=self.heartbeat)
+
+        async def scenario():
+            task = asyncio.ensure_future(daemon.run())
+            await asyncio.sleep(0.05)
+            self.assertIsNotNone(heartbeat_age(self.heartbeat))
+            daemon.stop()
+            await asyncio.wait_for(task, timeout=1)
+
+        asyncio.run(scenario())
+        self.assertEqual(daemon.polls, 1)
+        self.assertIsNone(heartbeat_age(self.heartbeat))  # stopped
+
+    def test_callable_interval(self):
+        daemon = PollingDaemon("t", AsyncMock(), interval=lambda now: 42)
+        self.assertEqual(daemon.next_interval(), 42)
+
+
+@patch("slack.WebClient")
+class TestHomeDepotSchedule(unittest.TestCase):
+    def test_monday_release_window_polls_every_ten_minutes(self, _wc):
+        from scraper.home_depo import poll_interval
+
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("HOME_DEPOT_POLL_SECONDS", None)
+            monday = datetime(2026, 3, 2, 17, 0, tzinfo=timezone.utc)
+            tuesday = datetime(2026, 3, 3, 17, 0, tzinfo=timezone.utc)
+            self.assertEqual(poll_interval(monday), 600)
+            self.assertEqual(poll_interval(tuesday), 3600)
+
+        with patch.dict(os.environ, {"HOME_DEPOT_POLL_SECONDS": "120"}):
+            self.assertEqual(poll_interval(tuesday), 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service import db
+
+
+class TestDb(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock(closed=False)
+        self.cursor = self.conn.cursor.return_value
+        self.pool = MagicMock()
+        self.pool.getconn.return_value = self.conn
+        patcher = patch("service.db.get_pool", return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db._stats.clear()
+        patcher = patch("service.db.DB_PREPARE", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def executed(self):
+        return [c.args[0] for c in self.cursor.execute.call_args_list]
+
+    def test_dsn_and_prepared_sql(self):
+        self.assertEqual(db.dsn("postgres://h/db"), "postgres://h/db?sslmode=require")
+        self.assertEqual(db.dsn("postgres://h/db?a=1"), "postgres://h/db?a=1&sslmode=require")
+        self.assertEqual(db.dsn("postgres://h/db?sslmode=disable"), "postgres://h/db?sslmode=disable")
+
+        prepare, execute = db._prepare_sql("q", "SELECT %s, to_timestamp(%s)")
+        self.assertEqual(prepare, "PREPARE q AS SELECT $1, to_timestamp($2)")
+        self.assertEqual(execute, "EXECUTE q (%s, %s)")
+
+    def test_pooler_host_is_never_prepared(self):
+        self.assertTrue(db.use_prepared("postgres://u@ep-cool-1.aws.neon.tech/db"))
+        self.assertFalse(db.use_prepared("postgres://u@ep-cool-1-pooler.aws.neon.tech/db"))
+        with patch("service.db.DB_PREPARE", False):
+            self.assertFalse(db.use_prepared("postgres://u@ep-cool-1.aws.neon.tech/db"))
+
+        with patch.dict(os.environ, {"POSTGRES_URL": "postgres://u@ep-1-pooler.neon.tech/db"}):
+            db.execute("scraper_is_active", ("home_depo",))
+        self.assertEqual(self.executed(), ["SELECT is_active FROM scrapers WHERE id = %s"])
+
+    def test_statement_is_prepared_once_per_connection(self):
+        self.cursor.fetchone.return_value = (True,)
+
+        for _ in range(3):
+            row = db.execute("scraper_is_active", ("home_depo",), fetch="one")
+        self.assertEqual(row, (True,))
+
+        self.assertEqual(
+            self.executed(),
+            [
+                "PREPARE scraper_is_active AS SELECT is_active FROM scrapers WHERE id = $1",
+                "EXECUTE scraper_is_active (%s)",
+                "EXECUTE scraper_is_active (%s)",
+                "EXECUTE scraper_is_active (%s)",
+            ],
+        )
+        self.assertEqual(self.conn.commit.call_count, 3)
+        self.assertEqual(self.pool.putconn.call_args.kwargs, {"close": False})
+        stats = db.query_stats()["scraper_is_active"]
+        self.assertEqual((stats["calls"], stats["errors"]), (3, 0))
+        self.assertIsNotNone(stats["p95_ms"])
+
+    def test_failed_statement_rolls_back_and_prepares_again(self):
+        db.execute("scraper_is_active", ("home_depo",))
+        self.cursor.execute.side_effect = [psycopg2.DataError("bad"), None, None, None]
+
+        with self.assertRaises(psycopg2.DataError):
+            with db.transaction() as tx:
+                tx.execute("update_last_run", (0.0, 1, "success", "ok", "home_depo"))
+        self.conn.rollback.assert_called_once()
+        self.assertIn("DEALLOCATE ALL", self.executed())
+        self.assertEqual(self.pool.putconn.call_args.kwargs, {"close": False})
+
+        self.cursor.execute.side_effect = None
+        self.cursor.execute.reset_mock()
+        db.execute("scraper_is_active", ("home_depo",))
+        self.assertTrue(self.executed()[0].startswith("PREPARE scraper_is_active"))
+        self.assertEqual(db.query_stats()["update_last_run"]["errors"], 1)
+
+    def test_broken_connection_is_dropped(self):
+        self.cursor.execute.side_effect = psycopg2.OperationalError("server closed")
+
+        with self.assertRaises(psycopg2.OperationalError):
+            db.execute("scraper_is_active", ("home_depo",))
+        self.conn.rollback.assert_not_called()
+        self.assertEqual(self.pool.putconn.call_args.kwargs, {"close": True})
+
+    @patch("psycopg2.connect")
+    def test_async_calls_use_the_pool(self, mock_connect):
+        self.cursor.fetchone.return_value = (True,)
+
+        async def run():
+            row = await db.execute_async("scraper_is_active", ("home_depo",), fetch="one")
+            await db.transaction_async(
+                lambda tx: tx.execute("update_last_run", (0.0, 1, "success", "ok", "home_depo"))
+            )
+            return row
+
+        self.assertEqual(asyncio.run(run()), (True,))
+        mock_connect.assert_not_called()
+        self.assertEqual(self.pool.getconn.call_count, 2)
+        self.assertEqual(self.pool.putconn.call_count, 2)
+        self.assertEqual(self.conn.commit.call_count, 2)
+        self.assertIn("EXECUTE update_last_run (%s, %s, %s, %s, %s)", self.executed())
+
+    def test_failed_async_transaction_rolls_back(self):
+        def work(tx):
+            tx.execute("scraper_is_active", ("home_depo",))
+            raise ValueError("bad row")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(db.transaction_async(work))
+        self.conn.rollback.assert_called_once()
+        self.assertEqual(self.pool.putconn.call_args.kwargs, {"close": False})
+
+
+
+if __name__ == "__main__":
+    unittest.main()
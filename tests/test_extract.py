@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.extract import (
+    extract_records,
+    extract_value,
+    extract_values,
+    normalize_schema,
+)
+
+
+class TestNormalizeSchema(unittest.TestCase):
+    def test_selector_shorthand_reads_text_content(self):
+        self.assertEqual(
+            normalize_schema({"title": "h3"}),
+            {"title": {"selector": "h3", "attr": "textContent"}},
+        )
+
+    def test_pair_shorthand(self):
+        self.assertEqual(
+            normalize_schema({"link": ("a", "href")}),
+            {"link": {"selector": "a", "attr": "href"}},
+        )
+
+    def test_dict_without_selector_reads_record_element(self):
+        self.assertEqual(
+            normalize_schema({"id": {"attr": "id"}, "text": None}),
+            {
+                "id": {"selector": "", "attr": "id"},
+                "text": {"selector": "", "attr": "textContent"},
+            },
+        )
+
+
+class TestExtractRecords(unittest.TestCase):
+    def test_whole_schema_runs_in_one_evaluate(self):
+        page = AsyncMock()
+        page.evaluate.return_value = [
+            {"title": "Code Club", "status": "Register", "dow": "Mon"},
+            {"title": "Lego Club", "status": "Full", "dow": "Tue"},
+        ]
+
+        records = asyncio.run(
+            extract_records(
+                page,
+                "div.day-event-card",
+                {"title": "h3", "status": "div.card-reg", "dow": "span.event-dow"},
+            )
+        )
+
+        page.evaluate.assert_awaited_once()
+        arg = page.evaluate.call_args[0][1]
+        self.assertEqual(arg["selector"], "div.day-event-card")
+        self.assertEqual(set(arg["schema"]), {"title", "status", "dow"})
+        self.assertEqual(records[1]["status"], "Full")
+
+    def test_extract_values_unwraps_records(self):
+        page = AsyncMock()
+        page.evaluate.return_value = [{"value": "a"}, {"value": "b"}]
+
+        self.assertEqual(asyncio.run(extract_values(page, "li")), ["a", "b"])
+        page.evaluate.assert_awaited_once()
+
+    def test_extract_value_returns_none_when_missing(self):
+        page = AsyncMock()
+        page.evaluate.return_value = []
+
+        self.assertIsNone(asyncio.run(extract_value(page, "h1")))
+        self.assertEqual(page.evaluate.call_args[0][1]["limit"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
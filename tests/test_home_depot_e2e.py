@@ -5,20 +5,20 @@ Uses the JSON fixtures:
   - homedepot_sample_response.json   (API workshop listing)
   - homedepot_registration_payload.json  (registration POST body)
 
-All external I/O (Playwright HTTP, Slack, file-based storage) is mocked so
+All external I/O (HTTP client, Slack, the state store) is mocked so
 the tests run offline without side-effects.
 """
 
 import asyncio
 import json
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 from datetime import date, datetime
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
-import requests
-
 # ---------------------------------------------------------------------------
 # Path setup – mirrors the convention used in the production code
 # ---------------------------------------------------------------------------
@@ -31,6 +31,8 @@ from scraper.home_depo import (
     run2,
     should_register_workshop,
 )
+from service.http_cache import ConditionalCache
+from service.http_client import HttpClientError
 
 # ---------------------------------------------------------------------------
 # Fixture helpers
@@ -44,23 +46,37 @@ def _load_fixture(filename: str) -> dict:
         return json.load(fh)
 
 
-def _build_playwright_mocks(response_body, *, status=200, headers=None):
+def _mock_store(registered=False):
+    """
+    Stand-in for the state store: every workshop is unknown (or already
+    registered) in the run's registration snapshot.
+    """
+    store = MagicMock()
+    registrations = store.snapshot.return_value
+    registrations.__enter__.return_value = registrations
+    registrations.__contains__.return_value = registered
+    registrations.is_registered.return_value = registered
+    return store
+
+
+def _build_http_mocks(response_body, *, status=200, headers=None):
     """
-    Return a (mock_playwright, mock_context, mock_response) triple
-    wired up so that ``async with async_playwright() as pw`` works.
+    Return a (mock_client, mock_response) pair standing in for the shared
+    HTTP client returned by ``get_http_client()``.
     """
     headers = headers or {"Content-Type": "application/json"}
 
-    mock_response = AsyncMock()
-    mock_response.status = status
+    mock_response = MagicMock()
+    mock_response.status_code = status
+    mock_response.ok = status < 400
+    mock_response.elapsed_ms = 5
     mock_response.headers = headers
 
     if isinstance(response_body, (dict, list)):
-        text = json.dumps(response_body)
-        mock_response.text.return_value = text
+        mock_response.text = json.dumps(response_body)
         mock_response.json.return_value = response_body
     elif isinstance(response_body, str):
-        mock_response.text.return_value = response_body
+        mock_response.text = response_body
         # If the string isn't valid JSON, make .json() raise
         try:
             parsed = json.loads(response_body)
@@ -68,19 +84,14 @@ def _build_playwright_mocks(response_body, *, status=200, headers=None):
         except json.JSONDecodeError as exc:
             mock_response.json.side_effect = exc
     else:
-        mock_response.text.return_value = ""
+        mock_response.text = ""
         mock_response.json.side_effect = json.JSONDecodeError("empty", "", 0)
 
-    mock_context = AsyncMock()
-    mock_context.get.return_value = mock_response
+    mock_client = MagicMock()
+    mock_client.get = AsyncMock(return_value=mock_response)
+    mock_client.post = AsyncMock(return_value=mock_response)
 
-    mock_pw_instance = AsyncMock()
-    mock_pw_instance.request.new_context.return_value = mock_context
-
-    mock_playwright = AsyncMock()
-    mock_playwright.return_value.__aenter__.return_value = mock_pw_instance
-
-    return mock_playwright, mock_context, mock_response
+    return mock_client, mock_response
 
 
 # =========================================================================
@@ -156,9 +167,9 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_successful_registration_with_fixture_data(
-        self, mock_post, mock_api_alert, mock_slack, _wc
+        self, mock_get_client, mock_api_alert, mock_slack, _wc
     ):
         """POST succeeds → returns (True, response_text)."""
         success_body = {"status": "OK", "message": "Registration successful"}
@@ -167,9 +178,10 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
         mock_resp.status_code = 200
         mock_resp.json.return_value = success_body
         mock_resp.text = json.dumps(success_body)
-        mock_post.return_value = mock_resp
+        mock_post = AsyncMock(return_value=mock_resp)
+        mock_get_client.return_value.post = mock_post
 
-        ok, text = register_home_depot_workshop(
+        ok, text = asyncio.run(register_home_depot_workshop(
             event_code=self.event_code,
             workshop_event_id=self.workshop_event_id,
             first_name=self.payload_fixture["customer"]["firstName"],
@@ -177,7 +189,7 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
             email=self.payload_fixture["customer"]["email"],
             store_id=self.payload_fixture["store"],
             participant_count=self.payload_fixture["participantCount"],
-        )
+        ))
 
         self.assertTrue(ok)
         # URL should contain both IDs
@@ -191,9 +203,9 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_failed_registration_returns_false(
-        self, mock_post, mock_api_alert, mock_slack, _wc
+        self, mock_get_client, mock_api_alert, mock_slack, _wc
     ):
         """HTTP 400 → returns (False, ...)."""
         fail_body = {"error": "Workshop is full"}
@@ -202,12 +214,13 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
         mock_resp.status_code = 400
         mock_resp.json.return_value = fail_body
         mock_resp.text = json.dumps(fail_body)
-        mock_post.return_value = mock_resp
+        mock_post = AsyncMock(return_value=mock_resp)
+        mock_get_client.return_value.post = mock_post
 
-        ok, text = register_home_depot_workshop(
+        ok, text = asyncio.run(register_home_depot_workshop(
             event_code=self.event_code,
             workshop_event_id=self.workshop_event_id,
-        )
+        ))
 
         self.assertFalse(ok)
         mock_api_alert.assert_called_once()
@@ -215,15 +228,16 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
-    def test_network_exception(self, mock_post, mock_api_alert, mock_slack, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_network_exception(self, mock_get_client, mock_api_alert, mock_slack, _wc):
         """Network exception → returns (False, error_string)."""
-        mock_post.side_effect = requests.exceptions.ConnectionError("DNS failed")
+        mock_post = AsyncMock(side_effect=HttpClientError("DNS failed"))
+        mock_get_client.return_value.post = mock_post
 
-        ok, text = register_home_depot_workshop(
+        ok, text = asyncio.run(register_home_depot_workshop(
             event_code=self.event_code,
             workshop_event_id=self.workshop_event_id,
-        )
+        ))
 
         self.assertFalse(ok)
         self.assertIn("DNS failed", text)
@@ -231,19 +245,19 @@ class TestRegisterWorkshopE2E(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_dry_run_does_not_call_api(
-        self, mock_post, mock_api_alert, mock_slack, _wc
+        self, mock_get_client, mock_api_alert, mock_slack, _wc
     ):
         """dry_run=True → no HTTP call is made."""
-        ok, text = register_home_depot_workshop(
+        ok, text = asyncio.run(register_home_depot_workshop(
             event_code=self.event_code,
             workshop_event_id=self.workshop_event_id,
             dry_run=True,
-        )
+        ))
 
         self.assertTrue(ok)
-        mock_post.assert_not_called()
+        mock_get_client.return_value.post.assert_not_called()
         response = json.loads(text)
         self.assertTrue(response["dry_run"])
 
@@ -270,24 +284,20 @@ class TestRun2E2E(unittest.TestCase):
 
     # -- happy-path scenarios ---------------------------------------------
 
-    @patch("service.alert.get_registered_workshops", return_value={})
-    @patch("service.alert.save_registered_workshop")
-    @patch("service.alert.is_workshop_registered", return_value=False)
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
     @patch("scraper.home_depo.register_home_depot_workshop", return_value=(True, "OK"))
     @patch("service.alert.send_urgent_workshop_alert")
     @patch("scraper.home_depo.send_slack_message")
     @patch("service.alert.send_slack_message")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_full_pipeline_registers_eligible_workshop(
         self,
-        mock_pw,
+        mock_client,
         mock_slack_svc,
         mock_slack_scraper,
         mock_urgent,
         mock_register,
-        mock_is_registered,
-        mock_save_reg,
-        mock_get_regs,
+        mock_store,
         _wc,
     ):
         """
@@ -296,11 +306,8 @@ class TestRun2E2E(unittest.TestCase):
 
         MWBT0006 (10:30, 0 remaining) should be skipped (seats=0).
         """
-        pw, ctx, resp = _build_playwright_mocks(self.sample_response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(self.sample_response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -316,22 +323,25 @@ class TestRun2E2E(unittest.TestCase):
         self.assertEqual(workshop_details["seats_left"], 19)
 
         # Registration should be attempted for MWBT0005 (08:30, seats available)
-        mock_register.assert_called_once_with("MWBT0005", "WS00037")
+        mock_register.assert_called_once_with("MWBT0005", "WS00037", store_id="7265")
+
+        # the run's registrations are read once, for home_depo
+        mock_store.return_value.snapshot.assert_called_once_with("home_depo")
+        registrations = mock_store.return_value.snapshot.return_value
 
-        # save_registered_workshop should be called TWICE:
+        # registrations.save should be called TWICE:
         # 1. To mark as "Discovered" (is_registered=False)
         # 2. To mark as "Registered" (is_registered=True) after success
-        self.assertEqual(mock_save_reg.call_count, 2)
+        self.assertEqual(registrations.save.call_count, 2)
 
         # Verify first call (Discovery)
-        first_call_kwargs = mock_save_reg.call_args_list[0][1]
+        first_call_kwargs = registrations.save.call_args_list[0][0][0]
         self.assertEqual(first_call_kwargs["workshop_event_id"], "WS00037")
         self.assertFalse(first_call_kwargs["is_registered"])
 
         # Verify second call (Registration Success) with exact data
-        # that ends up in storage/registered_workshops.json
-        save_kwargs = mock_save_reg.call_args_list[1][1]
-        self.assertEqual(save_kwargs["scraper_name"], "home_depo")
+        # that ends up in the state store
+        save_kwargs = registrations.save.call_args_list[1][0][0]
         self.assertEqual(save_kwargs["workshop_event_id"], "WS00037")
         self.assertEqual(save_kwargs["workshop_id"], "MWBT0005")
         self.assertEqual(save_kwargs["title"], "Build a Leprechaun Trap")
@@ -339,49 +349,40 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn("March", save_kwargs["event_date"])
         self.assertIn("2026", save_kwargs["event_date"])
         self.assertIn("08:30", save_kwargs["event_date"])
-        # Implicitly is_registered=True (default) or explicitly passed?
-        # In code it's using default, which is True.
-        # We can check it's NOT False.
-        self.assertTrue(save_kwargs.get("is_registered", True))
-
-    @patch("service.alert.get_registered_workshops")
-    @patch("service.alert.save_registered_workshop")
-    @patch("service.alert.is_workshop_registered", return_value=True)  # Already registered!
+        self.assertTrue(save_kwargs["is_registered"])
+
+        # discoveries are flushed when the run ends
+        registrations.__exit__.assert_called_once()
+
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=True))
     @patch("scraper.home_depo.register_home_depot_workshop")
     @patch("service.alert.send_urgent_workshop_alert")
     @patch("scraper.home_depo.send_slack_message")
     @patch("service.alert.send_slack_message")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_skips_already_registered_workshop(
         self,
-        mock_pw,
+        mock_client,
         mock_slack_svc,
         mock_slack_scraper,
         mock_urgent,
         mock_register,
-        mock_is_registered,
-        mock_save_reg,
-        mock_get_regs,
+        mock_store,
         _wc,
     ):
         """
-        When is_workshop_registered() returns True, no alerts should be sent
-        and registration should be skipped entirely.
+        When the workshop is registered in the run's snapshot, no alerts should
+        be sent and registration should be skipped entirely.
         """
-        # Simulate that the workshop is already known and registered
-        mock_get_regs.return_value = {"WS00037": {"is_registered": True}}
-        
-        pw, ctx, resp = _build_playwright_mocks(self.sample_response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(self.sample_response)
+        mock_client.return_value = client
 
         self._run(run2())
 
-        # is_workshop_registered should have been called with the correct args
+        # the snapshot should have been checked with the correct event code
         # for the 8:30 workshop (MWBT0005 → event_code WS00037)
-        mock_is_registered.assert_any_call("home_depo", "WS00037")
+        registrations = mock_store.return_value.snapshot.return_value
+        registrations.is_registered.assert_any_call("WS00037")
 
         # No alerts should be sent for already-registered workshops
         mock_slack_scraper.assert_not_called()
@@ -389,26 +390,22 @@ class TestRun2E2E(unittest.TestCase):
 
         # Registration should NOT be attempted
         mock_register.assert_not_called()
-        mock_save_reg.assert_not_called()
+        registrations.save.assert_not_called()
 
-    @patch("service.alert.get_registered_workshops", return_value={})
-    @patch("service.alert.save_registered_workshop")
-    @patch("service.alert.is_workshop_registered", return_value=False)
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
     @patch("scraper.home_depo.register_home_depot_workshop", return_value=(True, "OK"))
     @patch("service.alert.send_urgent_workshop_alert")
     @patch("scraper.home_depo.send_slack_message")
     @patch("service.alert.send_slack_message")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_both_sessions_get_alerts_when_both_have_spots(
         self,
-        mock_pw,
+        mock_client,
         mock_slack_svc,
         mock_slack_scraper,
         mock_urgent,
         mock_register,
-        mock_is_registered,
-        mock_save_reg,
-        mock_get_regs,
+        mock_store,
         _wc,
     ):
         """
@@ -419,11 +416,8 @@ class TestRun2E2E(unittest.TestCase):
         # Give the 10:30 session some open spots too
         response["workshopEventWsDTO"][1]["remainingSeats"] = 10
 
-        pw, ctx, resp = _build_playwright_mocks(response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -436,41 +430,35 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn(19, alerted_seats)  # 8:30 session
         self.assertIn(10, alerted_seats)  # 10:30 session
 
-        # save_registered_workshop call count:
+        # registrations.save call count:
         # MWBT0005 (8:30): Discover (1) + Register (1) = 2
         # MWBT0006 (10:30): Discover (1) + Register (0, wrong time) = 1
         # Total = 3
-        self.assertEqual(mock_save_reg.call_count, 3)
+        registrations = mock_store.return_value.snapshot.return_value
+        self.assertEqual(registrations.save.call_count, 3)
 
-    @patch("service.alert.get_registered_workshops", return_value={})
-    @patch("service.alert.save_registered_workshop")
-    @patch("service.alert.is_workshop_registered", return_value=False)
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
     @patch("scraper.home_depo.register_home_depot_workshop", return_value=(False, "Error"))
     @patch("service.alert.send_urgent_workshop_alert")
     @patch("scraper.home_depo.send_slack_message")
     @patch("service.alert.send_slack_message")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_failed_registration_not_saved(
         self,
-        mock_pw,
+        mock_client,
         mock_slack_svc,
         mock_slack_scraper,
         mock_urgent,
         mock_register,
-        mock_is_registered,
-        mock_save_reg,
-        mock_get_regs,
+        mock_store,
         _wc,
     ):
         """
-        When registration fails, save_registered_workshop() should only be called once
+        When registration fails, registrations.save() should only be called once
         (for discovery), but NOT for the failed registration.
         """
-        pw, ctx, resp = _build_playwright_mocks(self.sample_response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(self.sample_response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -478,8 +466,9 @@ class TestRun2E2E(unittest.TestCase):
         mock_register.assert_called_once()
 
         # Called once for Discovery (is_registered=False)
-        self.assertEqual(mock_save_reg.call_count, 1)
-        args_kwargs = mock_save_reg.call_args[1]
+        registrations = mock_store.return_value.snapshot.return_value
+        self.assertEqual(registrations.save.call_count, 1)
+        args_kwargs = registrations.save.call_args[0][0]
         self.assertFalse(args_kwargs["is_registered"])
 
         # An error slack message should have been sent (the code sends one)
@@ -493,10 +482,10 @@ class TestRun2E2E(unittest.TestCase):
     @patch("service.alert.send_slack_message")
     @patch("scraper.home_depo.update_last_alert_date")
     @patch("scraper.home_depo.get_last_alert_date", return_value=None)
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_skips_fully_booked_workshop(
         self,
-        mock_pw,
+        mock_client,
         mock_get_date,
         mock_update_date,
         mock_slack_svc,
@@ -518,11 +507,8 @@ class TestRun2E2E(unittest.TestCase):
         ]
         self.assertEqual(len(response["workshopEventWsDTO"]), 1)
 
-        pw, ctx, resp = _build_playwright_mocks(response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -535,10 +521,10 @@ class TestRun2E2E(unittest.TestCase):
     @patch("service.alert.send_slack_message")
     @patch("scraper.home_depo.update_last_alert_date")
     @patch("scraper.home_depo.get_last_alert_date", return_value=None)
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_skips_non_kid_workshop(
         self,
-        mock_pw,
+        mock_client,
         mock_get_date,
         mock_update_date,
         mock_slack_svc,
@@ -553,11 +539,8 @@ class TestRun2E2E(unittest.TestCase):
         # Remove the fully-booked workshop so we isolate the test
         response["workshopEventWsDTO"] = [response["workshopEventWsDTO"][0]]
 
-        pw, ctx, resp = _build_playwright_mocks(response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -569,10 +552,10 @@ class TestRun2E2E(unittest.TestCase):
     @patch("service.alert.send_slack_message")
     @patch("scraper.home_depo.update_last_alert_date")
     @patch("scraper.home_depo.get_last_alert_date", return_value=None)
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_skips_inactive_workshop(
         self,
-        mock_pw,
+        mock_client,
         mock_get_date,
         mock_update_date,
         mock_slack_svc,
@@ -585,11 +568,8 @@ class TestRun2E2E(unittest.TestCase):
         response["workshopEventWsDTO"][0]["workshopStatus"] = "CLOSED"
         response["workshopEventWsDTO"] = [response["workshopEventWsDTO"][0]]
 
-        pw, ctx, resp = _build_playwright_mocks(response)
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks(response)
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -599,16 +579,13 @@ class TestRun2E2E(unittest.TestCase):
     # -- error scenarios ---------------------------------------------------
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_api_returns_500(self, mock_pw, mock_api_alert, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_api_returns_500(self, mock_client, mock_api_alert, _wc):
         """Non-200 status → send_api_error_alert is called."""
-        pw, ctx, resp = _build_playwright_mocks(
+        client, resp = _build_http_mocks(
             "Internal Server Error", status=500
         )
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -617,16 +594,13 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn("500", args[2])
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_api_returns_empty_body(self, mock_pw, mock_api_alert, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_api_returns_empty_body(self, mock_client, mock_api_alert, _wc):
         """Empty response body → send_api_error_alert."""
-        pw, ctx, resp = _build_playwright_mocks("", status=200)
-        # Make text() return empty string
-        resp.text.return_value = ""
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks("", status=200)
+        # Make text return empty string
+        resp.text = ""
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -635,14 +609,11 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn("empty", args[1].lower())
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_api_returns_invalid_json(self, mock_pw, mock_api_alert, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_api_returns_invalid_json(self, mock_client, mock_api_alert, _wc):
         """Malformed JSON → JSON parsing error alert."""
-        pw, ctx, resp = _build_playwright_mocks("{ not valid JSON !!!")
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks("{ not valid JSON !!!")
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -651,14 +622,11 @@ class TestRun2E2E(unittest.TestCase):
         self.assertEqual(args[1], "JSON parsing error")
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_api_missing_workshopEventWsDTO_key(self, mock_pw, mock_api_alert, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_api_missing_workshopEventWsDTO_key(self, mock_client, mock_api_alert, _wc):
         """Response missing the expected key → alert about missing structure."""
-        pw, ctx, resp = _build_playwright_mocks({"someOtherKey": []})
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks({"someOtherKey": []})
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -667,14 +635,11 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn("missing expected", args[1])
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_api_empty_workshop_list(self, mock_pw, mock_api_alert, _wc):
+    @patch("scraper.home_depo.get_http_client")
+    def test_api_empty_workshop_list(self, mock_client, mock_api_alert, _wc):
         """workshopEventWsDTO is an empty list → no processing, no error."""
-        pw, ctx, resp = _build_playwright_mocks({"workshopEventWsDTO": []})
-        mock_pw.return_value = pw.return_value
-        mock_pw.return_value.__aenter__.return_value = (
-            pw.return_value.__aenter__.return_value
-        )
+        client, resp = _build_http_mocks({"workshopEventWsDTO": []})
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -682,16 +647,13 @@ class TestRun2E2E(unittest.TestCase):
         mock_api_alert.assert_not_called()
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_playwright_exception(self, mock_pw, mock_api_alert, _wc):
-        """Unexpected exception in Playwright → send_api_error_alert."""
-        # Raise at context.get() level so it's inside the try/except in run2()
-        mock_context = AsyncMock()
-        mock_context.get.side_effect = Exception("Browser crashed")
-
-        mock_pw_instance = AsyncMock()
-        mock_pw_instance.request.new_context.return_value = mock_context
-        mock_pw.return_value.__aenter__.return_value = mock_pw_instance
+    @patch("scraper.home_depo.get_http_client")
+    def test_http_client_exception(self, mock_client, mock_api_alert, _wc):
+        """Transport failure in the HTTP client → send_api_error_alert."""
+        # Raise at client.get() level so it's inside the try/except in run2()
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=HttpClientError("Connection reset"))
+        mock_client.return_value = client
 
         self._run(run2())
 
@@ -740,5 +702,121 @@ class TestRun2E2E(unittest.TestCase):
         self.assertIn(payload["workshopEventCode"], event_codes)
 
 
+# -------------------------------------------------------------------------
+# Conditional polling
+# -------------------------------------------------------------------------
+@patch("slack.WebClient")
+class TestRun2Conditional(unittest.TestCase):
+    """run2(conditional=True) skips the pipeline when the listing is unchanged."""
+
+    def setUp(self):
+        self.sample_response = _load_fixture("homedepot_sample_response.json")
+        self.cache_dir = tempfile.mkdtemp()
+        self._patch = patch(
+            "scraper.home_depo.ConditionalCache",
+            lambda: ConditionalCache(self.cache_dir),
+        )
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        shutil.rmtree(self.cache_dir)
+
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
+    @patch("scraper.home_depo.register_home_depot_workshop", return_value=(True, "OK"))
+    @patch("service.alert.send_urgent_workshop_alert")
+    @patch("scraper.home_depo.send_slack_message")
+    @patch("scraper.home_depo.get_http_client")
+    def test_304_and_same_body_short_circuit(
+        self, mock_client, mock_slack, mock_urgent, mock_register, *_mocks
+    ):
+        client, resp = _build_http_mocks(
+            self.sample_response, headers={"etag": '"v1"'}
+        )
+        mock_client.return_value = client
+
+        asyncio.run(run2(conditional=True))
+        self.assertEqual(mock_urgent.call_count, 1)
+        self.assertEqual(client.get.call_args.kwargs["headers"], {})
+
+        # second poll sends the validator and gets a 304
+        resp.status_code = 304
+        asyncio.run(run2(conditional=True))
+        self.assertEqual(client.get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+        # third poll: 200 with the same body (validator ignored upstream)
+        resp.status_code = 200
+        asyncio.run(run2(conditional=True))
+
+        self.assertEqual(mock_urgent.call_count, 1)
+        mock_register.assert_called_once()
+
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
+    @patch("scraper.home_depo.register_home_depot_workshop", return_value=(False, "Full"))
+    @patch("service.alert.send_urgent_workshop_alert")
+    @patch("scraper.home_depo.send_slack_message")
+    @patch("scraper.home_depo.get_http_client")
+    def test_failed_registration_is_retried_on_same_body(
+        self, mock_client, mock_slack, mock_urgent, mock_register, *_mocks
+    ):
+        client, _ = _build_http_mocks(self.sample_response, headers={"etag": '"v1"'})
+        mock_client.return_value = client
+
+        asyncio.run(run2(conditional=True))
+        asyncio.run(run2(conditional=True))
+
+        # the listing was not marked handled: no validator, alert and retry again
+        self.assertEqual(client.get.call_args.kwargs["headers"], {})
+        self.assertEqual(mock_urgent.call_count, 2)
+        self.assertEqual(mock_register.call_count, 2)
+
+
+# -------------------------------------------------------------------------
+# Multi-store fan-out
+# -------------------------------------------------------------------------
+@patch("slack.WebClient")
+class TestRun2MultiStore(unittest.TestCase):
+    """run2(store_ids=[...]) fetches every store and processes them in one pass."""
+
+    def setUp(self):
+        self.sample_response = _load_fixture("homedepot_sample_response.json")
+
+    @patch("service.alert.send_api_error_alert")
+    @patch("scraper.home_depo.get_store", return_value=_mock_store(registered=False))
+    @patch("scraper.home_depo.register_home_depot_workshop", return_value=(True, "OK"))
+    @patch("service.alert.send_urgent_workshop_alert")
+    @patch("scraper.home_depo.send_slack_message")
+    @patch("scraper.home_depo.get_http_client")
+    def test_failed_store_does_not_block_the_others(
+        self, mock_client, mock_slack, mock_urgent, mock_register, *mocks
+    ):
+        mock_api_alert = mocks[-2]
+        ok_client, ok_resp = _build_http_mocks(self.sample_response)
+        _, error_resp = _build_http_mocks("Server Error", status=500)
+
+        async def get(url, **kwargs):
+            if "storeId=7001" in url:
+                await asyncio.sleep(0.05)
+                return error_resp
+            return ok_resp
+
+        ok_client.get = AsyncMock(side_effect=get)
+        mock_client.return_value = ok_client
+
+        self._run(run2(store_ids=["7001", "7265", "7300"]))
+
+        self.assertEqual(ok_client.get.await_count, 3)
+        mock_api_alert.assert_called_once()
+        self.assertIn("storeId=7001", mock_api_alert.call_args[0][2])
+        # both healthy stores went through the processing pass
+        registered_stores = {c.kwargs["store_id"] for c in mock_register.call_args_list}
+        self.assertEqual(registered_stores, {"7265", "7300"})
+        links = {c[0][1] for c in mock_urgent.call_args_list}
+        self.assertIn("https://www.homedepot.ca/workshops?storeId=7300", links)
+
+    def _run(self, coro):
+        return asyncio.run(coro)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,8 +5,6 @@ import sys
 import unittest
 from unittest.mock import AsyncMock, MagicMock, patch
 
-import requests
-
 # Add parent directory to path to allow imports
 current = os.path.dirname(os.path.realpath(__file__))
 parent = os.path.dirname(current)
@@ -14,6 +12,7 @@ sys.path.append(parent)
 
 # Import the module to test
 from scraper.home_depo import register_home_depot_workshop, run2
+from service.http_client import HttpClientError
 
 
 # Mock the entire slack WebClient class at module level
@@ -107,9 +106,9 @@ class TestHomeDepotScraper(unittest.TestCase):
     # Fix 1: Correcting the mock paths to 'service.alert' instead of 'scraper.home_depo'
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_register_workshop_success(
-        self, mock_post, mock_api_alert, mock_slack, mock_webclient
+        self, mock_get_client, mock_api_alert, mock_slack, mock_webclient
     ):
         """Test successful workshop registration"""
         # Configure the mock
@@ -118,13 +117,14 @@ class TestHomeDepotScraper(unittest.TestCase):
         mock_response.status_code = 200
         mock_response.json.return_value = self.sample_registration_success
         mock_response.text = json.dumps(self.sample_registration_success)
-        mock_post.return_value = mock_response
+        mock_post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value.post = mock_post
 
         event_code = "KWTM12345"
         workshop_event_id = "WS00025"
 
         # Call the function with both required parameters
-        success, response = register_home_depot_workshop(
+        success, response = asyncio.run(register_home_depot_workshop(
             event_code,  # workshop ID (e.g., "KWTM12345")
             workshop_event_id,  # workshop event ID (e.g., "WS00025")
             first_name="Test",
@@ -132,12 +132,15 @@ class TestHomeDepotScraper(unittest.TestCase):
             email="test@example.com",
             store_id="7265",
             participant_count=2,
-        )
+        ))
 
         # Assertions
         self.assertTrue(success)
         mock_post.assert_called_once()
-        mock_api_alert.assert_called_once()
+        # a success is an update, not an error
+        mock_api_alert.assert_not_called()
+        mock_slack.assert_called_once()
+        self.assertIn("Registration successful", mock_slack.call_args.args[0])
 
         # Check that the request was made with the correct parameters
         call_args = mock_post.call_args
@@ -160,9 +163,9 @@ class TestHomeDepotScraper(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_register_workshop_failure(
-        self, mock_post, mock_api_alert, mock_slack, mock_webclient
+        self, mock_get_client, mock_api_alert, mock_slack, mock_webclient
     ):
         """Test failed workshop registration"""
         # Configure the mock
@@ -171,16 +174,17 @@ class TestHomeDepotScraper(unittest.TestCase):
         mock_response.status_code = 400
         mock_response.json.return_value = self.sample_registration_failure
         mock_response.text = json.dumps(self.sample_registration_failure)
-        mock_post.return_value = mock_response
+        mock_post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value.post = mock_post
 
         # Call the function with both required parameters
-        success, response = register_home_depot_workshop(
+        success, response = asyncio.run(register_home_depot_workshop(
             "KWTM12345",  # event_code (workshop ID)
             "WS00025",  # workshop_event_id
             first_name="Test",
             last_name="User",
             email="test@example.com",
-        )
+        ))
 
         # Assertions
         self.assertFalse(success)
@@ -193,18 +197,19 @@ class TestHomeDepotScraper(unittest.TestCase):
 
     @patch("service.alert.send_slack_message")
     @patch("service.alert.send_api_error_alert")
-    @patch("requests.post")
+    @patch("scraper.home_depo.get_http_client")
     def test_register_workshop_exception(
-        self, mock_post, mock_api_alert, mock_slack, mock_webclient
+        self, mock_get_client, mock_api_alert, mock_slack, mock_webclient
     ):
         """Test exception handling in workshop registration"""
         # Configure the mock to raise an exception
-        mock_post.side_effect = requests.exceptions.RequestException("Network error")
+        mock_post = AsyncMock(side_effect=HttpClientError("Network error"))
+        mock_get_client.return_value.post = mock_post
 
         # Call the function with both required parameters
-        success, response = register_home_depot_workshop(
+        success, response = asyncio.run(register_home_depot_workshop(
             "KWTM12345", "WS00025"  # event_code (workshop ID)  # workshop_event_id
-        )
+        ))
 
         # Assertions
         self.assertFalse(success)
@@ -216,8 +221,7 @@ class TestHomeDepotScraper(unittest.TestCase):
         self.assertIn("error", args[1].lower())
 
     # Fix 2: Using a proper async test method that correctly awaits coroutines
-    @patch("service.alert.save_registered_workshop")
-    @patch("service.alert.is_workshop_registered")
+    @patch("scraper.home_depo.get_store")
     @patch("scraper.home_depo.register_home_depot_workshop")
     @patch("service.alert.send_urgent_workshop_alert")
     @patch("scraper.home_depo.send_slack_message")
@@ -225,10 +229,10 @@ class TestHomeDepotScraper(unittest.TestCase):
     @patch("scraper.home_depo.update_last_alert_date")
     @patch("scraper.home_depo.get_last_alert_date")
     @patch("service.alert.send_api_error_alert")  # Only patch at source
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_run2_workshop_processing(
         self,
-        mock_playwright,
+        mock_get_client,
         mock_api_alert_source,
         mock_get_date,
         mock_update_date,
@@ -236,14 +240,16 @@ class TestHomeDepotScraper(unittest.TestCase):
         mock_slack_imported,
         mock_urgent,
         mock_register,
-        mock_is_registered,
-        mock_save_registration,
+        mock_store,
         mock_webclient,
     ):
         """Test the main run2 function's workshop processing logic"""
         # Set up mocks
         mock_get_date.return_value = None  # No previous alert
-        mock_is_registered.return_value = False  # Not already registered
+        registrations = mock_store.return_value.snapshot.return_value
+        registrations.__enter__.return_value = registrations
+        registrations.__contains__.return_value = False
+        registrations.is_registered.return_value = False  # Not already registered
         mock_register.return_value = (True, "Success")
         mock_slack_imported.return_value = True
         mock_slack_source.return_value = True
@@ -279,25 +285,23 @@ class TestHomeDepotScraper(unittest.TestCase):
             ],
         }
 
-        # Create mock context and response
-        mock_context = AsyncMock()
-        mock_response = AsyncMock()
-        mock_response.status = 200
+        # Create mock client and response
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.status_code = 200
         mock_response.headers = {"Content-Type": "application/json"}
-        mock_response.text.return_value = json.dumps(home_depot_response)
+        mock_response.text = json.dumps(home_depot_response)
         mock_response.json.return_value = home_depot_response
 
-        # Configure playwright mock
-        mock_playwright_instance = AsyncMock()
-        mock_playwright_instance.request.new_context.return_value = mock_context
-        mock_playwright.return_value.__aenter__.return_value = mock_playwright_instance
-        mock_context.get.return_value = mock_response
+        # Configure the shared HTTP client mock
+        mock_client.get = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
         # Run the async function with asyncio
         asyncio.run(run2())
 
         # Assertions
-        mock_context.get.assert_called_once()
+        mock_client.get.assert_called_once()
 
         # Should find the active kid workshop with available seats and send alerts
         # Check that any version of slack_message was called
@@ -311,25 +315,25 @@ class TestHomeDepotScraper(unittest.TestCase):
         # Our test data has code "KWSO0001" which matches these criteria (starts with KW, starts at 08:30)
         # Since remainingSeats=5 and attendeeLimit=96, that means 91 people have registered (>= 1)
         # so registration SHOULD be called
-        mock_register.assert_called_once_with("KWSO0001", "WS00025")
-        mock_save_registration.assert_called_once()
+        mock_register.assert_called_once_with("KWSO0001", "WS00025", store_id="7265")
+        # discovered, then registered
+        self.assertEqual(registrations.save.call_count, 2)
+        self.assertTrue(registrations.save.call_args[0][0]["is_registered"])
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
-    def test_run2_api_error(self, mock_playwright, mock_api_alert, mock_webclient):
+    @patch("scraper.home_depo.get_http_client")
+    def test_run2_api_error(self, mock_get_client, mock_api_alert, mock_webclient):
         """Test handling of API errors in run2"""
-        # Create mock context and error response
-        mock_context = AsyncMock()
-        mock_response = AsyncMock()
-        mock_response.status = 500
+        # Create mock client and error response
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.status_code = 500
         mock_response.headers = {"Content-Type": "text/plain"}
-        mock_response.text.return_value = "Internal Server Error"
+        mock_response.text = "Internal Server Error"
 
-        # Configure playwright mock
-        mock_playwright_instance = AsyncMock()
-        mock_playwright_instance.request.new_context.return_value = mock_context
-        mock_playwright.return_value.__aenter__.return_value = mock_playwright_instance
-        mock_context.get.return_value = mock_response
+        # Configure the shared HTTP client mock
+        mock_client.get = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
         # Run the async function with asyncio
         asyncio.run(run2())
@@ -340,26 +344,24 @@ class TestHomeDepotScraper(unittest.TestCase):
         self.assertIn("500", args[2])  # Error details should mention status code
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_run2_json_parse_error(
-        self, mock_playwright, mock_api_alert, mock_webclient
+        self, mock_get_client, mock_api_alert, mock_webclient
     ):
         """Test handling of JSON parsing errors"""
-        # Create mock context and invalid JSON response
-        mock_context = AsyncMock()
-        mock_response = AsyncMock()
-        mock_response.status = 200
+        # Create mock client and invalid JSON response
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.status_code = 200
         mock_response.headers = {"Content-Type": "application/json"}
-        mock_response.text.return_value = "{ invalid json }"
+        mock_response.text = "{ invalid json }"
         mock_response.json.side_effect = json.JSONDecodeError(
             "Invalid JSON", "{ invalid json }", 0
         )
 
-        # Configure playwright mock
-        mock_playwright_instance = AsyncMock()
-        mock_playwright_instance.request.new_context.return_value = mock_context
-        mock_playwright.return_value.__aenter__.return_value = mock_playwright_instance
-        mock_context.get.return_value = mock_response
+        # Configure the shared HTTP client mock
+        mock_client.get = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
         # Run the async function with asyncio
         asyncio.run(run2())
@@ -370,27 +372,25 @@ class TestHomeDepotScraper(unittest.TestCase):
         self.assertEqual(args[1], "JSON parsing error")
 
     @patch("service.alert.send_api_error_alert")
-    @patch("playwright.async_api.async_playwright")
+    @patch("scraper.home_depo.get_http_client")
     def test_run2_missing_data_structure(
-        self, mock_playwright, mock_api_alert, mock_webclient
+        self, mock_get_client, mock_api_alert, mock_webclient
     ):
         """Test handling of missing expected data structure"""
-        # Create mock context and response with missing key
-        mock_context = AsyncMock()
-        mock_response = AsyncMock()
-        mock_response.status = 200
+        # Create mock client and response with missing key
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.status_code = 200
         mock_response.headers = {"Content-Type": "application/json"}
 
         # Response is missing the expected workshopEventWsDTO key
         invalid_response = {"someOtherKey": []}
-        mock_response.text.return_value = json.dumps(invalid_response)
+        mock_response.text = json.dumps(invalid_response)
         mock_response.json.return_value = invalid_response
 
-        # Configure playwright mock
-        mock_playwright_instance = AsyncMock()
-        mock_playwright_instance.request.new_context.return_value = mock_context
-        mock_playwright.return_value.__aenter__.return_value = mock_playwright_instance
-        mock_context.get.return_value = mock_response
+        # Configure the shared HTTP client mock
+        mock_client.get = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
         # Run the async function with asyncio
         asyncio.run(run2())
@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.http_cache import ConditionalCache, endpoint
+
+URL = "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId=7265&lang=en"
+
+
+class TestConditionalCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_no_validators_before_first_store(self):
+        cache = ConditionalCache(self.tmpdir)
+        self.assertEqual(cache.request_headers(URL), {})
+        self.assertFalse(cache.unchanged(URL, 200, "{}"))
+
+    def test_validators_are_sent_and_304_is_a_hit(self):
+        cache = ConditionalCache(self.tmpdir)
+        cache.store(URL, {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}, "{}")
+
+        cache = ConditionalCache(self.tmpdir)  # survives a restart
+        self.assertEqual(
+            cache.request_headers(URL),
+            {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        )
+        self.assertTrue(cache.unchanged(URL, 304))
+        self.assertEqual(cache.body(URL), "{}")
+        self.assertEqual(cache.stats()[endpoint(URL)]["not_modified"], 1)
+
+    def test_body_hash_fallback_without_validators(self):
+        cache = ConditionalCache(self.tmpdir)
+        cache.store(URL, {"content-type": "application/json"}, '{"a": 1}')
+
+        self.assertEqual(cache.request_headers(URL), {})
+        self.assertTrue(cache.unchanged(URL, 200, '{"a": 1}'))
+        self.assertFalse(cache.unchanged(URL, 200, '{"a": 2}'))
+        stats = cache.stats()[endpoint(URL)]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
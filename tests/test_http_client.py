@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.http_client import HttpClient, HttpClientError
+
+URL = "https://www.homedepot.ca/api/workshopsvc/v1/workshops/all?storeId=7265&lang=en"
+
+
+def fake_session_cls(response=None, error=None):
+    session = MagicMock()
+    session.request = AsyncMock(return_value=response, side_effect=error)
+    session.close = AsyncMock()
+    return MagicMock(return_value=session), session
+
+
+class TestHttpClient(unittest.TestCase):
+    def test_session_is_reused_and_configured_for_keep_alive(self):
+        raw = MagicMock(status_code=200, headers={"etag": '"1"'}, text='{"a": 1}')
+        session_cls, session = fake_session_cls(response=raw)
+        client = HttpClient(timeout=7, connect_timeout=2)
+
+        async def scenario():
+            first = await client.get(URL)
+            second = await client.post(URL, json={"x": 1})
+            await client.close()
+            return first, second
+
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            first, second = asyncio.run(scenario())
+
+        session_cls.assert_called_once()
+        kwargs = session_cls.call_args.kwargs
+        self.assertEqual(kwargs["timeout"], (2, 7))
+        self.assertIn("curl_options", kwargs)
+        self.assertEqual(first.json(), {"a": 1})
+        self.assertTrue(second.ok)
+        session.close.assert_awaited_once()
+        self.assertEqual(client.stats()["www.homedepot.ca"]["count"], 2)
+
+    def test_transport_errors_are_wrapped_and_counted(self):
+        session_cls, _ = fake_session_cls(error=OSError("DNS failed"))
+        client = HttpClient()
+
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            with self.assertRaises(HttpClientError):
+                asyncio.run(client.get(URL))
+
+        self.assertEqual(client.stats()["www.homedepot.ca"]["errors"], 1)
+
+    def test_new_event_loop_gets_a_new_session(self):
+        raw = MagicMock(status_code=200, headers={}, text="")
+        session_cls, _ = fake_session_cls(response=raw)
+        client = HttpClient(rate_per_host=0)
+
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            for _ in range(2):
+                loop = asyncio.new_event_loop()
+                loop.run_until_complete(client.get(URL))
+                loop.close()
+
+        self.assertEqual(session_cls.call_count, 2)
+
+    def test_requests_to_one_host_are_spaced_out(self):
+        raw = MagicMock(status_code=200, headers={}, text="")
+        session_cls, _ = fake_session_cls(response=raw)
+        client = HttpClient(rate_per_host=20)
+
+        async def scenario():
+            started = time.monotonic()
+            await asyncio.gather(*(client.get(URL) for _ in range(3)))
+            return time.monotonic() - started
+
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            elapsed = asyncio.run(scenario())
+
+        self.assertGreaterEqual(elapsed, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
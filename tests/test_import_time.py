@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+sys.path.append(os.path.join(parent, "scripts"))
+
+from import_benchmark import HEAVY_MODULES, parse_importtime, slowest_imports
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       300 |        300 |   _io
+import time:       100 |        400 | io
+import time:      1000 |       1000 |     dotenv.main
+import time:       200 |       1200 |   dotenv
+import time:      5000 |       5000 |   asyncio
+import time:       800 |       7000 | scraper.home_depo
+"""
+
+
+class TestImportBenchmark(unittest.TestCase):
+    def test_parse_and_rank_direct_imports(self):
+        rows = parse_importtime(IMPORTTIME)
+
+        self.assertEqual(rows[-1], ("scraper.home_depo", 0.8, 7.0, 0))
+        self.assertEqual(
+            [row[0] for row in slowest_imports(rows, "scraper.home_depo")],
+            ["asyncio", "dotenv"],
+        )
+
+    def test_scraper_import_does_not_load_heavy_dependencies(self):
+        env = dict(os.environ, SLACK_API_TOKEN="test-token", CHANNEL_ID="test-channel")
+        code = (
+            "import sys, scraper.home_depo, scraper.canada_ircc\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=parent, env=env, capture_output=True, text=True
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.interception import TYPICAL_BYTES, RequestBlocker, get_profile
+
+
+def pyppeteer_request(url, resource_type):
+    return SimpleNamespace(
+        url=url, resourceType=resource_type, abort=AsyncMock(), continue_=AsyncMock()
+    )
+
+
+class TestProfiles(unittest.TestCase):
+    def test_scraper_profile_is_merged_over_default(self):
+        profile = get_profile("library_event")
+        self.assertIn("stylesheet", profile["block_types"])
+        self.assertIn("google-analytics.com", profile["block_urls"])
+
+    def test_unknown_profile_falls_back_to_default(self):
+        self.assertEqual(get_profile("nope"), get_profile("default"))
+
+    def test_allow_list_wins_and_documents_are_never_blocked(self):
+        blocker = RequestBlocker(
+            {"block_types": ["xhr"], "block_urls": ["canada.ca"], "allow_urls": ["flpt-en.json"]}
+        )
+        self.assertFalse(blocker.should_block("https://www.canada.ca/x/flpt-en.json", "xhr"))
+        self.assertTrue(blocker.should_block("https://www.canada.ca/x/other.json", "xhr"))
+        self.assertFalse(blocker.should_block("https://www.canada.ca/", "document"))
+
+
+class TestRequestBlocker(unittest.TestCase):
+    def test_pyppeteer_requests_are_aborted_or_continued(self):
+        page = MagicMock()
+        page.setRequestInterception = AsyncMock()
+        blocker = RequestBlocker("default")
+
+        async def scenario():
+            await blocker.attach(page)
+            page.setRequestInterception.assert_awaited_once_with(True)
+            on_request = next(
+                c.args[1] for c in page.on.call_args_list if c.args[0] == "request"
+            )
+            image = pyppeteer_request("https://x/logo.png", "image")
+            tracker = pyppeteer_request("https://www.google-analytics.com/a.js", "script")
+            script = pyppeteer_request("https://x/app.js", "script")
+            for request in (image, tracker, script):
+                on_request(request)
+            await asyncio.sleep(0)
+            return image, tracker, script
+
+        image, tracker, script = asyncio.run(scenario())
+        image.abort.assert_awaited_once()
+        tracker.abort.assert_awaited_once()
+        script.continue_.assert_awaited_once()
+        self.assertEqual(blocker.stats()["blocked"], 2)
+        self.assertEqual(blocker.stats()["allowed"], 1)
+
+    def test_playwright_routes(self):
+        page = MagicMock(spec=["route", "on"])
+        page.route = AsyncMock()
+        blocker = RequestBlocker("canada_ircc")
+        asyncio.run(blocker.attach(page))
+        handler = page.route.call_args.args[1]
+
+        route = SimpleNamespace(
+            request=SimpleNamespace(url="https://x/flpt-en.json", resource_type="fetch"),
+            abort=AsyncMock(),
+            continue_=AsyncMock(),
+        )
+        asyncio.run(handler(route))
+        route.continue_.assert_awaited_once()
+        route.abort.assert_not_awaited()
+
+    def test_bytes_saved_uses_observed_sizes(self):
+        blocker = RequestBlocker("default")
+        blocker._decide(SimpleNamespace(url="https://x/a.png", resourceType="image"))
+        blocker._decide(SimpleNamespace(url="https://x/a.woff2", resourceType="font"))
+        blocker._on_response(
+            SimpleNamespace(
+                headers={"content-length": "1000"},
+                request=SimpleNamespace(resourceType="image"),
+            )
+        )
+        self.assertEqual(blocker.estimated_bytes_saved(), 1000 + TYPICAL_BYTES["font"])
+
+
+if __name__ == "__main__":
+    unittest.main()
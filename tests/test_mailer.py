@@ -0,0 +1,106 @@
+import email
+import os
+import smtplib
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.mailer import CHUNK_SIZE, Mailer, split_recipients
+
+
+def fake_server(refuse=()):
+    server = MagicMock()
+    server.noop.return_value = (250, b"OK")
+    server.mail.return_value = (250, b"OK")
+    server.rcpt.side_effect = lambda address: (550, b"No") if address in refuse else (250, b"OK")
+    server.docmd.return_value = (354, b"Go ahead")
+    server.getreply.return_value = (250, b"Queued")
+    return server
+
+
+def sent_messages(server) -> list:
+    """Rebuild the messages streamed through DATA."""
+    stream = b"".join(call.args[0] for call in server.send.call_args_list)
+    return [
+        email.message_from_bytes(raw.replace(b"\r\n..", b"\r\n."))
+        for raw in stream.split(b"\r\n.\r\n")
+        if raw
+    ]
+
+
+class TestMailer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.attachment = os.path.join(self.tmpdir.name, "screenshot.png")
+        self.content = os.urandom(CHUNK_SIZE * 2 + 100)
+        with open(self.attachment, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @patch("service.mailer.smtplib.SMTP_SSL")
+    def test_connection_is_reused_and_attachment_streamed_in_chunks(self, mock_smtp_ssl):
+        server = fake_server()
+        mock_smtp_ssl.return_value = server
+        mailer = Mailer("me@example.com", "Scraper", "secret", "smtp.example.com", 465)
+
+        first = mailer.send("a@example.com, b@example.com", "Alert", ".hidden line", self.attachment)
+        second = mailer.send(["c@example.com"], "Alert 2", "body")
+
+        mock_smtp_ssl.assert_called_once()
+        server.login.assert_called_once_with("me@example.com", "secret")
+        self.assertTrue(first["ok"] and second["ok"])
+        self.assertGreaterEqual(server.send.call_count, 4)
+
+        message = sent_messages(server)[0]
+        text, attachment = message.get_payload()
+        self.assertEqual(message["To"], "a@example.com, b@example.com")
+        self.assertEqual(text.get_payload(), ".hidden line")
+        self.assertEqual(attachment.get_filename(), "screenshot.png")
+        self.assertEqual(attachment.get_payload(decode=True), self.content)
+
+    @patch("service.mailer.smtplib.SMTP_SSL")
+    def test_recipients_are_batched_and_refusals_reported(self, mock_smtp_ssl):
+        server = fake_server(refuse={"bad@example.com"})
+        mock_smtp_ssl.return_value = server
+        mailer = Mailer("me@example.com", "Scraper", "secret", "smtp.example.com", batch_size=2)
+
+        result = mailer.send(["a@example.com", "bad@example.com", "c@example.com"], "Alert", "body")
+
+        self.assertEqual(server.mail.call_count, 2)
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["sent"], ["a@example.com", "c@example.com"])
+        self.assertEqual(result["refused"], ["bad@example.com"])
+
+    @patch("service.mailer.smtplib.SMTP_SSL")
+    def test_dropped_connection_is_reopened(self, mock_smtp_ssl):
+        stale, fresh = fake_server(), fake_server()
+        stale.mail.side_effect = smtplib.SMTPServerDisconnected()
+        mock_smtp_ssl.side_effect = [stale, fresh]
+        mailer = Mailer("me@example.com", "Scraper", "secret", "smtp.example.com")
+
+        result = mailer.send("a@example.com", "Alert", "body")
+
+        self.assertTrue(result["ok"])
+        self.assertEqual(mock_smtp_ssl.call_count, 2)
+
+    def test_failure_is_a_result_not_an_exception(self):
+        with patch("service.mailer.smtplib.SMTP_SSL", side_effect=OSError("connection refused")):
+            result = Mailer("me@example.com", "Scraper", "secret", "smtp.example.com").send(
+                "a@example.com", "Alert", "body"
+            )
+
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["error"], "connection refused")
+        self.assertEqual(split_recipients(" a@x.com, ,b@x.com "), ["a@x.com", "b@x.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
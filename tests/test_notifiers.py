@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+import service.alert
+import service.notifiers
+from service.notifiers import (
+    AlertSink,
+    Notifier,
+    NotifierConfigError,
+    WebhookNotifier,
+    configure_notifier,
+    notifier_name,
+)
+
+
+class TestNotifiers(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "notifications.jsonl")
+
+    def tearDown(self):
+        service.notifiers._active.set(None)
+        service.notifiers._default = None
+        self.tmpdir.cleanup()
+
+    def test_selection_per_scraper(self):
+        env = {"SLACK_API_TOKEN": "t", "CHANNEL_ID": "c", "NOTIFIER_COSTCO": "email"}
+        with patch.dict(os.environ, env, clear=True):
+            self.assertEqual(notifier_name("costco"), "email")
+            self.assertEqual(notifier_name("home_depo"), "slack")
+        with patch.dict(os.environ, {"NOTIFIER": "webhook"}, clear=True):
+            self.assertEqual(notifier_name("home_depo"), "webhook")
+        # no Slack credentials: alerts are kept in a file instead of exiting
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(notifier_name("home_depo"), "file")
+        # ... but a scheduled run in CI must not alert nobody
+        with patch.dict(os.environ, {"GITHUB_ACTIONS": "true"}, clear=True):
+            with self.assertRaises(NotifierConfigError):
+                notifier_name("home_depo")
+
+    def test_notifier_must_implement_notify(self):
+        with self.assertRaises(TypeError):
+            Notifier("home_depo")
+
+    def test_each_run_keeps_its_own_notifier(self):
+        import asyncio
+
+        async def run(scraper_name, backend):
+            with patch.dict(os.environ, {f"NOTIFIER_{scraper_name.upper()}": backend}):
+                configure_notifier(scraper_name)
+            await asyncio.sleep(0.01)
+            return service.notifiers.get_notifier().scraper_name, service.notifiers.get_notifier().name
+
+        async def both():
+            return await asyncio.gather(run("home_depo", "file"), run("costco", "webhook"))
+
+        self.assertEqual(asyncio.run(both()), [("home_depo", "file"), ("costco", "webhook")])
+        # importing or running a scraper leaves the rest of the process alone
+        self.assertEqual(service.notifiers.get_notifier().scraper_name, "default")
+
+    def test_senders_are_routed_to_the_configured_notifier(self):
+        with patch.dict(os.environ, {"NOTIFIER": "file"}), patch(
+            "service.notifiers.NOTIFY_FILE", self.path
+        ), patch("service.alert._call") as mock_call:
+            configure_notifier("home_depo")
+            self.assertTrue(service.alert.send_slack_message("Seats open"))
+            service.alert.send_api_error_alert("Home Depot API", "HTTP 500")
+
+        mock_call.assert_not_called()
+        with open(self.path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(
+            [(row["scraper"], row["alert"], row["kind"]) for row in rows],
+            [
+                ("home_depo", "send_slack_message", "message"),
+                ("home_depo", "send_api_error_alert", "error"),
+            ],
+        )
+        self.assertEqual(rows[0]["text"], "Seats open")
+        self.assertIn("HTTP 500", rows[1]["text"])
+
+    def test_slack_notifier_calls_the_sender(self):
+        configure_notifier("home_depo")
+        with patch("service.alert._call", return_value={"ok": True}) as mock_call, patch(
+            "service.alert.get_owner_id", return_value="U1"
+        ):
+            self.assertTrue(service.alert.send_slack_message("Seats open"))
+        self.assertEqual(mock_call.call_args.args[0], "chat_postMessage")
+
+    def test_webhook_to_local_sink(self):
+        sink = AlertSink(port=0).start()
+        try:
+            notifier = WebhookNotifier("home_depo", url=sink.url)
+            for i in range(5):
+                self.assertTrue(notifier.notify("send_slack_message", (f"alert {i}",), {}))
+            stats = sink.stats()
+        finally:
+            sink.stop()
+        self.assertEqual(stats["received"], 5)
+        self.assertEqual(sink.received[0]["text"], "alert 0")
+        self.assertLess(stats["max_ms"], 5000)
+
+        # nothing listening any more
+        self.assertFalse(notifier.notify("send_slack_message", ("late",), {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from service.alert_queue import AlertDispatcher, dispatch
+from service.outbox import CLAIM_TIMEOUT_SECONDS, MAX_ATTEMPTS, SCHEMA, Outbox, OutboxDeliveryError
+
+
+def named_mock(name, **kwargs):
+    sender = MagicMock(**kwargs)
+    sender.__name__ = name
+    return sender
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.outbox = Outbox(os.path.join(self.tmpdir.name, "outbox.db"))
+
+    def tearDown(self):
+        self.outbox.close()
+        self.tmpdir.cleanup()
+
+    def test_enqueue_is_cheap_and_uses_wal(self):
+        journal_mode = self.outbox.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+
+        started = time.perf_counter()
+        for i in range(200):
+            self.outbox.enqueue("send_slack_message", (f"message {i}",))
+        per_alert = (time.perf_counter() - started) / 200
+
+        self.assertLess(per_alert, 0.005)
+        self.assertEqual(self.outbox.stats()["pending"], 200)
+
+    def test_failed_delivery_is_retried_with_backoff_then_dead(self):
+        row_id = self.outbox.enqueue("send_api_error_alert", ("Home Depot API", "boom"))
+
+        with patch("service.alert.send_api_error_alert", return_value=False):
+            with self.assertRaises(OutboxDeliveryError):
+                self.outbox.deliver(row_id)
+            self.assertEqual(self.outbox.pending_ids(), [])  # backing off
+            self.assertEqual(self.outbox.pending_ids(due_only=False), [row_id])
+
+            for _ in range(MAX_ATTEMPTS - 1):
+                self.outbox.replay()
+
+        self.assertEqual(self.outbox.stats(), {"pending": 0, "delivered": 0, "dead": 1})
+
+    def test_replay_delivers_leftovers(self):
+        self.outbox.enqueue("send_slack_message", ("left over",), {"screenshot_path": None})
+
+        with patch("service.alert.send_slack_message", return_value=True) as mock_send:
+            self.assertEqual(self.outbox.replay(), {"delivered": 1, "failed": 0})
+
+        mock_send.assert_called_once_with("left over", screenshot_path=None)
+        self.assertEqual(self.outbox.stats()["delivered"], 1)
+
+    def test_leftover_goes_through_the_notifier_of_its_scraper(self):
+        import service.notifiers
+        from service.notifiers import configure_notifier, get_notifier
+
+        path = os.path.join(self.tmpdir.name, "notifications.jsonl")
+        env = {"NOTIFIER_COSTCO": "file", "NOTIFIER_HOME_DEPO": "webhook"}
+        with patch.dict(os.environ, env), patch("service.notifiers.NOTIFY_FILE", path):
+            configure_notifier("costco")
+            self.outbox.enqueue("send_slack_message", ("Switch in stock",))
+            # replayed later by another scraper's process
+            configure_notifier("home_depo")
+            self.assertEqual(self.outbox.replay(), {"delivered": 1, "failed": 0})
+            self.assertEqual(get_notifier().scraper_name, "home_depo")
+        service.notifiers._active.set(None)
+
+        with open(path) as f:
+            row = json.loads(f.readline())
+        self.assertEqual((row["scraper"], row["text"]), ("costco", "Switch in stock"))
+
+    def test_outbox_without_scraper_column_is_upgraded(self):
+        path = os.path.join(self.tmpdir.name, "old.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA.replace("    scraper TEXT,\n", ""))
+        conn.close()
+
+        outbox = Outbox(path)
+        row_id = outbox.enqueue("send_slack_message", ("hello",), scraper="costco")
+        self.assertEqual(outbox.claim(row_id)[0], "costco")
+        outbox.close()
+
+    def test_claimed_row_is_delivered_once(self):
+        row_id = self.outbox.enqueue("send_slack_message", ("only once",))
+        other = Outbox(self.outbox.path)
+
+        # another process claimed the row and is sending it
+        self.assertIsNotNone(other.claim(row_id))
+        with patch("service.alert.send_slack_message", return_value=True) as mock_send:
+            self.assertIsNone(self.outbox.deliver(row_id))
+            self.assertEqual(self.outbox.replay(), {"delivered": 0, "failed": 0})
+        mock_send.assert_not_called()
+        other.close()
+
+    def test_claim_of_a_dead_process_is_released(self):
+        row_id = self.outbox.enqueue("send_slack_message", ("crashed mid-send",))
+        self.outbox.claim(row_id)
+        self.assertEqual(self.outbox.pending_ids(due_only=False), [])
+
+        with patch("service.outbox.CLAIM_TIMEOUT_SECONDS", 0):
+            self.outbox.enqueue("send_slack_message", ("next",))
+            self.outbox.claim(row_id + 1)
+        self.assertEqual(self.outbox.pending_ids(due_only=False), [row_id + 1])
+
+    def test_send_returns_before_the_alert_is_delivered(self):
+        outbox = Outbox(self.outbox.path, retries=2, retry_delay=0.01)
+        released = threading.Event()
+
+        def slow(*args, **kwargs):
+            released.wait(5)
+            return True
+
+        with patch("service.alert.send_slack_message", side_effect=slow) as mock_send:
+            started = time.perf_counter()
+            self.assertIsNotNone(outbox.send("send_slack_message", ("hello",)))
+            self.assertLess(time.perf_counter() - started, 0.5)
+            released.set()
+            self.assertTrue(outbox.worker().drain(5))
+        mock_send.assert_called_once_with("hello")
+        self.assertEqual(outbox.stats()["delivered"], 1)
+        outbox.close()
+
+    def test_worker_retries_within_the_run(self):
+        outbox = Outbox(self.outbox.path, retries=2, retry_delay=0.01)
+        results = iter([RuntimeError("Slack down"), False, True])
+
+        def flaky(*args, **kwargs):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with patch("service.alert.send_slack_message", side_effect=flaky) as mock_send:
+            outbox.send("send_slack_message", ("hello",))
+            self.assertTrue(outbox.worker().drain(5))
+        self.assertEqual(mock_send.call_count, 3)
+        self.assertEqual(outbox.stats()["delivered"], 1)
+        outbox.close()
+
+    def test_worker_leaves_the_alert_for_a_later_run(self):
+        outbox = Outbox(self.outbox.path, retries=1, retry_delay=0.01)
+        with patch("service.alert.send_slack_message", return_value=False) as mock_send:
+            outbox.send("send_slack_message", ("hello",))
+            self.assertTrue(outbox.worker().drain(5))
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(outbox.stats()["pending"], 1)
+        outbox.close()
+
+    def test_worker_sends_leftovers_of_earlier_runs(self):
+        self.outbox.enqueue("send_slack_message", ("from the last run",))
+        with patch("service.alert.send_slack_message", return_value=True) as mock_send:
+            self.outbox.send("send_slack_message", ("new",))
+            self.assertTrue(self.outbox.worker().drain(5))
+        self.assertEqual(
+            [c.args for c in mock_send.call_args_list], [("from the last run",), ("new",)]
+        )
+
+    def test_dispatch_without_dispatcher_goes_through_the_outbox(self):
+        import service.alert
+
+        notifier = MagicMock()
+        notifier.notify.return_value = True
+        with patch("service.outbox.get_outbox", return_value=self.outbox), \
+                patch("service.notifiers.get_notifier", return_value=notifier):
+            self.assertIsNone(dispatch(service.alert.send_slack_message, "synchronous"))
+            self.assertTrue(self.outbox.worker().drain(5))
+
+        notifier.notify.assert_called_once_with("send_slack_message", ("synchronous",), {})
+        self.assertEqual(self.outbox.stats()["delivered"], 1)
+
+class TestDispatcherOutbox(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.outbox = Outbox(os.path.join(self.tmpdir.name, "outbox.db"))
+
+    def tearDown(self):
+        self.outbox.close()
+        self.tmpdir.cleanup()
+
+    def test_alerts_survive_a_failing_backend(self):
+        sender = named_mock("send_slack_message", side_effect=RuntimeError("Slack down"))
+
+        async def scenario():
+            async with AlertDispatcher(outbox=self.outbox, retries=2, retry_delay=0.01) as alerts:
+                dispatch(sender, "workshop open")
+            return alerts
+
+        with patch("service.alert.send_slack_message", sender):
+            alerts = asyncio.run(scenario())
+
+        # tried again before the dispatcher closed, then left for a later run
+        self.assertEqual(sender.call_count, 3)
+        self.assertEqual(alerts.stats()["failed"], 3)
+        self.assertEqual(self.outbox.stats()["pending"], 1)
+
+    def test_failed_alert_is_retried_within_the_run(self):
+        sender = named_mock("send_slack_message", side_effect=[RuntimeError("Slack down"), True])
+
+        async def scenario():
+            async with AlertDispatcher(outbox=self.outbox, retry_delay=0.01):
+                dispatch(sender, "workshop open")
+
+        with patch("service.alert.send_slack_message", sender):
+            asyncio.run(scenario())
+
+        self.assertEqual(sender.call_count, 2)
+        self.assertEqual(self.outbox.stats()["delivered"], 1)
+
+    def test_digested_alerts_survive_a_run_that_dies(self):
+        import service.alert
+        from service.alert_digest import AlertDigest, get_rules
+
+        digest = AlertDigest("home_depo", dict(get_rules("home_depo"), enabled=True))
+
+        async def crashed_run():
+            alerts = AlertDispatcher(digest=digest, outbox=self.outbox)
+            await alerts.start()
+            dispatch(service.alert.send_slack_message, "Build a Birdhouse is open")
+            # killed here: close() never runs, no digest is posted
+
+        with patch("service.alert_queue._active", None):
+            asyncio.run(crashed_run())
+        self.assertEqual(self.outbox.pending_ids(due_only=False), [])
+
+        # held only as long as a live run could still post the digest
+        later = time.time() + CLAIM_TIMEOUT_SECONDS + 1
+        with patch("service.outbox.time.time", return_value=later), patch(
+            "service.alert.send_slack_message", return_value=True
+        ) as mock_send:
+            self.assertEqual(self.outbox.replay(), {"delivered": 1, "failed": 0})
+        mock_send.assert_called_once_with("Build a Birdhouse is open")
+
+    def test_digest_replaces_the_held_alerts(self):
+        import service.alert
+        from service.alert_digest import AlertDigest, get_rules
+
+        digest = AlertDigest("home_depo", dict(get_rules("home_depo"), enabled=True))
+
+        async def scenario():
+            async with AlertDispatcher(digest=digest, outbox=self.outbox):
+                dispatch(service.alert.send_slack_message, "Build a Birdhouse is open")
+                dispatch(service.alert.send_slack_message, "Build a Truck is open")
+
+        with patch("service.alert.send_alert_digest", return_value=True) as mock_digest:
+            asyncio.run(scenario())
+
+        mock_digest.assert_called_once()
+        self.assertEqual(self.outbox.stats(), {"pending": 0, "delivered": 3, "dead": 0})
+
+    def test_next_dispatcher_replays_what_a_crashed_run_left(self):
+        self.outbox.enqueue("send_slack_message", ("from the last run",))
+        sender = named_mock("send_slack_message", return_value=True)
+
+        async def scenario():
+            async with AlertDispatcher(outbox=self.outbox):
+                pass
+
+        with patch("service.alert.send_slack_message", sender):
+            asyncio.run(scenario())
+
+        sender.assert_called_once_with("from the last run")
+        self.assertEqual(self.outbox.stats()["delivered"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
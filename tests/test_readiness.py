@@ -0,0 +1,136 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service import readiness
+from service.readiness import PageReadiness, summarize_timings
+
+
+class FakePage:
+    """Minimal page exposing the pyppeteer event and selector API."""
+
+    def __init__(self, selector_delay=None):
+        self.handlers = {}
+        self.selector_delay = selector_delay
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, *args):
+        for handler in list(self.handlers.get(event, [])):
+            handler(*args)
+
+    async def waitForSelector(self, selector, options):
+        if self.selector_delay is None:
+            await asyncio.sleep(options["timeout"] / 1000)
+            raise TimeoutError(f"waiting for selector {selector} failed")
+        await asyncio.sleep(self.selector_delay)
+
+
+class TestPageReadiness(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.timings_file = os.path.join(self.tmpdir, "timings.jsonl")
+        self._patch = patch.object(readiness, "READINESS_TIMINGS_FILE", self.timings_file)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        if os.path.exists(self.timings_file):
+            os.remove(self.timings_file)
+        os.rmdir(self.tmpdir)
+
+    def test_selector_resolves_without_waiting_for_deadline(self):
+        page = FakePage(selector_delay=0.01)
+        report = asyncio.run(
+            PageReadiness(page).wait(selector="h3", deadline_ms=5000, label="t")
+        )
+        self.assertTrue(report["ready"])
+        self.assertLess(report["elapsed_ms"], 1000)
+        self.assertIsNotNone(report["conditions"]["selector"])
+
+    def test_network_idle_waits_for_inflight_requests(self):
+        page = FakePage()
+        tracker = PageReadiness(page)
+
+        async def scenario():
+            page.emit("request", object())
+
+            async def finish_later():
+                await asyncio.sleep(0.1)
+                page.emit("requestfinished", object())
+
+            asyncio.ensure_future(finish_later())
+            return await tracker.wait(network_idle_ms=50, deadline_ms=2000)
+
+        report = asyncio.run(scenario())
+        self.assertTrue(report["ready"])
+        self.assertGreaterEqual(report["conditions"]["network_idle"], 150)
+
+    def test_deadline_is_hard(self):
+        page = FakePage()
+        tracker = PageReadiness(page)
+        page.emit("request", object())  # never finishes
+
+        report = asyncio.run(tracker.wait(network_idle_ms=50, deadline_ms=200))
+        self.assertFalse(report["ready"])
+        self.assertTrue(report["timed_out"])
+        self.assertIsNone(report["conditions"]["network_idle"])
+        self.assertLess(report["elapsed_ms"], 1000)
+
+    def test_response_seen_before_wait_counts(self):
+        page = FakePage()
+        tracker = PageReadiness(page)
+        page.emit("response", SimpleNamespace(url="https://x/api/flpt-en.json"))
+
+        report = asyncio.run(
+            tracker.wait(response_match="flpt-en.json", deadline_ms=1000)
+        )
+        self.assertTrue(report["ready"])
+
+    def test_any_mode_returns_on_first_condition(self):
+        page = FakePage()  # selector never appears
+        report = asyncio.run(
+            PageReadiness(page).wait(
+                selector="div.day-event-card",
+                network_idle_ms=10,
+                mode="any",
+                deadline_ms=3000,
+            )
+        )
+        self.assertTrue(report["ready"])
+        self.assertIsNone(report["conditions"]["selector"])
+        self.assertLess(report["elapsed_ms"], 1000)
+
+    def test_detach_removes_listeners(self):
+        page = FakePage()
+        tracker = PageReadiness(page)
+        tracker.detach()
+        self.assertTrue(all(not h for h in page.handlers.values()))
+
+    def test_timings_are_recorded_and_summarized(self):
+        page = FakePage(selector_delay=0)
+        for _ in range(3):
+            asyncio.run(PageReadiness(page).wait(selector="h3", label="lib"))
+
+        with open(self.timings_file) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        summary = summarize_timings(self.timings_file)
+        self.assertEqual(summary["lib"]["selector"]["count"], 3)
+        self.assertEqual(summary["lib"]["timeouts"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from scraper import canada_ircc
+from service.replay_session import HarvestedSession
+
+URLS = {"ptime": "https://x/data-ptime-non-country-en.json", "flpt": "https://x/flpt-en.json"}
+FEEDS = {"ptime": {"pnp_ee_flpt": {}}, "flpt": {"people-ahead": {}}}
+
+
+def fake_client(status_code=200, payloads=None):
+    """AsyncSession stand-in answering every GET with the payload for its URL."""
+    client = MagicMock()
+
+    async def get(url, **kwargs):
+        response = MagicMock(status_code=status_code)
+        key = "ptime" if "ptime" in url else "flpt"
+        response.json.return_value = (payloads or FEEDS)[key]
+        return response
+
+    client.get = AsyncMock(side_effect=get)
+    session_cls = MagicMock()
+    session_cls.return_value.__aenter__ = AsyncMock(return_value=client)
+    session_cls.return_value.__aexit__ = AsyncMock(return_value=None)
+    return session_cls, client
+
+
+class TestHarvestedSession(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "session.json")
+
+    def tearDown(self):
+        HarvestedSession.invalidate(self.path)
+        os.rmdir(self.tmpdir)
+
+    def test_save_then_load_roundtrip(self):
+        HarvestedSession(URLS, {":authority": "x", "user-agent": "ua"}, {"a": "1"}).save(self.path)
+        session = HarvestedSession.load(self.path)
+        self.assertEqual(session.urls, URLS)
+        self.assertEqual(session.headers, {"user-agent": "ua"})
+        self.assertEqual(session.cookies, {"a": "1"})
+
+    def test_expired_session_is_not_loaded(self):
+        HarvestedSession(URLS, {}, {}, expires_at=time.time() - 1).save(self.path)
+        self.assertIsNone(HarvestedSession.load(self.path))
+
+    def test_first_cookie_expiry_caps_the_ttl(self):
+        soon = time.time() + 60
+        session = HarvestedSession.from_browser(
+            URLS, {}, [{"name": "a", "value": "1", "expires": soon}, {"name": "b", "value": "2", "expires": -1}]
+        )
+        self.assertEqual(session.expires_at, soon)
+
+    def test_replay_returns_json_per_feed(self):
+        session_cls, client = fake_client()
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            result = asyncio.run(HarvestedSession(URLS, {}, {"a": "1"}).replay())
+        self.assertEqual(result, FEEDS)
+        self.assertEqual(client.get.call_args.kwargs["cookies"], {"a": "1"})
+
+    def test_rejected_replay_returns_none(self):
+        session_cls, _ = fake_client(status_code=403)
+        with patch("curl_cffi.requests.AsyncSession", session_cls):
+            self.assertIsNone(asyncio.run(HarvestedSession(URLS, {}, {}).replay()))
+
+
+@patch("slack.WebClient")
+class TestFetchIrccFeeds(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "ircc_session.json")
+        self._patch = patch.object(canada_ircc, "SESSION_FILE", self.path)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        HarvestedSession.invalidate(self.path)
+        os.rmdir(self.tmpdir)
+
+    @patch("scraper.canada_ircc.capture_with_browser")
+    def test_cached_session_skips_browser(self, mock_browser, _wc):
+        HarvestedSession(URLS, {}, {}).save(self.path)
+        with patch.object(HarvestedSession, "replay", AsyncMock(return_value=FEEDS)):
+            self.assertEqual(asyncio.run(canada_ircc.fetch_ircc_feeds()), FEEDS)
+        mock_browser.assert_not_called()
+
+    @patch("scraper.canada_ircc.capture_with_browser")
+    def test_rejected_replay_falls_back_and_refreshes_session(self, mock_browser, _wc):
+        HarvestedSession(URLS, {}, {"old": "1"}).save(self.path)
+        mock_browser.return_value = (FEEDS, HarvestedSession(URLS, {}, {"new": "2"}))
+        with patch.object(HarvestedSession, "replay", AsyncMock(return_value=None)):
+            self.assertEqual(asyncio.run(canada_ircc.fetch_ircc_feeds()), FEEDS)
+        mock_browser.assert_awaited_once()
+        self.assertEqual(HarvestedSession.load(self.path).cookies, {"new": "2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
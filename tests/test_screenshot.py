@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from PIL import Image
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from service.screenshot import ScreenshotPipeline
+
+
+def noisy_png(width=1920, height=1200) -> bytes:
+    """A screenshot-sized PNG that does not compress well."""
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestScreenshotPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "shot.png")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_encode_fits_target_by_quality_then_size(self):
+        png = noisy_png()
+        pipeline = ScreenshotPipeline(target_bytes=200 * 1024, max_width=1280)
+
+        data = pipeline.encode(png)
+
+        self.assertLessEqual(len(data), 200 * 1024)
+        self.assertLess(pipeline.timings["width"], 1280)
+        self.assertEqual(Image.open(io.BytesIO(data)).format, "JPEG")
+        self.assertEqual(pipeline.timings["raw_bytes"], len(png))
+
+    def test_selenium_capture_clips_to_element_and_falls_back(self):
+        driver = MagicMock()
+        driver.find_element.return_value.screenshot_as_png = noisy_png(400, 300)
+        pipeline = ScreenshotPipeline(fmt="WEBP")
+
+        path = pipeline.capture_selenium(driver, "#product-page", self.path)
+
+        self.assertTrue(path.endswith("shot.webp"))
+        self.assertEqual(Image.open(path).size, (400, 300))
+        driver.get_screenshot_as_png.assert_not_called()
+
+        driver.find_element.side_effect = Exception("no such element")
+        driver.get_screenshot_as_png.return_value = noisy_png(200, 100)
+        self.assertEqual(Image.open(pipeline.capture_selenium(driver, "#gone", self.path)).size, (200, 100))
+        self.assertIn("capture_ms", pipeline.timings)
+
+    def test_pyppeteer_capture_uses_element_screenshot(self):
+        page = MagicMock()
+        element = MagicMock()
+        element.screenshot = AsyncMock(return_value=noisy_png(300, 200))
+        page.querySelector = AsyncMock(return_value=element)
+
+        path = asyncio.run(ScreenshotPipeline().capture_pyppeteer(page, ".card", self.path))
+
+        self.assertTrue(path.endswith(".jpg"))
+        element.screenshot.assert_awaited_once_with({"type": "png"})
+
+    @patch("service.alert.send_slack_message")
+    def test_upload_runs_in_background_and_is_timed(self, mock_send):
+        pipeline = ScreenshotPipeline()
+
+        pipeline.upload_in_background("available", self.path).join(timeout=5)
+
+        mock_send.assert_called_once_with("available", screenshot_path=self.path)
+        self.assertIn("upload_ms", pipeline.timings)
+
+    @patch("service.alert.send_slack_message")
+    def test_upload_keeps_the_notifier_of_the_scraper(self, mock_send):
+        from service.notifiers import configure_notifier, current_scraper
+
+        seen = []
+        mock_send.side_effect = lambda *args, **kwargs: seen.append(current_scraper())
+
+        def run():
+            configure_notifier("costco")
+            ScreenshotPipeline().upload_in_background("available", self.path).join(timeout=5)
+
+        contextvars.copy_context().run(run)
+
+        self.assertEqual(seen, ["costco"])
+
+
+if __name__ == "__main__":
+    unittest.main()
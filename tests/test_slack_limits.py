@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+os.environ.setdefault("SLACK_API_TOKEN", "test-token")
+os.environ.setdefault("CHANNEL_ID", "test-channel")
+
+from service.alert import send_slack_message
+from service.slack_limits import SlackRateLimiter, TokenBucket, retry_after
+
+
+class FakeSlackError(Exception):
+    def __init__(self, status_code, error, headers=None):
+        super().__init__(error)
+        self.response = MagicMock(status_code=status_code, headers=headers or {})
+        self.response.get.side_effect = lambda key, default=None: error if key == "error" else default
+
+
+class TestSlackRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.limiter = SlackRateLimiter(
+            limits={"chat_postMessage": (1.0, 2)}, max_retries=3, sleep=self.sleeps.append
+        )
+
+    def test_burst_beyond_bucket_is_delayed_not_rejected(self):
+        request = MagicMock(return_value={"ok": True})
+
+        for _ in range(4):
+            self.limiter.call("chat_postMessage", request)
+
+        self.assertEqual(request.call_count, 4)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertAlmostEqual(self.sleeps[-1], 2.0, places=1)
+        self.assertEqual(self.limiter.stats()["throttled"], 2)
+
+    @patch("service.slack_limits.random.uniform", return_value=0.5)
+    def test_ratelimited_call_is_retried_after_retry_after(self, _uniform):
+        request = MagicMock(
+            side_effect=[FakeSlackError(429, "ratelimited", {"Retry-After": "3"}), {"ok": True}]
+        )
+
+        self.assertEqual(self.limiter.call("chat_postMessage", request), {"ok": True})
+        self.assertEqual(self.sleeps, [3.5])
+        self.assertEqual(self.limiter.stats()["retries"], 1)
+        self.assertEqual(self.limiter.stats()["max_delay_ms"], 3500)
+
+    def test_other_errors_and_exhausted_retries_are_raised(self):
+        with self.assertRaises(FakeSlackError):
+            self.limiter.call("pins_add", MagicMock(side_effect=FakeSlackError(200, "channel_not_found")))
+        self.assertEqual(self.sleeps, [])
+
+        with self.assertRaises(FakeSlackError):
+            self.limiter.call("pins_add", MagicMock(side_effect=FakeSlackError(429, "ratelimited")))
+        self.assertEqual(self.limiter.stats()["retries"], 3)
+        self.assertEqual(self.limiter.stats()["failed"], 2)
+
+    def test_retry_after_ignores_non_rate_limit_errors(self):
+        self.assertIsNone(retry_after(ValueError("boom")))
+        self.assertEqual(retry_after(FakeSlackError(429, "ratelimited")), 1.0)
+
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(rate=1000, capacity=1)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertGreater(bucket.reserve(), 0)
+
+
+class TestAlertRetry(unittest.TestCase):
+    @patch("service.alert.get_owner_id", return_value="U1")
+    @patch("service.alert.client")
+    def test_message_survives_a_rate_limited_burst(self, mock_client, _owner):
+        mock_client.chat_postMessage.side_effect = [
+            FakeSlackError(429, "ratelimited", {"Retry-After": "0"}),
+            {"ok": True},
+        ]
+
+        with patch("service.alert.rate_limiter", SlackRateLimiter(sleep=lambda seconds: None)):
+            send_slack_message("Workshop open")
+
+        self.assertEqual(mock_client.chat_postMessage.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
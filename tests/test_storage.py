@@ -0,0 +1,143 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from unittest.mock import patch
+
+from service.storage import StateStore, registration_info
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_json(self, name, content):
+        with open(os.path.join(self.tmpdir.name, name), "w") as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def test_migrates_json_files_once(self):
+        self.write_json("last_alert.json", {"costco": "2025-06-15"})
+        self.write_json(
+            "registered_workshops.json",
+            {
+                "home_depo": {
+                    # written before is_registered existed
+                    "WS00029": {"workshop_id": "KWBE0001", "title": "Build an Excavator"},
+                    "WS00030": {"workshop_id": "KWBE0002", "is_registered": False},
+                }
+            },
+        )
+        store = StateStore(self.path)
+        self.assertEqual(store.get_last_alert_date("costco"), "2025-06-15")
+        registrations = store.get_registrations("home_depo")
+        self.assertTrue(registrations["WS00029"]["is_registered"])
+        self.assertEqual(registrations["WS00029"]["workshop_event_id"], "WS00029")
+        self.assertFalse(registrations["WS00030"]["is_registered"])
+
+        # later changes are not overwritten by the (stale) JSON on the next open
+        store.set_last_alert_date("costco", "2025-07-01")
+        store.close()
+        store = StateStore(self.path)
+        self.assertEqual(store.get_last_alert_date("costco"), "2025-07-01")
+        store.close()
+
+    def test_empty_or_corrupt_json_is_skipped(self):
+        self.write_json("last_alert.json", "")
+        self.write_json("registered_workshops.json", "{not json")
+
+        store = StateStore(self.path)
+        self.assertIsNone(store.get_last_alert_date("costco"))
+        self.assertEqual(store.get_registrations("home_depo"), {})
+        store.close()
+
+    def test_concurrent_writers_do_not_clobber(self):
+        stores = [StateStore(self.path) for _ in range(2)]
+
+        def register(store, prefix):
+            for i in range(25):
+                store.save_registration(
+                    "home_depo", {"workshop_event_id": f"{prefix}{i}", "title": prefix}
+                )
+
+        threads = [
+            threading.Thread(target=register, args=(store, prefix))
+            for store, prefix in zip(stores, ("A", "B"))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(stores[0].get_registrations("home_depo")), 50)
+        for store in stores:
+            store.close()
+
+    def test_snapshot_reads_once_and_batches_discoveries(self):
+        store = StateStore(self.path)
+        store.save_registration(
+            "home_depo", registration_info("WS00028", "KW1", "Old", "2025-11-01")
+        )
+
+        spy = patch.object(store, "save_registrations", wraps=store.save_registrations)
+        with spy as writes:
+            with store.snapshot("home_depo") as registrations:
+                self.assertTrue(registrations.is_registered("WS00028"))
+                for i in range(10):
+                    info = registration_info(f"WS1{i:02}", "KW2", "New", "2025-11-08")
+                    registrations.save({**info, "is_registered": False})
+                self.assertIn("WS100", registrations)
+                self.assertFalse(registrations.is_registered("WS100"))
+                # nothing written yet
+                writes.assert_not_called()
+            # one transaction for all ten discoveries
+            writes.assert_called_once()
+        self.assertEqual(len(store.get_registrations("home_depo")), 11)
+        store.close()
+
+    def test_snapshot_writes_registrations_immediately(self):
+        store = StateStore(self.path)
+        registrations = store.snapshot("home_depo")
+        excavator = registration_info("WS00029", "KW1", "Excavator", "2025-11-08")
+        registrations.save({**excavator, "is_registered": False})
+        registrations.save(excavator)
+        registrations.save(
+            registration_info("WS00030", "KW2", "Birdhouse", "2025-11-08", is_registered=False)
+        )
+
+        # the process dies before flush(): the registration made is kept,
+        # only the pending discovery is lost
+        store.close()
+        store = StateStore(self.path)
+        self.assertTrue(store.get_registration("home_depo", "WS00029")["is_registered"])
+        self.assertIsNone(store.get_registration("home_depo", "WS00030"))
+        store.close()
+
+    def test_discovery_never_undoes_a_registration(self):
+        store = StateStore(self.path)
+        registrations = store.snapshot("home_depo")
+        info = registration_info("WS00029", "KW1", "Excavator", "2025-11-08")
+        registrations.save({**info, "is_registered": False})
+
+        # another process registers the workshop while this pass runs
+        StateStore(self.path).save_registration("home_depo", info)
+        registrations.flush()
+        store.save_registration("home_depo", {**info, "is_registered": False})
+
+        self.assertTrue(store.get_registration("home_depo", "WS00029")["is_registered"])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
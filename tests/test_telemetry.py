@@ -0,0 +1,126 @@
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to allow imports
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+from service.telemetry import TelemetryWriter, stage
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.spool = os.path.join(self.tmp.name, "spool.jsonl")
+        self.tx = MagicMock()
+        self.fail = False
+
+        @contextlib.contextmanager
+        def transaction():
+            if self.fail:
+                raise OSError("database unreachable")
+            yield self.tx
+
+        patcher = patch("service.telemetry.db.transaction", side_effect=transaction)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def writer(self, **kwargs):
+        writer = TelemetryWriter(spool_path=self.spool, **{"flush_seconds": 60, **kwargs})
+        self.addCleanup(writer.close)
+        return writer
+
+    def test_runs_are_written_in_one_batch(self):
+        writer = self.writer()
+        run = writer.start_run("home_depo", started_at=time.time() - 1)
+        with stage("fetch"):
+            pass
+        with stage("fetch"):
+            pass
+        run.finish("success", "completed")
+        run.finish("fail", "ignored")
+        writer.record("home_depo", time.time(), "fail", "x" * 600)
+        writer.record("canada_ircc", time.time(), "skipped", "deactivated")
+        self.tx.execute_values.assert_not_called()
+
+        self.assertEqual(writer.flush(), 3)
+        name, rows, template = self.tx.execute_values.call_args.args
+        self.assertEqual(name, "insert_runs")
+        self.assertEqual([row[3] for row in rows], ["success", "fail", "skipped"])
+        self.assertGreaterEqual(rows[0][2], 1000)
+        self.assertEqual(list(json.loads(rows[0][5])), ["fetch"])
+        self.assertEqual(len(rows[1][4]), 500)
+        # scrapers.last_run_* once per scraper, from its latest run
+        updates = [c.args[1] for c in self.tx.execute.call_args_list]
+        self.assertEqual(sorted((u[4], u[2]) for u in updates), [("canada_ircc", "skipped"), ("home_depo", "fail")])
+        self.assertEqual(writer.stats()["written"], 3)
+        self.assertEqual(writer.flush(), 0)
+
+    def test_failed_flush_is_retried_and_spooled_at_close(self):
+        writer = self.writer()
+        self.fail = True
+        writer.record("home_depo", time.time(), "success", "completed")
+        self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.stats()["buffered"], 1)
+        writer.close()
+        self.assertTrue(os.path.exists(self.spool))
+
+        self.fail = False
+        writer = self.writer()
+        self.assertFalse(os.path.exists(self.spool))
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(self.tx.execute_values.call_args.args[1][0][0], "home_depo")
+
+    def test_spool_is_kept_until_its_runs_are_committed(self):
+        writer = self.writer()
+        self.fail = True
+        writer.record("home_depo", time.time(), "success", "completed")
+        writer.close()
+
+        # a second process finds nothing to take while the runs are claimed
+        writer = self.writer()
+        claimed = list(writer.claimed)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(self.writer().stats()["buffered"], 0)
+
+        # the database is still down: the claim survives the failed flush
+        self.assertEqual(writer.flush(), 0)
+        self.assertTrue(os.path.exists(claimed[0]))
+
+        self.fail = False
+        self.assertEqual(writer.flush(), 1)
+        self.assertFalse(os.path.exists(claimed[0]))
+        self.assertEqual(os.listdir(self.tmp.name), ["spool.jsonl.lock"])
+
+    def test_claim_of_a_dead_process_is_taken_over(self):
+        orphan = f"{self.spool}.999999.abc.claimed"
+        with open(orphan, "w") as f:
+            f.write(json.dumps({"scraper": "home_depo", "started_at": time.time(),
+                                "duration_ms": 1, "status": "success", "message": "",
+                                "stages": {}}) + "\n")
+
+        with patch("service.telemetry._pid_alive", return_value=False):
+            writer = self.writer()
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual(writer.flush(), 1)
+
+    def test_full_batch_is_flushed_in_the_background(self):
+        writer = self.writer(batch_size=2)
+        writer.record("home_depo", time.time(), "success", "completed")
+        writer.record("home_depo", time.time(), "success", "completed")
+        deadline = time.time() + 5
+        while writer.stats()["written"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writer.stats()["written"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()